@@ -2,29 +2,145 @@
 
 # Standard Library
 import os
+import re
+import json
+import time
+import signal
+import shutil
+import socket
+import hashlib
+import webbrowser
+import sqlite3
 import subprocess
 from uuid import uuid4
 from pathlib import Path
-from typing import Iterable, Never
-from datetime import datetime, timezone
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+from typing import Any, Iterable, Iterator, NamedTuple, Never
+from urllib.parse import quote
 
 # Third Party
 from typer import Argument, Exit, Option, Typer, colors, confirm, secho
 from rich import print
 
 # My Imports
-from moscripts.utilities import nix_run_prefix
+from moscripts.utilities import (
+    RACY_MTIME_NS,
+    CompiledFormatter,
+    format_size,
+    nix_exec_prefix,
+    parse_duration,
+    parse_size,
+)
 
 # Globals
 HOME: Path = Path.home()
 MOTMP: Path = HOME / ".cache" / "marimo" / "motmp"
 VENV: Path = MOTMP / ".venv"
+INDEX: Path = MOTMP.parent / "motmp-index.sqlite3"
+VENV_TEMPLATES: Path = MOTMP.parent / "motmp-venvs"
+VENV_MANIFEST: str = ".motmp-manifest.json"
+DAEMON_TIMEOUT: float = 30
+# marimo prints its URL with the access token it generated at startup
+ACCESS_TOKEN_PATTERN: re.Pattern[str] = re.compile(r"[?&]access_token=([\w-]+)")
+MOTMP_DEPENDENCIES: tuple[str, ...] = (
+    "marimo[recommended]",
+    "python-lsp-server",
+    "websockets",
+    "watchdog",
+)
+
+
+def dependency_hash(dependencies: Iterable[str] = MOTMP_DEPENDENCIES) -> str:
+    """Returns a short, order-independent hash of a dependency set."""
+    return hashlib.sha256("\n".join(sorted(dependencies)).encode()).hexdigest()[:16]
+
+
+def write_venv_manifest(venv: Path, dependencies: Iterable[str]) -> None:
+    """Records a venv's dependency hash and `bin` mtime for `validate_venv`."""
+    manifest: dict[str, object] = {
+        "dependencies": dependency_hash(dependencies),
+        "bin_mtime_ns": os.stat(venv / "bin").st_mtime_ns,
+    }
+    (venv / VENV_MANIFEST).write_text(json.dumps(manifest))
+
 
-uv_cmd_prefix: tuple[str, ...] = nix_run_prefix("uv")
+def venv_manifest_valid(
+    venv: Path, dependencies: Iterable[str] = MOTMP_DEPENDENCIES
+) -> bool:
+    """Checks a venv against its manifest with one read and one stat."""
+    try:
+        manifest = json.loads((venv / VENV_MANIFEST).read_text())
+        bin_mtime_ns: int = os.stat(venv / "bin").st_mtime_ns
+    except (OSError, ValueError):
+        return False
+    return (
+        manifest.get("dependencies") == dependency_hash(dependencies)
+        and manifest.get("bin_mtime_ns") == bin_mtime_ns
+    )
+
+
+def link_or_copy(source: str, destination: str) -> None:
+    """Hardlinks a file, copying it when linking is not possible."""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def build_venv_template(
+    template: Path,
+    dependencies: Iterable[str] = MOTMP_DEPENDENCIES,
+    compile_bytecode: bool = False,
+) -> None:
+    """Builds a relocatable uv project with a MOTMP venv at `template`."""
+    uv_cmd_prefix: tuple[str, ...] = nix_exec_prefix("uv")
+    building: Path = template.with_name(f".{template.name}.{os.getpid()}")
+    building.mkdir(parents=True)
+    try:
+        subprocess.run(
+            [*uv_cmd_prefix, "init", "--bare", "--name", "motmp"],
+            check=True,
+            cwd=building,
+        )
+        subprocess.run(
+            [*uv_cmd_prefix, "venv", "--relocatable", ".venv"],
+            check=True,
+            cwd=building,
+        )
+        subprocess.run(
+            [
+                *uv_cmd_prefix,
+                "add",
+                *(("--compile-bytecode",) if compile_bytecode else ()),
+                *dependencies,
+            ],
+            check=True,
+            cwd=building,
+        )
+        write_venv_manifest(building / ".venv", dependencies)
+        building.rename(template)
+    except BaseException:
+        shutil.rmtree(building, ignore_errors=True)
+        raise
 
 
-def init_motmp() -> None:
-    """Initializes a virtual environment for MOTMP and build file structure."""
+def clone_venv_template(template: Path, directory: Path = MOTMP) -> Path:
+    """Clones a venv template into `directory` with hardlinks. Returns the venv."""
+    for project_file in ("pyproject.toml", "uv.lock"):
+        shutil.copy2(template / project_file, directory / project_file)
+    venv: Path = directory / ".venv"
+    shutil.copytree(template / ".venv", venv, symlinks=True, copy_function=link_or_copy)
+    return venv
+
+
+def init_motmp(compile_bytecode: bool = False) -> None:
+    """Initializes a virtual environment for MOTMP and build file structure.
+
+    The venv is cloned from a template keyed on the dependency set, which is
+    only built with uv the first time that set is seen.
+    """
     secho("Initializing MOTMP...", fg=colors.BRIGHT_GREEN)
     assert HOME.exists(), "Home directory does not exist."
 
@@ -34,25 +150,14 @@ def init_motmp() -> None:
 
     if not VENV.exists():
         secho(f"VENV not found at {VENV}", fg=colors.YELLOW)
-        if confirm("Create VENV?", default=True):
+        template: Path = VENV_TEMPLATES / dependency_hash()
+        if not venv_manifest_valid(template / ".venv"):
+            if not confirm("Create VENV?", default=True):
+                secho("womp womp", fg=colors.RED)
+                raise Exit(1)
+            shutil.rmtree(template, ignore_errors=True)
             try:
-                subprocess.run(
-                    [*uv_cmd_prefix, "init", "--bare", "--name", "motmp"],
-                    check=True,
-                    cwd=MOTMP,
-                )
-                subprocess.run(
-                    [
-                        *uv_cmd_prefix,
-                        "add",
-                        "marimo[recommended]",
-                        "python-lsp-server",
-                        "websockets",
-                        "watchdog",
-                    ],
-                    check=True,
-                    cwd=MOTMP,
-                )
+                build_venv_template(template, compile_bytecode=compile_bytecode)
             except subprocess.CalledProcessError as e:
                 secho(
                     f"Failed to create virtual environment: {e}",
@@ -60,76 +165,363 @@ def init_motmp() -> None:
                     err=True,
                 )
                 raise e
-        else:
-            secho("womp womp", fg=colors.RED)
-            raise Exit(1)
+        clone_venv_template(template)
+        secho(f"Cloned {template} into {VENV}", fg=colors.BRIGHT_GREEN)
     secho("🎉 Setup complete.", fg=colors.GREEN)
 
 
-def scan_motmp(directory: Path = MOTMP) -> list[tuple[Path, Path | None]]:
-    """Scans a directory for MOTMP files."""
+class MotmpRecord(NamedTuple):
+    """A MOTMP file with its creation time and marimo session file."""
+
+    path: Path
+    ctime: float
+    session: Path | None
+    size: int = 0
+    title: str = ""
+    session_size: int = 0
+
+
+# Finds the first markdown heading of a `mo.md(...)` cell
+TITLE_PATTERN: re.Pattern[str] = re.compile(
+    r"mo\.md\(\s*[rRfF]*(?:\"{3}|'{3}|\"|')\s*#{1,6}[ \t]+([^\n\"']+)"
+)
+# Renders created times in listings, compiled once for every record
+MOTMP_TIME_FORMATTER: CompiledFormatter = CompiledFormatter("%m-%d @ %I:%M %p", "UTC")
+
+# Bump when INDEX_SCHEMA changes; older indexes are rebuilt from scratch
+INDEX_VERSION: int = 2
+INDEX_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS directories (
+    directory TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    session_mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS notebooks (
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    ctime REAL NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    session TEXT,
+    session_size INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    PRIMARY KEY (directory, name)
+);
+CREATE INDEX IF NOT EXISTS notebooks_by_ctime ON notebooks (directory, ctime);
+"""
+
+
+def open_index(index_file: Path = INDEX) -> sqlite3.Connection:
+    """Opens the MOTMP index, creating it if needed."""
+    index_file.parent.mkdir(parents=True, exist_ok=True)
+    connection: sqlite3.Connection = sqlite3.connect(index_file)
+    (version,) = connection.execute("PRAGMA user_version").fetchone()
+    if version != INDEX_VERSION:
+        connection.executescript(
+            "DROP TABLE IF EXISTS notebooks; DROP TABLE IF EXISTS directories;"
+        )
+        connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    connection.executescript(INDEX_SCHEMA)
+    return connection
+
+
+def read_title(motmp_file: Path) -> str:
+    """Returns the first markdown heading of a MOTMP file or an empty string."""
+    try:
+        with open(motmp_file, encoding="utf-8", errors="replace") as f:
+            head: str = f.read(16384)
+    except OSError:
+        return ""
+    match: re.Match[str] | None = TITLE_PATTERN.search(head)
+    return match.group(1).strip() if match else ""
+
+
+def mtime_ns_or_zero(path: Path) -> int:
+    """Returns the mtime of `path` in nanoseconds, or 0 if it does not exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def stat_entries(
+    directory: Path, names: Iterable[str]
+) -> Iterator[tuple[str, str, os.stat_result]]:
+    """Yields `(name, path, stat)` for the `names` in `directory` that still exist."""
+    for name in names:
+        path: str = os.path.join(directory, name)
+        try:
+            yield name, path, os.stat(path)
+        except OSError:
+            continue
+
+
+def scan_entries(directory: Path) -> Iterator[tuple[str, str, os.stat_result]]:
+    """Yields `(name, path, stat)` for every entry of `directory`, from one listing."""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                yield entry.name, entry.path, entry.stat()
+            except OSError:
+                continue
+
+
+def refresh_index(connection: sqlite3.Connection, directory: Path) -> None:
+    """Brings the index for `directory` up to date.
+
+    While the directory and its session directory keep their recorded mtimes
+    their listings are unchanged, so only the indexed files are stat'ed again,
+    which still catches notebooks edited in place. Otherwise both are listed.
+    Either way only notebooks whose mtime or size changed are re-read.
+    """
+    key: str = str(directory.resolve())
     SESSION: Path = directory / "__marimo__" / "session"
-    motmp_files: list[tuple[Path, Path | None]] = [
-        (file, SESSION / str(file.name + ".json"))
-        if Path(SESSION / str(file.name + ".json")).exists()
-        else (file, None)
-        for file in directory.iterdir()
-        if "motmp" in file.name and file.name.endswith(".py")
+    mtime_ns: int = os.stat(directory).st_mtime_ns
+    session_mtime_ns: int = mtime_ns_or_zero(SESSION)
+    recorded: tuple[int, int] | None = connection.execute(
+        "SELECT mtime_ns, session_mtime_ns FROM directories WHERE directory = ?",
+        (key,),
+    ).fetchone()
+    known: dict[str, tuple[int, int, str | None, int]] = {
+        name: (entry_mtime_ns, size, session, session_size)
+        for name, entry_mtime_ns, size, session, session_size in connection.execute(
+            "SELECT name, mtime_ns, size, session, session_size FROM notebooks "
+            "WHERE directory = ?",
+            (key,),
+        )
+    }
+
+    listed: bool = recorded == (mtime_ns, session_mtime_ns)
+    notebooks: Iterator[tuple[str, str, os.stat_result]] = (
+        stat_entries(directory, known) if listed else scan_entries(directory)
+    )
+    try:
+        session_entries: Iterator[tuple[str, str, os.stat_result]] = (
+            stat_entries(SESSION, [name + ".json" for name in known])
+            if listed
+            else scan_entries(SESSION)
+        )
+        sessions: dict[str, int] = {
+            name: stat.st_size for name, _, stat in session_entries
+        }
+    except OSError:
+        sessions = {}
+
+    seen: set[str] = set()
+    changed: list[tuple[str, str, float, int, int, str | None, int, str]] = []
+    sessions_changed: list[tuple[str | None, int, str, str]] = []
+    for name, path, stat in notebooks:
+        if "motmp" not in name or not name.endswith(".py"):
+            continue
+        seen.add(name)
+        session_name: str = name + ".json"
+        session: str | None = (
+            str(SESSION / session_name) if session_name in sessions else None
+        )
+        session_size: int = sessions.get(session_name, 0)
+        previous: tuple[int, int, str | None, int] | None = known.get(name)
+        if previous is not None and previous[:2] == (stat.st_mtime_ns, stat.st_size):
+            if previous[2:] != (session, session_size):
+                sessions_changed.append((session, session_size, key, name))
+            continue
+        changed.append(
+            (
+                key,
+                name,
+                stat.st_ctime,
+                stat.st_mtime_ns,
+                stat.st_size,
+                session,
+                session_size,
+                read_title(Path(path)),
+            )
+        )
+
+    now_ns: int = time.time_ns()
+    if now_ns - max(mtime_ns, session_mtime_ns) < RACY_MTIME_NS:
+        mtime_ns = session_mtime_ns = -1
+    with connection:
+        connection.executemany(
+            "INSERT OR REPLACE INTO notebooks VALUES (?, ?, ?, ?, ?, ?, ?, ?)", changed
+        )
+        connection.executemany(
+            "UPDATE notebooks SET session = ?, session_size = ? "
+            "WHERE directory = ? AND name = ?",
+            sessions_changed,
+        )
+        connection.executemany(
+            "DELETE FROM notebooks WHERE directory = ? AND name = ?",
+            [(key, name) for name in known.keys() - seen],
+        )
+        connection.execute(
+            "INSERT OR REPLACE INTO directories VALUES (?, ?, ?)",
+            (key, mtime_ns, session_mtime_ns),
+        )
+
+
+def query_index(
+    connection: sqlite3.Connection,
+    directory: Path,
+    where: str = "",
+    parameters: tuple[object, ...] = (),
+    newest_first: bool = True,
+    limit: int = -1,
+    offset: int = 0,
+) -> list[MotmpRecord]:
+    """Returns indexed MOTMP files for `directory` ordered by created time."""
+    order: str = "DESC" if newest_first else "ASC"
+    rows = connection.execute(
+        "SELECT name, ctime, session, size, title, session_size FROM notebooks "
+        f"WHERE directory = ? {where} ORDER BY ctime {order} LIMIT ? OFFSET ?",
+        (str(directory.resolve()), *parameters, limit, offset),
+    )
+    return [
+        MotmpRecord(
+            directory / name,
+            ctime,
+            Path(session) if session else None,
+            size,
+            title,
+            session_size,
+        )
+        for name, ctime, session, size, title, session_size in rows
     ]
-    return motmp_files
+
+
+def scan_motmp(directory: Path = MOTMP, index_file: Path = INDEX) -> list[MotmpRecord]:
+    """Scans a directory for MOTMP files, newest first."""
+    with closing(open_index(index_file)) as connection:
+        refresh_index(connection, directory)
+        return query_index(connection, directory)
+
+
+def search_motmp(
+    directory: Path, text: str, index_file: Path = INDEX
+) -> list[MotmpRecord]:
+    """Returns MOTMP files whose name or title contains `text`, newest first."""
+    escaped: str = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    pattern: str = f"%{escaped}%"
+    with closing(open_index(index_file)) as connection:
+        refresh_index(connection, directory)
+        return query_index(
+            connection,
+            directory,
+            "AND (title LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\')",
+            (pattern, pattern),
+        )
 
 
 def sort_motmp_files(
-    motmp_files: Iterable[tuple[Path, Path | None]], reverse: bool = True
+    motmp_files: Iterable[MotmpRecord], reverse: bool = True
 ) -> dict[str, str]:
     """Sorts MOTMP files by created time."""
+    records: list[MotmpRecord] = sorted(
+        motmp_files, key=attrgetter("ctime"), reverse=reverse
+    )
+    created: list[str] = MOTMP_TIME_FORMATTER.format_many(
+        record.ctime for record in records
+    )
     return {
-        str(file.stem): datetime.fromtimestamp(
-            file.stat().st_ctime, tz=timezone.utc
-        ).strftime("%m-%d @ %I:%M %p")
-        for file, session_file in sorted(
-            motmp_files, key=lambda x: x[0].stat().st_ctime, reverse=reverse
-        )
+        str(record.path.stem): stamp + (f" | {record.title}" if record.title else "")
+        for record, stamp in zip(records, created)
     }
 
 
-def get_previous_file(destination: Path, index: int) -> Path:
+def get_previous_file(destination: Path, index: int, index_file: Path = INDEX) -> Path:
     """Returns the previous file in the directory."""
     assert destination.exists(), "Destination not found."
     assert destination.is_dir(), "Destination must be a directory."
-    motmp_files: list[tuple[Path, Path | None]] = scan_motmp(destination)
-    if len(motmp_files) > 0:
-        previous_files: list[tuple[Path, Path | None]] = sorted(
-            motmp_files, key=lambda x: x[0].stat().st_ctime, reverse=True
-        )
-        try:
-            previous_file: Path = previous_files[index][0]
-            return previous_file
-        except IndexError:
+    with closing(open_index(index_file)) as connection:
+        refresh_index(connection, destination)
+        (count,) = connection.execute(
+            "SELECT COUNT(*) FROM notebooks WHERE directory = ?",
+            (str(destination.resolve()),),
+        ).fetchone()
+        if count == 0:
+            secho("🔎 Found no MOTMP files.", fg=colors.YELLOW)
+            raise Exit(0)
+        if not -count <= index < count:
             secho(
-                f"🚨 Index out of range. Choose a number between 0 and {len(previous_files) - 1}. Or use `-1` for the oldest.",
+                f"🚨 Index out of range. Choose a number between 0 and {count - 1}. Or use `-1` for the oldest.",
                 fg=colors.RED,
             )
             raise Exit(1)
-    else:
-        secho("🔎 Found no MOTMP files.", fg=colors.YELLOW)
-        raise Exit(0)
+        (previous_file,) = query_index(
+            connection,
+            destination,
+            newest_first=index >= 0,
+            limit=1,
+            offset=index if index >= 0 else -index - 1,
+        )
+    return previous_file.path
+
+
+def select_expired(
+    motmp_files: Iterable[MotmpRecord],
+    older_than: float | None = None,
+    keep_last: int | None = None,
+    max_total_size: int | None = None,
+    now: float | None = None,
+) -> list[MotmpRecord]:
+    """Returns the MOTMP files that fall outside a retention policy.
+
+    A file is kept only while it is younger than `older_than` seconds, among
+    the newest `keep_last` files and within the newest files that fit in
+    `max_total_size` bytes, counting session files. Unset limits are ignored.
+    """
+    now = time.time() if now is None else now
+    expired: list[MotmpRecord] = []
+    total_size: int = 0
+    for position, record in enumerate(
+        sorted(motmp_files, key=attrgetter("ctime"), reverse=True)
+    ):
+        total_size += record.size + record.session_size
+        if (
+            (older_than is not None and now - record.ctime > older_than)
+            or (keep_last is not None and position >= keep_last)
+            or (max_total_size is not None and total_size > max_total_size)
+        ):
+            expired.append(record)
+    return expired
 
 
-def wipe_motmp(motmp_files: Iterable[tuple[Path, Path | None]]) -> None:
-    """Wipes a directory of MOTMP files."""
-    for motmp_file, session_file in motmp_files:
-        try:
-            motmp_file.unlink()
-        except Exception as e:
-            secho(f"Failed to wipe {motmp_file}: {e}", fg=colors.RED, err=True)
-            pass
-        try:
-            if session_file:
-                session_file.unlink()
-        except Exception as e:
-            secho(f"Failed to wipe {session_file}: {e}", fg=colors.RED, err=True)
-            pass
+def wipe_batch(motmp_files: list[MotmpRecord]) -> tuple[int, list[str]]:
+    """Unlinks a batch of MOTMP files and their sessions.
+
+    Returns the bytes reclaimed and an error message per failed unlink.
+    """
+    reclaimed: int = 0
+    errors: list[str] = []
+    for record in motmp_files:
+        for path, size in (
+            (record.path, record.size),
+            (record.session, record.session_size),
+        ):
+            if path is None:
+                continue
+            try:
+                path.unlink()
+                reclaimed += size
+            except OSError as e:
+                errors.append(f"Failed to wipe {path}: {e}")
+    return reclaimed, errors
+
+
+def wipe_motmp(
+    motmp_files: Iterable[MotmpRecord], batch_size: int = 256, workers: int = 16
+) -> int:
+    """Wipes MOTMP files in batches across a thread pool. Returns bytes reclaimed."""
+    records: list[MotmpRecord] = list(motmp_files)
+    batches: list[list[MotmpRecord]] = [
+        records[i : i + batch_size] for i in range(0, len(records), batch_size)
+    ]
+    reclaimed: int = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch_reclaimed, errors in pool.map(wipe_batch, batches):
+            reclaimed += batch_reclaimed
+            for error in errors:
+                secho(error, fg=colors.RED, err=True)
+    return reclaimed
 
 
 def create_motmp(directory: Path = MOTMP) -> Path:
@@ -164,6 +556,156 @@ def launch_motmp(motmp_file: Path, venv: Path = VENV) -> Never:
         raise e
 
 
+def open_private(path: Path) -> int:
+    """Opens `path` for writing, truncated and readable only by the current user."""
+    fd: int = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    # The mode only applies to new files
+    os.fchmod(fd, 0o600)
+    return fd
+
+
+def daemon_state_file(venv: Path) -> Path:
+    """Returns the pidfile of the marimo server for `venv`."""
+    key: str = hashlib.sha256(str(venv.resolve()).encode()).hexdigest()[:12]
+    return MOTMP / f".motmp-daemon-{key}.json"
+
+
+def port_open(port: int, timeout: float = 0.2) -> bool:
+    """Returns True if something accepts connections on localhost:`port`."""
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def wait_for_port(port: int, pid: int, timeout: float = DAEMON_TIMEOUT) -> bool:
+    """Waits for process `pid` to accept connections on `port`.
+
+    Returns False if the process exits or the timeout passes first.
+    """
+    deadline: float = time.monotonic() + timeout
+    while not port_open(port):
+        try:
+            os.kill(pid, 0)
+        except OSError:
+            return False
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def read_daemon(venv: Path) -> dict[str, Any] | None:
+    """Returns the state of the marimo server for `venv` while its process lives.
+
+    The server may still be starting or may hang, so callers check its port
+    with `wait_for_port` before using it. Stale pidfiles left behind by dead
+    servers are removed.
+    """
+    state_file: Path = daemon_state_file(venv)
+    try:
+        state: dict[str, Any] = json.loads(state_file.read_text())
+        os.kill(state["pid"], 0)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError):
+        state_file.unlink(missing_ok=True)
+        return None
+    return state
+
+
+def start_daemon(
+    venv: Path, directory: Path = MOTMP, timeout: float = DAEMON_TIMEOUT
+) -> dict[str, Any]:
+    """Starts a headless marimo server for `directory` in the background.
+
+    The server listens on localhost with marimo's token authentication, so
+    other local users cannot use it. Its token is read from the log, which
+    like the pidfile only the current user can read, and never appears on
+    a command line.
+    """
+    marimo_executable: Path = venv / "bin" / "marimo"
+    if not marimo_executable.exists():
+        raise FileNotFoundError(f"marimo not found in {venv}")
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port: int = probe.getsockname()[1]
+
+    state_file: Path = daemon_state_file(venv)
+    log_file: Path = state_file.with_suffix(".log")
+    with os.fdopen(open_private(log_file), "wb") as log:
+        process: subprocess.Popen[bytes] = subprocess.Popen(
+            [
+                str(marimo_executable),
+                "edit",
+                str(directory),
+                "--headless",
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(port),
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+    state: dict[str, Any] = {
+        "pid": process.pid,
+        "port": port,
+        "venv": str(venv),
+        "directory": str(directory.resolve()),
+    }
+    with os.fdopen(open_private(state_file), "w") as f:
+        f.write(json.dumps(state))
+
+    deadline: float = time.monotonic() + timeout
+    token: str | None = None
+    while True:
+        if token is None:
+            match: re.Match[str] | None = ACCESS_TOKEN_PATTERN.search(
+                log_file.read_text(errors="replace")
+            )
+            token = match.group(1) if match else None
+        if token is not None and port_open(port):
+            break
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            state_file.unlink(missing_ok=True)
+            raise RuntimeError(f"marimo server failed to start, see {log_file}")
+        time.sleep(0.05)
+    state["token"] = token
+    with os.fdopen(open_private(state_file), "w") as f:
+        f.write(json.dumps(state))
+    return state
+
+
+def stop_daemon(venv: Path) -> bool:
+    """Stops the marimo server for `venv`. Returns False if none was running."""
+    state: dict[str, Any] | None = read_daemon(venv)
+    if state is None:
+        return False
+    try:
+        os.killpg(state["pid"], signal.SIGTERM)
+    except OSError:
+        pass
+    daemon_state_file(venv).unlink(missing_ok=True)
+    return True
+
+
+def daemon_url(state: dict[str, Any], motmp_file: Path) -> str | None:
+    """Returns the URL of `motmp_file` in a running server, if it serves it."""
+    try:
+        relative: Path = motmp_file.resolve().relative_to(state["directory"])
+    except ValueError:
+        return None
+    url: str = f"http://127.0.0.1:{state['port']}/?file={quote(str(relative))}"
+    if state.get("token"):
+        url += f"&access_token={quote(state['token'])}"
+    return url
+
+
 def validate_motmp_file(destination: Path) -> Path:
     """Validates a MOTMP file. Returns the validated file path."""
     assert destination.exists(), "Destination not found."
@@ -176,9 +718,16 @@ def validate_motmp_file(destination: Path) -> Path:
         raise ValueError("Destination must be a file or directory.")
 
 
-def validate_venv(venv: Path, post_init: bool = False) -> Path:
-    """Validates a virtual environment. Returns the validated virtual environment path or None."""
+def validate_venv(
+    venv: Path, post_init: bool = False, compile_bytecode: bool = False
+) -> Path:
+    """Validates a virtual environment. Returns the validated virtual environment path or None.
+
+    `compile_bytecode` is passed on to `init_motmp` when the venv is rebuilt.
+    """
     result: Path = venv if venv.exists() else VENV
+    if venv_manifest_valid(result):
+        return result
     try:
         assert result.exists(), f"🚨 Virtual environment not found at {venv}"
         assert result.is_dir(), f"🚨 Virtual environment is not a directory at {venv}"
@@ -193,8 +742,8 @@ def validate_venv(venv: Path, post_init: bool = False) -> Path:
             confirm("Invaild `.venv`. Create a new one?", default=True)
             and not post_init
         ):
-            init_motmp()
-            validate_venv(venv, post_init=True)
+            init_motmp(compile_bytecode=compile_bytecode)
+            validate_venv(venv, post_init=True, compile_bytecode=compile_bytecode)
         else:
             secho(f"🚨 Invalid virtual environment at {venv}\n{e}", fg=colors.RED)
             raise Exit(1)
@@ -218,34 +767,100 @@ def motmp(
         None,
         help="Launch the previous MOTMP file by index ordered by creation time. Use `0` for the newest and `-1` for the oldest.",
     ),
+    search: str = Option(
+        None, help="List MOTMP files whose name or first heading contains TEXT."
+    ),
+    older_than: str = Option(
+        None,
+        help="Wipe files older than this age, e.g. `30d` or `12h`. Implies --scan.",
+    ),
+    keep_last: int = Option(
+        None, help="Wipe all but the newest N files. Implies --scan.", min=0
+    ),
+    max_total_size: str = Option(
+        None,
+        help="Wipe the oldest files beyond this total size, e.g. `500M`. Implies --scan.",
+    ),
+    dry_run: bool = Option(
+        False, help="Report what would be wiped without deleting. Implies --scan."
+    ),
+    compile_bytecode: bool = Option(
+        False, help="Precompile bytecode when building the MOTMP venv template."
+    ),
+    daemon: bool = Option(
+        False,
+        help=f"Open notebooks in one long-lived marimo server per venv serving `{MOTMP}`.",
+    ),
+    stop_daemon_: bool = Option(
+        False, "--stop-daemon", help="Stop the marimo server for the venv and exit."
+    ),
 ) -> Never:
     """Create and edit temp marimo notebooks."""
     # Try initializing MOTMP
     if not MOTMP.exists():
-        init_motmp()
+        init_motmp(compile_bytecode=compile_bytecode)
 
     # Sanity checks
     CWD: Path = Path.cwd()
     assert CWD.exists(), f"🚨 Current working directory not found at {CWD}"
     assert destination.exists(), f"Destination not found. {destination}"
 
+    # Retention options only apply to a scan
+    retention: bool = (
+        older_than is not None or keep_last is not None or max_total_size is not None
+    )
+    scan = scan or retention or dry_run
+
     # Scan for MOTMP files
     if scan and destination.is_dir():
-        motmp_files: list[tuple[Path, Path | None]] = scan_motmp(destination)
+        motmp_files: list[MotmpRecord] = scan_motmp(destination)
         if len(motmp_files) > 0:
             secho(f"🔎 Found {len(motmp_files)} MOTMP files.", fg=colors.YELLOW)
         else:
             secho("🔎 Found no MOTMP files.", fg=colors.YELLOW)
             raise Exit(0)
         print(sort_motmp_files(motmp_files))
+
+        if retention:
+            try:
+                motmp_files = select_expired(
+                    motmp_files,
+                    older_than=parse_duration(older_than) if older_than else None,
+                    keep_last=keep_last,
+                    max_total_size=(
+                        parse_size(max_total_size) if max_total_size else None
+                    ),
+                )
+            except ValueError as e:
+                secho(f"🚨 {e}", fg=colors.RED)
+                raise Exit(1)
+        reclaimable: int = sum(r.size + r.session_size for r in motmp_files)
+        secho(
+            f"🧹 {len(motmp_files)} MOTMP files to wipe, reclaiming {format_size(reclaimable)}.",
+            fg=colors.YELLOW,
+        )
+        if dry_run or len(motmp_files) == 0:
+            raise Exit(0)
         if confirm("🗑️ Wipe files?", default=False):
-            wipe_motmp(motmp_files)
+            reclaimed: int = wipe_motmp(motmp_files)
+            secho(f"🗑️ Reclaimed {format_size(reclaimed)}.", fg=colors.GREEN)
 
         raise Exit(0)
     elif scan and destination.is_file():
         secho("🚨 Cannot scan a file. Please specify a directory.", fg=colors.RED)
         raise Exit(1)
 
+    # Search indexed MOTMP files
+    if search is not None:
+        if not destination.is_dir():
+            secho("🚨 Cannot search a file. Please specify a directory.", fg=colors.RED)
+            raise Exit(1)
+        motmp_files = search_motmp(destination, search)
+        secho(f"🔎 Found {len(motmp_files)} matching MOTMP files.", fg=colors.YELLOW)
+        if len(motmp_files) > 0:
+            print(sort_motmp_files(motmp_files))
+        raise Exit(0)
+
     # Validate venv
     if venv is None:
         # Attempt to find a virtual environment
@@ -256,12 +871,19 @@ def motmp(
                 else venv
             )
     try:
-        venv = validate_venv(venv)
+        venv = validate_venv(venv, compile_bytecode=compile_bytecode)
     except Exception:
         venv = VENV
     assert venv.exists(), "Failed to find virtual environment."
     secho(f"Using venv=`{str(venv)}`", fg=colors.BRIGHT_MAGENTA)
 
+    if stop_daemon_:
+        if stop_daemon(venv):
+            secho("🛑 Stopped marimo server.", fg=colors.GREEN)
+        else:
+            secho("No marimo server running.", fg=colors.YELLOW)
+        raise Exit(0)
+
     # Resolve previous file or create new file
     if prev is not None:
         motmp_file: Path = get_previous_file(destination, prev)
@@ -270,6 +892,36 @@ def motmp(
 
     # Launch MOTMP file
     assert motmp_file.exists(), "Failed to create MOTMP file."
+
+    # Reuse a running marimo server, starting one with --daemon
+    state: dict[str, Any] | None = read_daemon(venv)
+    if state is None and daemon:
+        secho("🛰️ Starting marimo server...", fg=colors.BRIGHT_GREEN)
+        state = start_daemon(venv)
+    url: str | None = None
+    if state is not None:
+        url = daemon_url(state, motmp_file)
+    if (
+        state is not None
+        and url is not None
+        and not wait_for_port(state["port"], state["pid"])
+    ):
+        secho(
+            "🚨 marimo server is not answering, launching directly. "
+            "Use --stop-daemon to stop it.",
+            fg=colors.YELLOW,
+        )
+        url = None
+    elif url is not None:
+        secho(f"🚀 Opening {motmp_file} in {url}", fg=colors.BRIGHT_GREEN)
+        webbrowser.open(url)
+        raise Exit(0)
+    elif daemon:
+        secho(
+            f"🚨 {motmp_file} is outside {MOTMP}, launching it directly.",
+            fg=colors.YELLOW,
+        )
+
     try:
         secho(f"🚀 Launching {motmp_file}", fg=colors.BRIGHT_GREEN)
         launch_motmp(motmp_file, venv)
@@ -2,63 +2,376 @@
 
 # Standard Library
 import os
+import json
+import time
+import random
+import hashlib
 from pathlib import Path
+from typing import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 
 # Third Party
-from typer import Argument, Option, Typer, colors, prompt, secho
+from typer import Argument, Exit, Option, Typer, colors, prompt, secho
 from rich import print
 
 # My Imports
-from moscripts.utilities import nix_run_prefix
+from moscripts.utilities import CACHE_DIR, RACY_MTIME_NS, nix_exec_prefix, write_atomic
 
 # Globals
 HOME: Path = Path.home()
 PLAYLISTS: Path = HOME / "Music" / "Playlists"
-
-assert PLAYLISTS.exists(), (
-    "Playlists directory does not exist. Please create it at `~/Music/Playlists`."
-)
-assert PLAYLISTS.is_dir(), (
-    "Playlists directory is not a directory. Please create it at `~/Music/Playlists`."
+CATALOG_CACHE: Path = CACHE_DIR / "playlists.json"
+TRACKS_CACHE: Path = CACHE_DIR / "playlist-tracks"
+QUEUES: Path = CACHE_DIR / "playlist-queues"
+MEDIA_SUFFIXES: frozenset[str] = frozenset(
+    {
+        ".aac",
+        ".aiff",
+        ".alac",
+        ".flac",
+        ".m4a",
+        ".mka",
+        ".mp3",
+        ".mp4",
+        ".oga",
+        ".ogg",
+        ".opus",
+        ".wav",
+        ".webm",
+        ".wma",
+    }
 )
 
-playlists: list[Path] = list(PLAYLISTS.iterdir())
-assert len(playlists) > 0, (
-    "No playlists found. Please create at least one playlist in `~/Music/Playlists`."
-)
+
+def fuzzy_match(query: str, candidate: str) -> bool:
+    """Returns True if the characters of `query` appear in order in `candidate`."""
+    position: int = 0
+    for char in query:
+        position = candidate.find(char, position) + 1
+        if position == 0:
+            return False
+    return True
+
+
+class PlaylistCatalog:
+    """A lazily loaded listing of a playlists directory.
+
+    Nothing is read until the catalog is first used. The listing is cached
+    on disk and reused while the directory keeps the same mtime.
+    """
+
+    def __init__(
+        self, directory: Path = PLAYLISTS, cache_file: Path = CATALOG_CACHE
+    ) -> None:
+        self.directory: Path = directory
+        self.cache_file: Path = cache_file
+        self._names: list[str] | None = None
+        self._lowered: list[str] = []
+
+    def scan(self) -> Iterator[str]:
+        """Streams playlist names straight from the directory."""
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.startswith("."):
+                    yield entry.name
+
+    def load(self) -> list[str]:
+        """Returns playlist names, from the cache when the directory is unchanged."""
+        if self._names is not None:
+            return self._names
+        assert self.directory.is_dir(), (
+            f"Playlists directory does not exist. Please create it at `{self.directory}`."
+        )
+        mtime_ns: int = os.stat(self.directory).st_mtime_ns
+        try:
+            cached = json.loads(self.cache_file.read_text())
+            if (
+                cached["directory"] == str(self.directory)
+                and cached["mtime_ns"] == mtime_ns
+            ):
+                self._names = list(cached["names"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        if self._names is None:
+            self._names = sorted(self.scan())
+            write_atomic(
+                self.cache_file,
+                json.dumps(
+                    {
+                        "directory": str(self.directory),
+                        "mtime_ns": (
+                            -1
+                            if time.time_ns() - mtime_ns < RACY_MTIME_NS
+                            else mtime_ns
+                        ),
+                        "names": self._names,
+                    }
+                ),
+            )
+        self._lowered = [name.lower() for name in self._names]
+        return self._names
+
+    def __len__(self) -> int:
+        return len(self.load())
+
+    def __getitem__(self, index: int) -> Path:
+        return self.directory / self.load()[index]
+
+    def __contains__(self, playlist: Path) -> bool:
+        return playlist.parent == self.directory and playlist.name in self.load()
+
+    def filter(self, query: str) -> list[int]:
+        """Returns indexes of playlists fuzzily matching `query`.
+
+        Substring matches come before in-order character matches.
+        """
+        self.load()
+        needle: str = query.lower()
+        substring: list[int] = []
+        fuzzy: list[int] = []
+        for i, name in enumerate(self._lowered):
+            if needle in name:
+                substring.append(i)
+            elif fuzzy_match(needle, name):
+                fuzzy.append(i)
+        return substring + fuzzy
+
+    def resolve(self, playlist: Path | None) -> Path:
+        """Resolves a playlist name or path, defaulting to the first playlist."""
+        if playlist is None:
+            assert len(self) > 0, (
+                f"No playlists found. Please create at least one playlist in `{self.directory}`."
+            )
+            return self[0]
+        if not playlist.is_absolute() and len(playlist.parts) == 1:
+            playlist = self.directory / playlist
+        return playlist
+
+
+def is_url(track: str) -> bool:
+    """Returns True for stream URLs that mpv resolves itself."""
+    return "://" in track
+
+
+def resolve_track(track: str, base: Path) -> str:
+    """Resolves a playlist entry relative to the playlist's directory."""
+    if is_url(track) or os.path.isabs(track):
+        return track
+    return os.path.normpath(base / track)
+
+
+def parse_m3u(playlist: Path) -> list[str]:
+    """Returns the entries of an M3U/M3U8 playlist."""
+    with open(playlist, encoding="utf-8", errors="replace") as f:
+        return [
+            resolve_track(line, playlist.parent)
+            for line in (raw.strip() for raw in f)
+            if line and not line.startswith("#")
+        ]
+
+
+def parse_pls(playlist: Path) -> list[str]:
+    """Returns the entries of a PLS playlist in `FileN` order."""
+    entries: dict[int, str] = {}
+    with open(playlist, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            key, _, value = line.strip().partition("=")
+            if key.lower().startswith("file") and key[4:].isdigit() and value:
+                entries[int(key[4:])] = resolve_track(value, playlist.parent)
+    return [entries[number] for number in sorted(entries)]
+
+
+def walk_media(directory: str) -> tuple[list[str], dict[str, int]]:
+    """Returns the sorted media files below `directory` and the mtimes of its directories."""
+    tracks: list[str] = []
+    mtimes: dict[str, int] = {}
+    for root, _, names in os.walk(directory):
+        mtimes[root] = os.stat(root).st_mtime_ns
+        tracks.extend(
+            os.path.join(root, name)
+            for name in names
+            if os.path.splitext(name)[1].lower() in MEDIA_SUFFIXES
+        )
+    return sorted(tracks), mtimes
+
+
+def parse_directory(
+    playlist: Path, pool: ThreadPoolExecutor
+) -> tuple[list[str], dict[str, int]]:
+    """Returns media files in a directory playlist, walking subdirectories in parallel.
+
+    Also returns the mtimes of every directory walked, which change whenever
+    an entry is added to or removed from one of them.
+    """
+    tracks: list[str] = []
+    subdirectories: list[str] = []
+    mtimes: dict[str, int] = {str(playlist): os.stat(playlist).st_mtime_ns}
+    with os.scandir(playlist) as entries:
+        for entry in sorted(entries, key=lambda entry: entry.name):
+            if entry.is_dir():
+                subdirectories.append(entry.path)
+            elif os.path.splitext(entry.name)[1].lower() in MEDIA_SUFFIXES:
+                tracks.append(entry.path)
+    for nested, nested_mtimes in pool.map(walk_media, subdirectories):
+        tracks.extend(nested)
+        mtimes.update(nested_mtimes)
+    return tracks, mtimes
+
+
+def parse_playlist(
+    playlist: Path, pool: ThreadPoolExecutor
+) -> tuple[list[str], dict[str, int]]:
+    """Returns the entries of a directory, M3U or PLS playlist.
+
+    Also returns the mtimes of the files or directories the entries were read
+    from, for `index_playlist` to check its cache against.
+    """
+    if playlist.is_dir():
+        return parse_directory(playlist, pool)
+    mtimes: dict[str, int] = {str(playlist): os.stat(playlist).st_mtime_ns}
+    suffix: str = playlist.suffix.lower()
+    if suffix in (".m3u", ".m3u8"):
+        return parse_m3u(playlist), mtimes
+    if suffix == ".pls":
+        return parse_pls(playlist), mtimes
+    return [str(playlist)], mtimes
+
+
+def track_exists(track: str) -> bool:
+    """Returns True if a track can be played, without touching stream URLs."""
+    return is_url(track) or os.path.isfile(track)
+
+
+def validate_tracks(tracks: Iterable[str], pool: ThreadPoolExecutor) -> list[str]:
+    """Drops missing tracks, statting them in parallel so slow mounts overlap."""
+    tracks = list(tracks)
+    return [
+        track for track, exists in zip(tracks, pool.map(track_exists, tracks)) if exists
+    ]
+
+
+def cache_name(playlist: Path) -> str:
+    """Returns a short, stable file name stem for per-playlist cache files."""
+    return hashlib.sha256(str(playlist).encode()).hexdigest()[:16]
+
+
+def mtimes_unchanged(mtimes: dict[str, int]) -> bool:
+    """Returns True if every path in `mtimes` still has its recorded mtime."""
+    try:
+        return all(os.stat(path).st_mtime_ns == mtime for path, mtime in mtimes.items())
+    except OSError:
+        return False
+
+
+def index_playlist(
+    playlist: Path, cache_dir: Path = TRACKS_CACHE, workers: int = 32
+) -> list[str]:
+    """Returns the playable tracks of a playlist.
+
+    The entries of a playlist are cached and reused while the playlist file,
+    or every directory of a directory playlist, keeps the same mtime. Tracks
+    are checked for existence on every call, so missing files drop out and
+    returning ones come back.
+    """
+    cache_file: Path = cache_dir / f"{cache_name(playlist)}.json"
+    entries: list[str] | None = None
+    try:
+        cached = json.loads(cache_file.read_text())
+        if cached["playlist"] == str(playlist) and mtimes_unchanged(cached["mtimes"]):
+            entries = list(cached["entries"])
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if entries is None:
+            entries, mtimes = parse_playlist(playlist, pool)
+            if time.time_ns() - max(mtimes.values()) < RACY_MTIME_NS:
+                mtimes = {path: -1 for path in mtimes}
+            write_atomic(
+                cache_file,
+                json.dumps(
+                    {"playlist": str(playlist), "mtimes": mtimes, "entries": entries}
+                ),
+            )
+        return validate_tracks(entries, pool)
+
+
+def write_queue(
+    playlist: Path, tracks: list[str], shuffle: bool, queue_dir: Path = QUEUES
+) -> Path:
+    """Writes tracks to the M3U queue for mpv, shuffled if requested.
+
+    Each playlist has one queue file, overwritten on every launch, as mpv
+    replaces this process and nothing is left to clean up after it.
+    """
+    if shuffle:
+        tracks = random.sample(tracks, len(tracks))
+    queue: Path = queue_dir / f"{cache_name(playlist)}.m3u"
+    write_atomic(queue, "".join(["#EXTM3U\n", *(f"{track}\n" for track in tracks)]))
+    return queue
+
+
+catalog: PlaylistCatalog = PlaylistCatalog()
 
 app: Typer = Typer(add_completion=False)
 
 
 @app.command()
 def mpv_playlists(
-    playlist: Path = Argument(playlists[0], help="Playlist name."),
+    playlist: Path = Argument(
+        None, help=f"Playlist name or path. Defaults to the first in `{PLAYLISTS}`."
+    ),
     scan: bool = Option(False, help="Scan the directory for playlists."),
+    filter: str = Option(
+        None, "--filter", "-f", help="With --scan, only list playlists matching TEXT."
+    ),
     shuffle: bool = Option(True, help="Shuffle the playlist."),
+    validate: bool = Option(
+        True,
+        help="Index the playlist and drop missing tracks before handing it to mpv.",
+    ),
 ) -> None:
     """Launches mpv with a playlist."""
     if scan:
-        secho(f"🔎 Found {len(playlists)} Playlists.", fg=colors.BRIGHT_CYAN)
+        indexes: list[int] = (
+            catalog.filter(filter) if filter else list(range(len(catalog)))
+        )
+        if len(indexes) == 0:
+            secho("🔎 Found no matching Playlists.", fg=colors.YELLOW)
+            raise Exit(0)
+        secho(f"🔎 Found {len(indexes)} Playlists.", fg=colors.BRIGHT_CYAN)
+        names: list[str] = catalog.load()
         choices: list[tuple[int, str]] = [
-            (i, str(playlist.stem)) for i, playlist in enumerate(playlists)
+            (choice, Path(names[i]).stem) for choice, i in enumerate(indexes)
         ]
         print(choices)
         index = prompt("Select a playlist to launch", type=int, default=0)
-        playlist = playlists[index]
+        playlist = catalog[indexes[index]]
 
-    assert playlist in playlists, "Playlist not found."
+    playlist = catalog.resolve(playlist)
+    assert playlist in catalog, "Playlist not found."
 
     secho(f"🎵 Launching {playlist}", fg=colors.BRIGHT_GREEN)
-    mpv_cmd_prefix: tuple[str, ...] = nix_run_prefix("mpv")
+    target: Path = playlist
+    if validate:
+        tracks: list[str] = index_playlist(playlist)
+        if len(tracks) == 0:
+            secho(f"🚨 No playable tracks in {playlist}.", fg=colors.RED)
+            raise Exit(1)
+        secho(f"🎶 {len(tracks)} playable tracks.", fg=colors.BRIGHT_CYAN)
+        # The queue is pre-shuffled, so mpv does not need to shuffle it again.
+        target = write_queue(playlist, tracks, shuffle)
+    mpv_cmd_prefix: tuple[str, ...] = nix_exec_prefix("mpv")
     mpv_cmd_options: tuple[str, ...] = (
         ("--loop-playlist", "--no-video", "--shuffle")
-        if shuffle
+        if shuffle and not validate
         else ("--loop-playlist", "--no-video")
     )
     cmd: tuple[str, ...] = (
         *mpv_cmd_prefix,
         *mpv_cmd_options,
-        str(playlist),
+        str(target),
     )
     print(cmd)
     try:
@@ -233,19 +233,36 @@
             '';
           };
 
+        # Pins the nixpkgs revision used to key the moscripts store path cache
+        nixpkgsRev = nixpkgs.rev or "unpinned";
+
         # Helper to create executable apps (for apps that need moscripts venv)
         makeAppExecutable = appName: appPath:
           pkgs.stdenv.mkDerivation {
             name = "${appName}-in-bin";
             buildCommand = ''
-              mkdir -p $out/bin
-              cp ${appPath} $out/bin/${appName}
-              chmod +x $out/bin/${appName}
-              patchShebangs $out/bin/${appName}
+              mkdir -p $out/bin $out/libexec
+              cp ${appPath} $out/libexec/${appName}
+              chmod +x $out/libexec/${appName}
+              patchShebangs $out/libexec/${appName}
+              makeWrapper $out/libexec/${appName} $out/bin/${appName} \
+                --set-default MOSCRIPTS_NIXPKGS_REV ${nixpkgsRev}
             '';
+            nativeBuildInputs = [pkgs.makeWrapper];
             buildInputs = [venv];
           };
 
+        # The `moscripts` maintenance CLI from the venv (e.g. `moscripts cache warm`)
+        cliPackage = pkgs.stdenv.mkDerivation {
+          name = "moscripts-cli-in-bin";
+          buildCommand = ''
+            mkdir -p $out/bin
+            makeWrapper ${venv}/bin/moscripts $out/bin/moscripts \
+              --set-default MOSCRIPTS_NIXPKGS_REV ${nixpkgsRev}
+          '';
+          nativeBuildInputs = [pkgs.makeWrapper];
+        };
+
         # Helper to create docker images for standalone scripts
         makeDockerImage = scriptName: scriptDrv:
           pkgs.dockerTools.buildLayeredImage {
@@ -315,7 +332,7 @@
         # Create a default package that bundles all binary packages
         default = pkgs.symlinkJoin {
           name = "moscripts-bundled-apps";
-          paths = lib.attrValues standaloneBinaryPackages ++ lib.attrValues appBinaryPackages;
+          paths = lib.attrValues standaloneBinaryPackages ++ lib.attrValues appBinaryPackages ++ [cliPackage];
           meta = {
             description = "Bundled moscripts applications and scripts";
             longDescription = "A collection of Python scripts from the apps and scripts directories, packaged as executable binaries";
@@ -324,6 +341,7 @@
       in
         {
           inherit default;
+          moscripts = cliPackage;
         }
         // standaloneBinaryPackages
         // standaloneContainerPackages
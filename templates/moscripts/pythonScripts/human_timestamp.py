@@ -7,8 +7,347 @@
 # ///
 
 import typer
-from datetime import datetime, timezone
+from collections.abc import Callable, Iterable, Iterator
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
+from functools import cache, lru_cache
+from itertools import islice
+from bisect import bisect_right
+from math import isfinite, modf
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, BinaryIO, TextIO
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import mmap
+import sys
+import re
+
+# Lines converted per write when streaming
+CONVERT_BATCH_SIZE: int = 8192
+# Bytes of a log rewritten per chunk, extended to the next line boundary
+REWRITE_CHUNK_SIZE: int = 8 * 1024 * 1024
+# Distinct raw timestamps remembered while rewriting before the memo is reset
+RENDER_CACHE_SIZE: int = 65536
+# RFC 3339 timestamps, or 10-digit epoch seconds not embedded in a longer number
+TIMESTAMP_PATTERN: re.Pattern[bytes] = re.compile(
+    rb"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d{1,6})?(?:Z|[+-]\d{2}:\d{2})?"
+    rb"|(?<![\d.])\d{10}(?:\.\d{1,6})?(?![\d.])"
+)
+
+
+# mirror: begin timestamps
+# Copied verbatim from src/moscripts/utilities.py, as this script only depends
+# on typer. Edit both copies; tests/test_human_timestamp.py checks they match.
+
+# ZoneInfo objects kept alive by `get_zone`, on top of ZoneInfo's own small cache
+ZONE_CACHE_SIZE: int = 32
+# UTC seconds covered by one precomputed offset transition table
+TRANSITION_SPAN: int = 366 * 86400
+
+
+@lru_cache(maxsize=ZONE_CACHE_SIZE)
+def get_zone(target_tz: str) -> ZoneInfo:
+    """Returns the ZoneInfo for an IANA name from a bounded LRU cache."""
+    return ZoneInfo(target_tz)
+
+
+@cache
+def fixed_offset(seconds: int, name: str | None) -> timezone:
+    """Returns a shared fixed-offset timezone, so equal offsets compare by identity."""
+    if name is None:
+        return timezone(timedelta(seconds=seconds))
+    return timezone(timedelta(seconds=seconds), name)
+
+
+def zone_offset_at(zone: ZoneInfo, epoch: int) -> timezone:
+    """Returns the fixed offset and abbreviation `zone` uses at `epoch`."""
+    local_dt: datetime = datetime.fromtimestamp(epoch, zone)
+    offset: timedelta | None = local_dt.utcoffset()
+    assert offset is not None
+    return fixed_offset(int(offset.total_seconds()), local_dt.tzname())
+
+
+@lru_cache(maxsize=ZONE_CACHE_SIZE * 4)
+def offset_transitions(
+    target_tz: str, span: int
+) -> tuple[tuple[int, ...], tuple[timezone, ...]]:
+    """Precomputes the UTC offset transitions of a zone within one span.
+
+    Span `n` covers UTC seconds `[n * TRANSITION_SPAN, (n + 1) * TRANSITION_SPAN)`.
+    Offsets are sampled daily and each change is bisected to the second, giving
+    sorted transition starts and the fixed offset that applies from each.
+    Samples stay a day inside the years datetime covers, so the first and last
+    spans reuse their edge offsets instead of overflowing.
+    """
+    zone: ZoneInfo = get_zone(target_tz)
+    start: int = span * TRANSITION_SPAN
+    first: int = max(start, int(MIN_EPOCH) + 86400)
+    end: int = min(start + TRANSITION_SPAN, int(MAX_EPOCH) - 86400)
+    starts: list[int] = [start]
+    offsets: list[timezone] = [zone_offset_at(zone, first)]
+    previous: int = first
+    for sample in (*range(first + 86400, end, 86400), end - 1):
+        current: timezone = zone_offset_at(zone, sample)
+        while current is not offsets[-1]:
+            low, high = previous, sample
+            while high - low > 1:
+                middle: int = (low + high) // 2
+                if zone_offset_at(zone, middle) is offsets[-1]:
+                    low = middle
+                else:
+                    high = middle
+            starts.append(high)
+            offsets.append(zone_offset_at(zone, high))
+            previous = high
+        previous = sample
+    return tuple(starts), tuple(offsets)
+
+
+# strftime directives rendered once per local day and UTC offset
+DATE_DIRECTIVES: frozenset[str] = frozenset("aAbBCdDeFgGhjmuUVwWyYzZ")
+# strftime directives rendered per timestamp, as the time fields they expand to
+TIME_DIRECTIVES: dict[str, str] = {
+    "H": "H",
+    "I": "I",
+    "M": "M",
+    "S": "S",
+    "p": "p",
+    "f": "f",
+    "T": "H:M:S",
+    "R": "H:M",
+}
+# %-style conversions for time fields, indexing the tuple built per timestamp
+TIME_FIELDS: dict[str, tuple[int, str]] = {
+    "H": (0, "%02d"),
+    "I": (1, "%02d"),
+    "M": (2, "%02d"),
+    "S": (3, "%02d"),
+    "p": (4, "%s"),
+    "f": (5, "%06d"),
+}
+# Rendered day templates kept per formatter before the memo is reset
+DAY_CACHE_SIZE: int = 4096
+UNIX_EPOCH: datetime = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Epoch seconds datetime can represent, beyond which conversions overflow
+MIN_EPOCH: float = (
+    datetime.min.replace(tzinfo=timezone.utc) - UNIX_EPOCH
+).total_seconds()
+MAX_EPOCH: float = (
+    datetime.max.replace(tzinfo=timezone.utc) - UNIX_EPOCH
+).total_seconds()
+
+
+def parse_format(fmt: str) -> tuple[tuple[str, str], ...] | None:
+    """Splits a strftime pattern into `(kind, value)` tokens.
+
+    Kinds are `literal`, `date` and `time`. Returns None when the pattern uses
+    a directive that cannot be split this way, such as locale-dependent `%c`.
+    """
+    tokens: list[tuple[str, str]] = []
+    literal: list[str] = []
+    i: int = 0
+    while i < len(fmt):
+        char: str = fmt[i]
+        if char != "%":
+            literal.append(char)
+            i += 1
+            continue
+        if i + 1 == len(fmt):
+            return None
+        directive: str = fmt[i + 1]
+        i += 2
+        if directive == "%":
+            literal.append("%")
+            continue
+        if directive not in DATE_DIRECTIVES and directive not in TIME_DIRECTIVES:
+            return None
+        if literal:
+            tokens.append(("literal", "".join(literal)))
+            literal = []
+        if directive in DATE_DIRECTIVES:
+            tokens.append(("date", directive))
+            continue
+        for field in TIME_DIRECTIVES[directive]:
+            tokens.append(
+                ("time", field) if field in TIME_FIELDS else ("literal", field)
+            )
+    if literal:
+        tokens.append(("literal", "".join(literal)))
+    return tuple(tokens)
+
+
+class CompiledFormatter:
+    """Formats UTC epoch seconds in a target timezone with a pre-parsed pattern.
+
+    The pattern is parsed once. Date fields are rendered with `strftime` once
+    per local day and UTC offset into a %-template, which time fields then fill
+    from integer arithmetic. Patterns with other directives fall back to
+    `strftime` per timestamp. Offsets come from precomputed transition tables.
+    """
+
+    def __init__(
+        self, fmt: str = "%Y-%m-%d %I:%M:%S %p", target_tz: str = "America/Chicago"
+    ) -> None:
+        get_zone(target_tz)
+        self.fmt: str = fmt
+        self.target_tz: str = target_tz
+        self._tokens: tuple[tuple[str, str], ...] | None = parse_format(fmt)
+        indexes: list[int] = [
+            TIME_FIELDS[value][0]
+            for kind, value in self._tokens or ()
+            if kind == "time"
+        ]
+        self._fields: Callable[[tuple[Any, ...]], Any] = (
+            itemgetter(*indexes) if indexes else lambda values: ()
+        )
+        self._meridiem: tuple[str, str] = (
+            datetime(2000, 1, 1, 0).strftime("%p"),
+            datetime(2000, 1, 1, 12).strftime("%p"),
+        )
+        self._days: dict[tuple[int, int], str] = {}
+        self._table: tuple[
+            int, tuple[int, ...], tuple[timezone, ...], tuple[int, ...]
+        ] = (
+            -1,
+            (),
+            (),
+            (),
+        )
+        # Log lines often share a second, so the last result is kept
+        self._last: tuple[float, str] | None = None
+
+    def offset(self, seconds: int) -> tuple[timezone, int]:
+        """Returns the fixed offset the target timezone uses, and its seconds."""
+        span: int = seconds // TRANSITION_SPAN
+        table = self._table
+        if span != table[0]:
+            starts, offsets = offset_transitions(self.target_tz, span)
+            table = (
+                span,
+                starts,
+                offsets,
+                tuple(int(tz.utcoffset(None).total_seconds()) for tz in offsets),
+            )
+            self._table = table
+        i: int = bisect_right(table[1], seconds) - 1
+        return table[2][i], table[3][i]
+
+    def day_template(self, day: int, tz: timezone) -> str:
+        """Renders the date fields of local `day` into a %-template for time fields."""
+        assert self._tokens is not None
+        # Fixed offsets are interned by `fixed_offset`, so their ids are stable
+        key: tuple[int, int] = (day, id(tz))
+        template: str | None = self._days.get(key)
+        if template is None:
+            midnight: datetime = (UNIX_EPOCH + timedelta(days=day)).replace(tzinfo=tz)
+            parts: list[str] = []
+            for kind, value in self._tokens:
+                if kind == "literal":
+                    parts.append(value.replace("%", "%%"))
+                elif kind == "date":
+                    parts.append(midnight.strftime(f"%{value}").replace("%", "%%"))
+                else:
+                    parts.append(TIME_FIELDS[value][1])
+            template = "".join(parts)
+            if len(self._days) >= DAY_CACHE_SIZE:
+                self._days.clear()
+            self._days[key] = template
+        return template
+
+    def format_parts(self, seconds: int, microsecond: int = 0) -> str:
+        """Formats whole UTC epoch seconds plus microseconds."""
+        if self._tokens is None:
+            return (
+                datetime.fromtimestamp(seconds, get_zone(self.target_tz))
+                .replace(microsecond=microsecond)
+                .strftime(self.fmt)
+            )
+        tz, offset = self.offset(seconds)
+        day, second = divmod(seconds + offset, 86400)
+        hour, rest = divmod(second, 3600)
+        minute, second = divmod(rest, 60)
+        return self.day_template(day, tz) % self._fields(
+            (
+                hour,
+                hour % 12 or 12,
+                minute,
+                second,
+                self._meridiem[hour >= 12],
+                microsecond,
+            )
+        )
+
+    def __call__(self, epoch: float) -> str:
+        last = self._last
+        if last is not None and last[0] == epoch:
+            return last[1]
+        if isinstance(epoch, int):
+            text: str = self.format_parts(epoch)
+        else:
+            # Rounds like `datetime.fromtimestamp`
+            fraction, whole = modf(epoch)
+            seconds: int = int(whole)
+            microsecond: int = round(fraction * 1e6)
+            if microsecond >= 1_000_000:
+                microsecond -= 1_000_000
+                seconds += 1
+            elif microsecond < 0:
+                microsecond += 1_000_000
+                seconds -= 1
+            text = self.format_parts(seconds, microsecond)
+        self._last = (epoch, text)
+        return text
+
+    def format_many(self, epochs: Iterable[float]) -> list[str]:
+        """Formats many UTC epoch seconds."""
+        return list(map(self, epochs))
+
+
+@lru_cache(maxsize=ZONE_CACHE_SIZE)
+def get_formatter(fmt: str, target_tz: str) -> CompiledFormatter:
+    """Returns a shared CompiledFormatter from a bounded LRU cache."""
+    return CompiledFormatter(fmt, target_tz)
+
+
+def to_epoch(value: datetime | float) -> float:
+    """Returns UTC epoch seconds, treating naive datetimes as UTC."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return value
+
+
+def parse_timestamp(text: str) -> float:
+    """Parses epoch seconds or an ISO 8601 timestamp into UTC epoch seconds.
+
+    Raises:
+        ValueError: If `text` is neither, or lies outside the years datetime covers.
+    """
+    text = text.strip()
+    try:
+        epoch: float = float(text)
+    except ValueError:
+        return to_epoch(datetime.fromisoformat(text))
+    if not isfinite(epoch):
+        raise ValueError(f"Invalid timestamp {text!r}.")
+    if not MIN_EPOCH <= epoch <= MAX_EPOCH:
+        raise ValueError(f"Timestamp {text!r} is out of range.")
+    return epoch
+
+
+def convert_timestamps(
+    timestamps: Iterable[datetime | float],
+    target_tz: str = "America/Chicago",
+    fmt: str = "%Y-%m-%d %I:%M:%S %p",
+) -> Iterator[str]:
+    """Formats many timestamps in `target_tz`, reusing one compiled formatter.
+
+    Raises:
+        ZoneInfoNotFoundError: If `target_tz` is not a known timezone.
+    """
+    return map(CompiledFormatter(fmt, target_tz), map(to_epoch, timestamps))
 
 
 def create_human_readable_timestamp(
@@ -18,8 +357,8 @@ def create_human_readable_timestamp(
 ) -> str:
     """Creates a formatted, human-readable timestamp from a datetime object.
 
-    This function is optimized to cache ZoneInfo lookups, making it highly
-    performant for repeated calls with the same target timezone.
+    Formatting goes through a cached CompiledFormatter per `fmt` and
+    `target_tz`. Use `convert_timestamps` to format many timestamps at once.
 
     Args:
         dt_object: An optional timezone-aware datetime object. If naive, it's
@@ -37,10 +376,136 @@ def create_human_readable_timestamp(
     else:
         source_dt = dt_object
 
-    display_tz: ZoneInfo = ZoneInfo(target_tz)
-    local_dt: datetime = source_dt.astimezone(display_tz)
+    seconds: int = (source_dt - UNIX_EPOCH) // timedelta(seconds=1)
+    return get_formatter(fmt, target_tz).format_parts(seconds, source_dt.microsecond)
+
+
+# mirror: end timestamps
+
+
+def convert_lines(lines: Iterable[str], formatter: CompiledFormatter) -> Iterator[str]:
+    """Converts one timestamp per line, passing other lines through unchanged."""
+    for line in lines:
+        try:
+            yield formatter(parse_timestamp(line)) + "\n"
+        except (ValueError, OverflowError, OSError):
+            yield line
+
+
+def stream_convert(source: TextIO, sink: TextIO, formatter: CompiledFormatter) -> None:
+    """Converts `source` into `sink` in batches so large inputs stream."""
+    converted: Iterator[str] = convert_lines(source, formatter)
+    while batch := list(islice(converted, CONVERT_BATCH_SIZE)):
+        sink.writelines(batch)
+
+
+def make_renderer(
+    formatter: CompiledFormatter,
+) -> Callable[[re.Match[bytes]], bytes]:
+    """Returns a `re.sub` callback that renders matched timestamps.
+
+    Renderings are memoised by their raw bytes, since lines logged within the
+    same second repeat them. Matches that fail to parse are left as they are.
+    """
+    rendered: dict[bytes, bytes] = {}
+
+    def render(match: re.Match[bytes]) -> bytes:
+        raw: bytes = match.group()
+        text: bytes | None = rendered.get(raw)
+        if text is None:
+            if len(rendered) >= RENDER_CACHE_SIZE:
+                rendered.clear()
+            try:
+                text = formatter(parse_timestamp(raw.decode())).encode()
+            except (ValueError, OverflowError, OSError):
+                text = raw
+            rendered[raw] = text
+        return text
+
+    return render
+
 
-    return local_dt.strftime(fmt)
+def rewrite_chunk(data: bytes, render: Callable[[re.Match[bytes]], bytes]) -> bytes:
+    """Replaces every timestamp in `data`, leaving the rest intact."""
+    return TIMESTAMP_PATTERN.sub(render, data)
+
+
+def chunk_bounds(
+    data: mmap.mmap, chunk_size: int = REWRITE_CHUNK_SIZE
+) -> list[tuple[int, int]]:
+    """Splits `data` into `(start, end)` ranges that end on line boundaries."""
+    bounds: list[tuple[int, int]] = []
+    start: int = 0
+    while start < len(data):
+        newline: int = data.find(b"\n", min(start + chunk_size, len(data)) - 1)
+        end: int = len(data) if newline == -1 else newline + 1
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+_worker_data: mmap.mmap | None = None
+_worker_render: Callable[[re.Match[bytes]], bytes] | None = None
+
+
+def init_rewrite_worker(source: Path, target_tz: str, fmt: str) -> None:
+    """Maps the log and builds a formatter once per worker process."""
+    global _worker_data, _worker_render
+    with open(source, "rb") as f:
+        _worker_data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _worker_render = make_renderer(CompiledFormatter(fmt, target_tz))
+
+
+def rewrite_range(bounds: tuple[int, int]) -> bytes:
+    """Rewrites one range of the log mapped by `init_rewrite_worker`."""
+    assert _worker_data is not None and _worker_render is not None
+    return rewrite_chunk(_worker_data[bounds[0] : bounds[1]], _worker_render)
+
+
+def rewrite_log(
+    source: Path,
+    sink: BinaryIO,
+    target_tz: str = "America/Chicago",
+    fmt: str = "%Y-%m-%d %I:%M:%S %p",
+    workers: int = 1,
+    chunk_size: int = REWRITE_CHUNK_SIZE,
+) -> int:
+    """Rewrites the timestamps of a log into `sink`, returning the chunks written.
+
+    The log is memory-mapped and split on line boundaries. With `workers > 1`
+    chunks are rewritten in a process pool and written back in order, with at
+    most two chunks per worker in flight.
+    """
+    render: Callable[[re.Match[bytes]], bytes] = make_renderer(
+        CompiledFormatter(fmt, target_tz)
+    )
+    if source.stat().st_size == 0:
+        return 0
+    with (
+        open(source, "rb") as f,
+        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data,
+    ):
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            data.madvise(mmap.MADV_SEQUENTIAL)
+        bounds: list[tuple[int, int]] = chunk_bounds(data, chunk_size)
+        if workers <= 1 or len(bounds) == 1:
+            for start, end in bounds:
+                sink.write(rewrite_chunk(data[start:end], render))
+            return len(bounds)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_rewrite_worker,
+        initargs=(source, target_tz, fmt),
+    ) as pool:
+        pending: deque[Future[bytes]] = deque()
+        for chunk in bounds:
+            pending.append(pool.submit(rewrite_range, chunk))
+            if len(pending) >= workers * 2:
+                sink.write(pending.popleft().result())
+        while pending:
+            sink.write(pending.popleft().result())
+    return len(bounds)
 
 
 app: typer.Typer = typer.Typer(
@@ -51,8 +516,9 @@ app: typer.Typer = typer.Typer(
 )
 
 
-@app.command()
+@app.callback(invoke_without_command=True)
 def create(
+    ctx: typer.Context,
     target_tz: str = typer.Option(
         "America/Chicago",
         "--target-tz",
@@ -69,6 +535,8 @@ def create(
     ),
 ) -> None:
     """Creates a human-readable timestamp and prints it to the console."""
+    if ctx.invoked_subcommand is not None:
+        return
     try:
         human_time: str = create_human_readable_timestamp(target_tz=target_tz, fmt=fmt)
         typer.secho(human_time, fg=typer.colors.CYAN)
@@ -77,5 +545,79 @@ def create(
         raise typer.Exit(code=1)
 
 
+@app.command()
+def convert(
+    source: Path = typer.Argument(
+        None,
+        help="File of epoch seconds or ISO timestamps, one per line. Defaults to stdin.",
+    ),
+    target_tz: str = typer.Option(
+        "America/Chicago",
+        "--target-tz",
+        "-t",
+        help="The target timezone to convert the timestamps to.",
+        show_default=True,
+    ),
+    fmt: str = typer.Option(
+        "%Y-%m-%d %I:%M:%S %p",
+        "--format",
+        "-f",
+        help="The format string to use for the timestamps.",
+        show_default=True,
+    ),
+) -> None:
+    """Converts a stream of timestamps, passing other lines through unchanged."""
+    try:
+        formatter: CompiledFormatter = CompiledFormatter(fmt, target_tz)
+    except (ValueError, KeyError) as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=1)
+    if source is None or str(source) == "-":
+        stream_convert(sys.stdin, sys.stdout, formatter)
+        return
+    with open(source, encoding="utf-8", errors="surrogateescape") as f:
+        stream_convert(f, sys.stdout, formatter)
+
+
+@app.command()
+def rewrite(
+    source: Path = typer.Argument(
+        ..., exists=True, dir_okay=False, help="Log file to rewrite."
+    ),
+    target_tz: str = typer.Option(
+        "America/Chicago",
+        "--target-tz",
+        "-t",
+        help="The target timezone to convert the timestamps to.",
+        show_default=True,
+    ),
+    fmt: str = typer.Option(
+        "%Y-%m-%d %I:%M:%S %p",
+        "--format",
+        "-f",
+        help="The format string to use for the timestamps.",
+        show_default=True,
+    ),
+    output: Path = typer.Option(
+        None, "--output", "-o", help="Write to a file instead of stdout."
+    ),
+    workers: int = typer.Option(
+        1, "--workers", "-w", min=1, help="Processes to rewrite chunks with."
+    ),
+) -> None:
+    """Rewrites epoch and RFC 3339 timestamps embedded in a log."""
+    try:
+        get_zone(target_tz)
+    except (ValueError, KeyError) as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=1)
+    if output is None:
+        rewrite_log(source, sys.stdout.buffer, target_tz, fmt, workers)
+        sys.stdout.buffer.flush()
+        return
+    with open(output, "wb", buffering=REWRITE_CHUNK_SIZE) as f:
+        rewrite_log(source, f, target_tz, fmt, workers)
+
+
 if __name__ == "__main__":
     app()
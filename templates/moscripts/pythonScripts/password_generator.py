@@ -6,12 +6,17 @@
 # ]
 # ///
 
-from typing import LiteralString
+from typing import LiteralString, TextIO
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from math import log2
 import string
 import typer
 from typer import Typer
 import secrets
-from collections.abc import Iterable
+import sys
+from collections.abc import Iterable, Iterator
 
 
 def generate_random_password(length: int, character_set: Iterable[str]) -> str:
@@ -47,6 +52,211 @@ def generate_random_password(length: int, character_set: Iterable[str]) -> str:
     return "".join(password_chars)
 
 
+def build_translation(character_set: str) -> tuple[bytes, bytes]:
+    """Builds a `bytes.translate` table mapping random bytes onto `character_set`.
+
+    Bytes at or above the largest multiple of the set size are deleted, which
+    is rejection sampling: each remaining byte maps to every character equally
+    often, so the output is unbiased.
+    """
+    size: int = len(character_set)
+    limit: int = 256 - (256 % size)
+    table: bytes = bytes(ord(character_set[i % size]) for i in range(256))
+    return table, bytes(range(limit, 256))
+
+
+def generate_passwords(
+    length: int, character_set: Iterable[str], count: int, batch_size: int = 4096
+) -> Iterator[str]:
+    """Generates `count` cryptographically secure passwords in bulk.
+
+    Random bytes are drawn with `secrets.token_bytes` in large buffers and
+    mapped onto the character set with `bytes.translate`, so no per-character
+    Python work is done. Character sets with non-ASCII characters fall back
+    to `generate_random_password`.
+
+    Args:
+        length: The desired length of each password. Must be a positive integer.
+        character_set: An iterable of characters to use for the passwords.
+        count: The number of passwords to generate.
+        batch_size: Passwords generated per random buffer.
+
+    Yields:
+        Passwords, one at a time.
+
+    Raises:
+        ValueError: If the length is not a positive integer or if the
+            character_set is empty.
+    """
+    char_list: list[str] = list(character_set)
+    if length <= 0:
+        raise ValueError("Password length must be a positive integer.")
+    if not char_list:
+        raise ValueError(
+            "Character set cannot be empty. Please enable at least one character type (e.g., --lowercase) or provide a --custom set."
+        )
+    if len(char_list) > 256 or any(ord(char) > 127 for char in char_list):
+        for _ in range(count):
+            yield generate_random_password(length, char_list)
+        return
+
+    table, rejected = build_translation("".join(char_list))
+    # Fraction of random bytes kept; draws are sized so one usually suffices
+    acceptance: float = (256 - len(rejected)) / 256
+    remaining: int = count
+    while remaining > 0:
+        batch: int = min(batch_size, remaining)
+        needed: int = batch * length
+        pool: bytearray = bytearray()
+        while len(pool) < needed:
+            draw: int = int((needed - len(pool)) / acceptance * 1.05) + 64
+            pool.extend(secrets.token_bytes(draw).translate(table, rejected))
+        text: str = pool[:needed].decode("ascii")
+        for start in range(0, needed, length):
+            yield text[start : start + length]
+        remaining -= batch
+
+
+def write_passwords(passwords: Iterable[str], out: TextIO, chunk: int = 4096) -> int:
+    """Streams passwords to `out`, one per line. Returns the number written."""
+    written: int = 0
+    lines: list[str] = []
+    for password in passwords:
+        lines.append(password)
+        if len(lines) >= chunk:
+            out.write("\n".join(lines) + "\n")
+            written += len(lines)
+            lines.clear()
+    if lines:
+        out.write("\n".join(lines) + "\n")
+        written += len(lines)
+    return written
+
+
+AMBIGUOUS_CHARACTERS = "0Oo1lI|`'\""
+
+
+@dataclass(frozen=True)
+class PasswordPolicy:
+    """Constraints for policy-based password generation.
+
+    Attributes:
+        min_lowercase: Minimum number of lowercase letters.
+        min_uppercase: Minimum number of uppercase letters.
+        min_digits: Minimum number of digits.
+        min_symbols: Minimum number of other characters.
+        exclude_ambiguous: Drop look-alike characters such as `0`, `O`, `l` and `1`.
+        no_repeat: Never place the same character twice in a row.
+    """
+
+    min_lowercase: int = 0
+    min_uppercase: int = 0
+    min_digits: int = 0
+    min_symbols: int = 0
+    exclude_ambiguous: bool = False
+    no_repeat: bool = False
+
+
+@lru_cache(maxsize=32)
+def policy_classes(
+    character_set: str, policy: PasswordPolicy
+) -> tuple[tuple[str, int], ...]:
+    """Splits a character set into disjoint classes with their minimum counts.
+
+    Raises:
+        ValueError: If a required class has no characters left.
+    """
+    chars: list[str] = list(dict.fromkeys(character_set))
+    if policy.exclude_ambiguous:
+        chars = [char for char in chars if char not in AMBIGUOUS_CHARACTERS]
+    classes: list[tuple[str, str, int]] = [
+        (
+            "lowercase",
+            "".join(c for c in chars if c in string.ascii_lowercase),
+            policy.min_lowercase,
+        ),
+        (
+            "uppercase",
+            "".join(c for c in chars if c in string.ascii_uppercase),
+            policy.min_uppercase,
+        ),
+        ("digits", "".join(c for c in chars if c in string.digits), policy.min_digits),
+        (
+            "symbols",
+            "".join(c for c in chars if c not in string.ascii_letters + string.digits),
+            policy.min_symbols,
+        ),
+    ]
+    for name, members, minimum in classes:
+        if minimum > 0 and not members:
+            raise ValueError(f"Policy requires {name} but the character set has none.")
+        if policy.no_repeat and len(members) == 1:
+            raise ValueError(
+                f"--no-repeat needs at least two {name} characters, found {members!r}."
+            )
+    return tuple((members, minimum) for _, members, minimum in classes if members)
+
+
+def generate_policy_password(
+    length: int, character_set: Iterable[str], policy: PasswordPolicy
+) -> tuple[str, float]:
+    """Generates a password that satisfies `policy` without retrying.
+
+    Each class first fills its minimum number of positions, the rest are
+    drawn from the whole character set, all with the bulk sampler. A secure
+    Fisher-Yates shuffle then mixes the positions. With `no_repeat`, a
+    character equal to the one before it is redrawn from its own pool. The
+    work is linear in the length.
+
+    Args:
+        length: The desired length of the password. Must be a positive integer.
+        character_set: An iterable of characters to use for the password.
+        policy: The constraints the password must satisfy.
+
+    Returns:
+        The password and a conservative estimate of its entropy in bits,
+        counting only the character draws and not the shuffle.
+
+    Raises:
+        ValueError: If the length is not positive or the policy cannot be met.
+    """
+    if length <= 0:
+        raise ValueError("Password length must be a positive integer.")
+    classes: tuple[tuple[str, int], ...] = policy_classes(
+        "".join(character_set), policy
+    )
+    if not classes:
+        raise ValueError(
+            "Character set cannot be empty. Please enable at least one character type (e.g., --lowercase) or provide a --custom set."
+        )
+    required: int = sum(minimum for _, minimum in classes)
+    if required > length:
+        raise ValueError("Policy minimums add up to more than the password length.")
+
+    alphabet: str = "".join(members for members, _ in classes)
+    # Each position keeps the pool it was drawn from, for --no-repeat redraws
+    slots: list[tuple[str, str]] = []
+    for members, count in [*classes, (alphabet, length - required)]:
+        if count > 0:
+            chars: str = next(generate_passwords(count, members, 1))
+            slots.extend((char, members) for char in chars)
+    for i in range(length - 1, 0, -1):
+        k: int = secrets.randbelow(i + 1)
+        slots[i], slots[k] = slots[k], slots[i]
+
+    password_chars: list[str] = []
+    entropy: float = 0
+    for char, pool in slots:
+        if policy.no_repeat and password_chars:
+            # Every class has two or more characters, so one is always left
+            pool = pool.replace(password_chars[-1], "")
+            if char == password_chars[-1]:
+                char = secrets.choice(pool)
+        password_chars.append(char)
+        entropy += log2(len(pool))
+    return "".join(password_chars), entropy
+
+
 app: Typer = typer.Typer(
     name="passgen",
     help="A secure, customizable password generator CLI.",
@@ -108,6 +318,45 @@ def generate(
         help="Print just the password",
         show_default=False,
     ),
+    count: int | None = typer.Option(
+        None,
+        "--count",
+        "-n",
+        help="Generate N passwords in bulk, one per line.",
+        min=1,
+        show_default=False,
+    ),
+    output: Path | None = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help="With --count, write passwords to a file instead of stdout.",
+        show_default=False,
+    ),
+    min_lowercase: int = typer.Option(
+        0, "--min-lowercase", help="Require at least N lowercase letters.", min=0
+    ),
+    min_uppercase: int = typer.Option(
+        0, "--min-uppercase", help="Require at least N uppercase letters.", min=0
+    ),
+    min_digits: int = typer.Option(
+        0, "--min-digits", help="Require at least N digits.", min=0
+    ),
+    min_symbols: int = typer.Option(
+        0, "--min-symbols", help="Require at least N symbols.", min=0
+    ),
+    exclude_ambiguous: bool = typer.Option(
+        False,
+        "--exclude-ambiguous",
+        help=f"Drop look-alike characters ({AMBIGUOUS_CHARACTERS}).",
+        show_default=False,
+    ),
+    no_repeat: bool = typer.Option(
+        False,
+        "--no-repeat",
+        help="Never repeat a character twice in a row.",
+        show_default=False,
+    ),
 ) -> None:
     """Generates a secure random password and prints it to the console."""
     character_set_parts: list[str] = []
@@ -129,6 +378,65 @@ def generate(
 
         character_set = "".join(character_set_parts)
 
+    policy: PasswordPolicy = PasswordPolicy(
+        min_lowercase=min_lowercase,
+        min_uppercase=min_uppercase,
+        min_digits=min_digits,
+        min_symbols=min_symbols,
+        exclude_ambiguous=exclude_ambiguous,
+        no_repeat=no_repeat,
+    )
+    if policy != PasswordPolicy():
+        try:
+            if count is not None:
+                # Validate once up front so errors surface before any output.
+                generate_policy_password(length, character_set, policy)
+                policy_passwords: Iterator[str] = (
+                    generate_policy_password(length, character_set, policy)[0]
+                    for _ in range(count)
+                )
+                if output is None:
+                    write_passwords(policy_passwords, sys.stdout)
+                else:
+                    with open(output, "w", encoding="utf-8") as out:
+                        written: int = write_passwords(policy_passwords, out)
+                    typer.secho(
+                        f"Wrote {written} passwords to {output}", fg=typer.colors.CYAN
+                    )
+                return
+            password, entropy = generate_policy_password(length, character_set, policy)
+        except ValueError as e:
+            typer.secho(f"Error: {e}", fg=typer.colors.RED, err=True)
+            raise typer.Exit(code=1)
+        if cli:
+            typer.secho(password, fg=typer.colors.GREEN, bold=True)
+            return
+        typer.secho("Generated Password:", fg=typer.colors.BRIGHT_CYAN, bold=True)
+        typer.secho(f"{length=}", fg=typer.colors.CYAN)
+        typer.secho(f"{character_set=}", fg=typer.colors.CYAN)
+        typer.secho(f"{policy=}", fg=typer.colors.CYAN)
+        typer.secho(f"entropy_bits={entropy:.2f}", fg=typer.colors.CYAN)
+        typer.secho("---", fg=typer.colors.YELLOW)
+        typer.secho(password, fg=typer.colors.GREEN, bold=True)
+        typer.secho("---", fg=typer.colors.YELLOW)
+        return
+
+    if count is not None:
+        try:
+            passwords: Iterator[str] = generate_passwords(length, character_set, count)
+            if output is None:
+                write_passwords(passwords, sys.stdout)
+            else:
+                with open(output, "w", encoding="utf-8") as out:
+                    written: int = write_passwords(passwords, out)
+                typer.secho(
+                    f"Wrote {written} passwords to {output}", fg=typer.colors.CYAN
+                )
+        except ValueError as e:
+            typer.secho(f"Error: {e}", fg=typer.colors.RED, err=True)
+            raise typer.Exit(code=1)
+        return
+
     if cli:
         password: str = generate_random_password(length, character_set)
         typer.secho(password, fg=typer.colors.GREEN, bold=True)
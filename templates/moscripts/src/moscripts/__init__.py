@@ -4,7 +4,13 @@ from pathlib import Path
 
 # Globals
 HOME: Path = Path.home()
-NIX: Path = which_nix()
+
+
+def __getattr__(name: str) -> Path:
+    # `NIX` is resolved on first access so importing moscripts never searches PATH.
+    if name == "NIX":
+        return which_nix()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def hello() -> None:
@@ -0,0 +1,70 @@
+# Standard Library
+from pathlib import Path
+from subprocess import CalledProcessError
+
+# Third Party
+from typer import Argument, Exit, Typer, colors, secho
+
+# My Imports
+from moscripts.utilities import (
+    STORE_PATH_CACHE,
+    load_store_paths,
+    nixpkgs_revision,
+    prune_store_paths,
+    warm_store_path,
+)
+
+app: Typer = Typer(add_completion=False, help="moscripts maintenance commands.")
+cache_app: Typer = Typer(
+    add_completion=False,
+    help=f"Manage cached nixpkgs store paths in {STORE_PATH_CACHE}.",
+)
+app.add_typer(cache_app, name="cache")
+
+
+@cache_app.command("list")
+def cache_list() -> None:
+    """Lists cached store paths."""
+    revision: str = nixpkgs_revision()
+    entries: dict[str, dict[str, str]] = load_store_paths()
+    if not entries:
+        secho("🔎 Cache is empty.", fg=colors.YELLOW)
+        raise Exit(0)
+    for entry_revision, packages in sorted(entries.items()):
+        current: str = " (current)" if entry_revision == revision else ""
+        secho(f"{entry_revision}{current}", fg=colors.BRIGHT_CYAN)
+        for command, location in sorted(packages.items()):
+            colour: str = colors.GREEN if Path(location).exists() else colors.RED
+            secho(f"  {command} -> {location}", fg=colour)
+
+
+@cache_app.command("warm")
+def cache_warm(
+    packages: list[str] = Argument(
+        ["uv", "mpv"], help="nixpkgs packages to realise and cache."
+    ),
+) -> None:
+    """Realises packages and caches their main programs."""
+    failed: bool = False
+    for command in packages:
+        try:
+            location: Path = warm_store_path(command)
+            secho(f"🔥 {command} -> {location}", fg=colors.GREEN)
+        except (CalledProcessError, FileNotFoundError) as e:
+            secho(f"Failed to warm {command}: {e}", fg=colors.RED, err=True)
+            failed = True
+    if failed:
+        raise Exit(1)
+
+
+@cache_app.command("prune")
+def cache_prune() -> None:
+    """Drops entries for other nixpkgs revisions or garbage-collected paths."""
+    removed: list[tuple[str, str]] = prune_store_paths()
+    for entry_revision, command in removed:
+        secho(f"🗑️ {entry_revision} {command}", fg=colors.YELLOW)
+    secho(f"Pruned {len(removed)} entries.", fg=colors.BRIGHT_GREEN)
+
+
+if __name__ == "__main__":
+    app()
@@ -1,9 +1,340 @@
 from subprocess import CompletedProcess
-from datetime import datetime, timezone
+from collections.abc import Callable, Iterable, Iterator
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
-import subprocess
+from functools import cache, lru_cache
+from bisect import bisect_right
+from math import isfinite, modf
+from operator import itemgetter
+from typing import Any
 from pathlib import Path
+import subprocess
+import shutil
+import json
 import os
+import re
+
+
+# Globals
+CACHE_DIR: Path = Path.home() / ".cache" / "moscripts"
+STORE_PATH_CACHE: Path = CACHE_DIR / "store-paths.json"
+NIX_FEATURES: tuple[str, ...] = ("--extra-experimental-features", "nix-command")
+# Directory mtimes this recent are not trusted, as entries may still land in the same tick
+RACY_MTIME_NS: int = 2_000_000_000
+
+
+# mirror: begin timestamps
+# Copied verbatim into pythonScripts/human_timestamp.py, a uv script that cannot
+# import this package. tests/test_human_timestamp.py checks the copies match.
+
+# ZoneInfo objects kept alive by `get_zone`, on top of ZoneInfo's own small cache
+ZONE_CACHE_SIZE: int = 32
+# UTC seconds covered by one precomputed offset transition table
+TRANSITION_SPAN: int = 366 * 86400
+
+
+@lru_cache(maxsize=ZONE_CACHE_SIZE)
+def get_zone(target_tz: str) -> ZoneInfo:
+    """Returns the ZoneInfo for an IANA name from a bounded LRU cache."""
+    return ZoneInfo(target_tz)
+
+
+@cache
+def fixed_offset(seconds: int, name: str | None) -> timezone:
+    """Returns a shared fixed-offset timezone, so equal offsets compare by identity."""
+    if name is None:
+        return timezone(timedelta(seconds=seconds))
+    return timezone(timedelta(seconds=seconds), name)
+
+
+def zone_offset_at(zone: ZoneInfo, epoch: int) -> timezone:
+    """Returns the fixed offset and abbreviation `zone` uses at `epoch`."""
+    local_dt: datetime = datetime.fromtimestamp(epoch, zone)
+    offset: timedelta | None = local_dt.utcoffset()
+    assert offset is not None
+    return fixed_offset(int(offset.total_seconds()), local_dt.tzname())
+
+
+@lru_cache(maxsize=ZONE_CACHE_SIZE * 4)
+def offset_transitions(
+    target_tz: str, span: int
+) -> tuple[tuple[int, ...], tuple[timezone, ...]]:
+    """Precomputes the UTC offset transitions of a zone within one span.
+
+    Span `n` covers UTC seconds `[n * TRANSITION_SPAN, (n + 1) * TRANSITION_SPAN)`.
+    Offsets are sampled daily and each change is bisected to the second, giving
+    sorted transition starts and the fixed offset that applies from each.
+    Samples stay a day inside the years datetime covers, so the first and last
+    spans reuse their edge offsets instead of overflowing.
+    """
+    zone: ZoneInfo = get_zone(target_tz)
+    start: int = span * TRANSITION_SPAN
+    first: int = max(start, int(MIN_EPOCH) + 86400)
+    end: int = min(start + TRANSITION_SPAN, int(MAX_EPOCH) - 86400)
+    starts: list[int] = [start]
+    offsets: list[timezone] = [zone_offset_at(zone, first)]
+    previous: int = first
+    for sample in (*range(first + 86400, end, 86400), end - 1):
+        current: timezone = zone_offset_at(zone, sample)
+        while current is not offsets[-1]:
+            low, high = previous, sample
+            while high - low > 1:
+                middle: int = (low + high) // 2
+                if zone_offset_at(zone, middle) is offsets[-1]:
+                    low = middle
+                else:
+                    high = middle
+            starts.append(high)
+            offsets.append(zone_offset_at(zone, high))
+            previous = high
+        previous = sample
+    return tuple(starts), tuple(offsets)
+
+
+# strftime directives rendered once per local day and UTC offset
+DATE_DIRECTIVES: frozenset[str] = frozenset("aAbBCdDeFgGhjmuUVwWyYzZ")
+# strftime directives rendered per timestamp, as the time fields they expand to
+TIME_DIRECTIVES: dict[str, str] = {
+    "H": "H",
+    "I": "I",
+    "M": "M",
+    "S": "S",
+    "p": "p",
+    "f": "f",
+    "T": "H:M:S",
+    "R": "H:M",
+}
+# %-style conversions for time fields, indexing the tuple built per timestamp
+TIME_FIELDS: dict[str, tuple[int, str]] = {
+    "H": (0, "%02d"),
+    "I": (1, "%02d"),
+    "M": (2, "%02d"),
+    "S": (3, "%02d"),
+    "p": (4, "%s"),
+    "f": (5, "%06d"),
+}
+# Rendered day templates kept per formatter before the memo is reset
+DAY_CACHE_SIZE: int = 4096
+UNIX_EPOCH: datetime = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Epoch seconds datetime can represent, beyond which conversions overflow
+MIN_EPOCH: float = (
+    datetime.min.replace(tzinfo=timezone.utc) - UNIX_EPOCH
+).total_seconds()
+MAX_EPOCH: float = (
+    datetime.max.replace(tzinfo=timezone.utc) - UNIX_EPOCH
+).total_seconds()
+
+
+def parse_format(fmt: str) -> tuple[tuple[str, str], ...] | None:
+    """Splits a strftime pattern into `(kind, value)` tokens.
+
+    Kinds are `literal`, `date` and `time`. Returns None when the pattern uses
+    a directive that cannot be split this way, such as locale-dependent `%c`.
+    """
+    tokens: list[tuple[str, str]] = []
+    literal: list[str] = []
+    i: int = 0
+    while i < len(fmt):
+        char: str = fmt[i]
+        if char != "%":
+            literal.append(char)
+            i += 1
+            continue
+        if i + 1 == len(fmt):
+            return None
+        directive: str = fmt[i + 1]
+        i += 2
+        if directive == "%":
+            literal.append("%")
+            continue
+        if directive not in DATE_DIRECTIVES and directive not in TIME_DIRECTIVES:
+            return None
+        if literal:
+            tokens.append(("literal", "".join(literal)))
+            literal = []
+        if directive in DATE_DIRECTIVES:
+            tokens.append(("date", directive))
+            continue
+        for field in TIME_DIRECTIVES[directive]:
+            tokens.append(
+                ("time", field) if field in TIME_FIELDS else ("literal", field)
+            )
+    if literal:
+        tokens.append(("literal", "".join(literal)))
+    return tuple(tokens)
+
+
+class CompiledFormatter:
+    """Formats UTC epoch seconds in a target timezone with a pre-parsed pattern.
+
+    The pattern is parsed once. Date fields are rendered with `strftime` once
+    per local day and UTC offset into a %-template, which time fields then fill
+    from integer arithmetic. Patterns with other directives fall back to
+    `strftime` per timestamp. Offsets come from precomputed transition tables.
+    """
+
+    def __init__(
+        self, fmt: str = "%Y-%m-%d %I:%M:%S %p", target_tz: str = "America/Chicago"
+    ) -> None:
+        get_zone(target_tz)
+        self.fmt: str = fmt
+        self.target_tz: str = target_tz
+        self._tokens: tuple[tuple[str, str], ...] | None = parse_format(fmt)
+        indexes: list[int] = [
+            TIME_FIELDS[value][0]
+            for kind, value in self._tokens or ()
+            if kind == "time"
+        ]
+        self._fields: Callable[[tuple[Any, ...]], Any] = (
+            itemgetter(*indexes) if indexes else lambda values: ()
+        )
+        self._meridiem: tuple[str, str] = (
+            datetime(2000, 1, 1, 0).strftime("%p"),
+            datetime(2000, 1, 1, 12).strftime("%p"),
+        )
+        self._days: dict[tuple[int, int], str] = {}
+        self._table: tuple[
+            int, tuple[int, ...], tuple[timezone, ...], tuple[int, ...]
+        ] = (
+            -1,
+            (),
+            (),
+            (),
+        )
+        # Log lines often share a second, so the last result is kept
+        self._last: tuple[float, str] | None = None
+
+    def offset(self, seconds: int) -> tuple[timezone, int]:
+        """Returns the fixed offset the target timezone uses, and its seconds."""
+        span: int = seconds // TRANSITION_SPAN
+        table = self._table
+        if span != table[0]:
+            starts, offsets = offset_transitions(self.target_tz, span)
+            table = (
+                span,
+                starts,
+                offsets,
+                tuple(int(tz.utcoffset(None).total_seconds()) for tz in offsets),
+            )
+            self._table = table
+        i: int = bisect_right(table[1], seconds) - 1
+        return table[2][i], table[3][i]
+
+    def day_template(self, day: int, tz: timezone) -> str:
+        """Renders the date fields of local `day` into a %-template for time fields."""
+        assert self._tokens is not None
+        # Fixed offsets are interned by `fixed_offset`, so their ids are stable
+        key: tuple[int, int] = (day, id(tz))
+        template: str | None = self._days.get(key)
+        if template is None:
+            midnight: datetime = (UNIX_EPOCH + timedelta(days=day)).replace(tzinfo=tz)
+            parts: list[str] = []
+            for kind, value in self._tokens:
+                if kind == "literal":
+                    parts.append(value.replace("%", "%%"))
+                elif kind == "date":
+                    parts.append(midnight.strftime(f"%{value}").replace("%", "%%"))
+                else:
+                    parts.append(TIME_FIELDS[value][1])
+            template = "".join(parts)
+            if len(self._days) >= DAY_CACHE_SIZE:
+                self._days.clear()
+            self._days[key] = template
+        return template
+
+    def format_parts(self, seconds: int, microsecond: int = 0) -> str:
+        """Formats whole UTC epoch seconds plus microseconds."""
+        if self._tokens is None:
+            return (
+                datetime.fromtimestamp(seconds, get_zone(self.target_tz))
+                .replace(microsecond=microsecond)
+                .strftime(self.fmt)
+            )
+        tz, offset = self.offset(seconds)
+        day, second = divmod(seconds + offset, 86400)
+        hour, rest = divmod(second, 3600)
+        minute, second = divmod(rest, 60)
+        return self.day_template(day, tz) % self._fields(
+            (
+                hour,
+                hour % 12 or 12,
+                minute,
+                second,
+                self._meridiem[hour >= 12],
+                microsecond,
+            )
+        )
+
+    def __call__(self, epoch: float) -> str:
+        last = self._last
+        if last is not None and last[0] == epoch:
+            return last[1]
+        if isinstance(epoch, int):
+            text: str = self.format_parts(epoch)
+        else:
+            # Rounds like `datetime.fromtimestamp`
+            fraction, whole = modf(epoch)
+            seconds: int = int(whole)
+            microsecond: int = round(fraction * 1e6)
+            if microsecond >= 1_000_000:
+                microsecond -= 1_000_000
+                seconds += 1
+            elif microsecond < 0:
+                microsecond += 1_000_000
+                seconds -= 1
+            text = self.format_parts(seconds, microsecond)
+        self._last = (epoch, text)
+        return text
+
+    def format_many(self, epochs: Iterable[float]) -> list[str]:
+        """Formats many UTC epoch seconds."""
+        return list(map(self, epochs))
+
+
+@lru_cache(maxsize=ZONE_CACHE_SIZE)
+def get_formatter(fmt: str, target_tz: str) -> CompiledFormatter:
+    """Returns a shared CompiledFormatter from a bounded LRU cache."""
+    return CompiledFormatter(fmt, target_tz)
+
+
+def to_epoch(value: datetime | float) -> float:
+    """Returns UTC epoch seconds, treating naive datetimes as UTC."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return value
+
+
+def parse_timestamp(text: str) -> float:
+    """Parses epoch seconds or an ISO 8601 timestamp into UTC epoch seconds.
+
+    Raises:
+        ValueError: If `text` is neither, or lies outside the years datetime covers.
+    """
+    text = text.strip()
+    try:
+        epoch: float = float(text)
+    except ValueError:
+        return to_epoch(datetime.fromisoformat(text))
+    if not isfinite(epoch):
+        raise ValueError(f"Invalid timestamp {text!r}.")
+    if not MIN_EPOCH <= epoch <= MAX_EPOCH:
+        raise ValueError(f"Timestamp {text!r} is out of range.")
+    return epoch
+
+
+def convert_timestamps(
+    timestamps: Iterable[datetime | float],
+    target_tz: str = "America/Chicago",
+    fmt: str = "%Y-%m-%d %I:%M:%S %p",
+) -> Iterator[str]:
+    """Formats many timestamps in `target_tz`, reusing one compiled formatter.
+
+    Raises:
+        ZoneInfoNotFoundError: If `target_tz` is not a known timezone.
+    """
+    return map(CompiledFormatter(fmt, target_tz), map(to_epoch, timestamps))
 
 
 def create_human_readable_timestamp(
@@ -13,8 +344,8 @@ def create_human_readable_timestamp(
 ) -> str:
     """Creates a formatted, human-readable timestamp from a datetime object.
 
-    This function is optimized to cache ZoneInfo lookups, making it highly
-    performant for repeated calls with the same target timezone.
+    Formatting goes through a cached CompiledFormatter per `fmt` and
+    `target_tz`. Use `convert_timestamps` to format many timestamps at once.
 
     Args:
         dt_object: An optional timezone-aware datetime object. If naive, it's
@@ -32,10 +363,55 @@ def create_human_readable_timestamp(
     else:
         source_dt = dt_object
 
-    display_tz: ZoneInfo = ZoneInfo(target_tz)
-    local_dt: datetime = source_dt.astimezone(display_tz)
+    seconds: int = (source_dt - UNIX_EPOCH) // timedelta(seconds=1)
+    return get_formatter(fmt, target_tz).format_parts(seconds, source_dt.microsecond)
+
+
+# mirror: end timestamps
+
+
+DURATION_UNITS: dict[str, int] = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+SIZE_UNITS: dict[str, int] = {
+    "": 1,
+    "K": 1024,
+    "M": 1024**2,
+    "G": 1024**3,
+    "T": 1024**4,
+}
+
+
+def parse_duration(text: str) -> float:
+    """Parses a duration such as `30d`, `12h` or `90m` into seconds."""
+    match: re.Match[str] | None = re.fullmatch(
+        r"\s*(\d+(?:\.\d+)?)\s*([smhdw])\s*", text
+    )
+    if match is None:
+        raise ValueError(
+            f"Invalid duration {text!r}. Use a number followed by s, m, h, d or w."
+        )
+    return float(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+def parse_size(text: str) -> int:
+    """Parses a size such as `500M`, `1.5G` or `4096` into bytes (binary units)."""
+    match: re.Match[str] | None = re.fullmatch(
+        r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*", text, re.IGNORECASE
+    )
+    if match is None:
+        raise ValueError(
+            f"Invalid size {text!r}. Use a number followed by K, M, G or T."
+        )
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
 
-    return local_dt.strftime(fmt)
+
+def format_size(size: int) -> str:
+    """Formats a byte count for humans, e.g. `1.5 MiB`."""
+    value: float = float(size)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TiB"
 
 
 def nix_run_prefix(command: str) -> tuple[str, ...]:
@@ -43,36 +419,180 @@ def nix_run_prefix(command: str) -> tuple[str, ...]:
     return (
         str(which_nix()),
         "run",
-        "--extra-experimental-features",
-        "nix-command",
-        f"nixpkgs#{command}",
+        *NIX_FEATURES,
+        nixpkgs_flake_ref(command),
         "--",
     )
 
 
-def which_nix() -> Path:
-    """Returns the path to the nix executable."""
-    result: CompletedProcess[str] = subprocess.run(
-        ["which", "nix"],
+def nixpkgs_revision() -> str:
+    """Returns the nixpkgs revision store paths are cached under.
+
+    Packaged apps get the flake lock revision through `MOSCRIPTS_NIXPKGS_REV`.
+    Anything else falls back to the floating `nixpkgs` registry entry.
+    """
+    return os.environ.get("MOSCRIPTS_NIXPKGS_REV", "unpinned")
+
+
+def nixpkgs_flake_ref(command: str) -> str:
+    """Returns the flake reference for a nixpkgs package, pinned when possible."""
+    revision: str = nixpkgs_revision()
+    if revision == "unpinned":
+        return f"nixpkgs#{command}"
+    return f"nixpkgs/{revision}#{command}"
+
+
+def write_atomic(path: Path, text: str) -> None:
+    """Writes `text` to `path` through a temporary file, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file: Path = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_file.write_text(text, encoding="utf-8")
+    os.replace(tmp_file, path)
+
+
+def load_store_paths(
+    cache_file: Path = STORE_PATH_CACHE,
+) -> dict[str, dict[str, str]]:
+    """Loads cached store paths as `{revision: {package: main_program}}`."""
+    try:
+        with open(cache_file) as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return entries if isinstance(entries, dict) else {}
+
+
+def save_store_paths(
+    entries: dict[str, dict[str, str]], cache_file: Path = STORE_PATH_CACHE
+) -> None:
+    """Atomically writes cached store paths."""
+    write_atomic(cache_file, json.dumps(entries, indent=2, sort_keys=True))
+
+
+def cached_store_path(command: str, cache_file: Path = STORE_PATH_CACHE) -> Path | None:
+    """Returns the cached main program for `command` if it is still in the store."""
+    entries: dict[str, str] = load_store_paths(cache_file).get(nixpkgs_revision(), {})
+    location: str | None = entries.get(command)
+    if location is None or not os.access(location, os.X_OK):
+        return None
+    return Path(location)
+
+
+def realise_store_path(command: str) -> Path:
+    """Builds `command` from nixpkgs and returns the path of its main program."""
+    nix: str = str(which_nix())
+    flake_ref: str = nixpkgs_flake_ref(command)
+    build: CompletedProcess[str] = subprocess.run(
+        [nix, "build", *NIX_FEATURES, "--no-link", "--print-out-paths", flake_ref],
         capture_output=True,
         text=True,
+        check=True,
     )
-    assert result.returncode == 0, "Nix not found. Please install it."
-    nix: Path = Path(result.stdout.strip())
-    assert nix.exists(), "Nix not found. Please install it."
-    return nix
-
-
-def which_executable(executable: str) -> Path:
-    """Returns the path to the nix executable."""
-    result: CompletedProcess[str] = subprocess.run(
-        ["which", executable],
+    main_program: CompletedProcess[str] = subprocess.run(
+        [nix, "eval", *NIX_FEATURES, "--raw", f"{flake_ref}.meta.mainProgram"],
         capture_output=True,
         text=True,
     )
-    assert result.returncode == 0, f"{executable} not found."
-    location: Path = Path(result.stdout.strip())
-    assert location.exists(), f"{executable} not found."
-    assert location.is_file(), f"{executable} is not a file."
-    assert os.access(location, os.X_OK), f"{executable} is not executable."
+    program: str = main_program.stdout.strip() or command
+    for out_path in build.stdout.split():
+        location: Path = Path(out_path) / "bin" / program
+        if location.exists():
+            return location
+    raise FileNotFoundError(f"{program} not found in outputs of {flake_ref}")
+
+
+def warm_store_path(command: str, cache_file: Path = STORE_PATH_CACHE) -> Path:
+    """Realises `command` and records its main program in the cache."""
+    location: Path = realise_store_path(command)
+    entries: dict[str, dict[str, str]] = load_store_paths(cache_file)
+    entries.setdefault(nixpkgs_revision(), {})[command] = str(location)
+    save_store_paths(entries, cache_file)
     return location
+
+
+def prune_store_paths(cache_file: Path = STORE_PATH_CACHE) -> list[tuple[str, str]]:
+    """Drops entries from other revisions or garbage-collected paths.
+
+    Returns the `(revision, package)` pairs that were removed.
+    """
+    revision: str = nixpkgs_revision()
+    entries: dict[str, dict[str, str]] = load_store_paths(cache_file)
+    kept: dict[str, dict[str, str]] = {}
+    removed: list[tuple[str, str]] = []
+    for entry_revision, packages in entries.items():
+        for command, location in packages.items():
+            if entry_revision == revision and os.access(location, os.X_OK):
+                kept.setdefault(entry_revision, {})[command] = location
+            else:
+                removed.append((entry_revision, command))
+    save_store_paths(kept, cache_file)
+    return removed
+
+
+def nix_exec_prefix(
+    command: str, cache_file: Path = STORE_PATH_CACHE
+) -> tuple[str, ...]:
+    """Returns a prefix that execs `command` directly from the store.
+
+    When the package is not cached for the current nixpkgs revision, or its
+    store path has been garbage-collected, it is realised and recorded so later
+    calls skip nix. Falls back to `nix_run_prefix` if that fails.
+    """
+    location: Path | None = cached_store_path(command, cache_file)
+    if location is None:
+        try:
+            location = warm_store_path(command, cache_file)
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return nix_run_prefix(command)
+    return (str(location),)
+
+
+# Cache of resolved executables: name -> (PATH searched, location, mtime_ns)
+_EXECUTABLE_CACHE: dict[str, tuple[str, Path, int]] = {}
+
+
+def resolve_executable(executable: str) -> Path:
+    """Resolves an executable on `PATH` in-process, memoized for the process.
+
+    Uses `shutil.which` semantics instead of forking `which`. A cached entry is
+    reused until `PATH` changes or the resolved file's mtime changes.
+    """
+    search_path: str = os.environ.get("PATH", os.defpath)
+    cached: tuple[str, Path, int] | None = _EXECUTABLE_CACHE.get(executable)
+    if cached is not None:
+        cached_search_path, location, mtime_ns = cached
+        if cached_search_path == search_path:
+            try:
+                if location.stat().st_mtime_ns == mtime_ns:
+                    return location
+            except OSError:
+                pass
+        del _EXECUTABLE_CACHE[executable]
+
+    found: str | None = shutil.which(executable, path=search_path)
+    assert found is not None, f"{executable} not found."
+    location = Path(found)
+    _EXECUTABLE_CACHE[executable] = (
+        search_path,
+        location,
+        location.stat().st_mtime_ns,
+    )
+    return location
+
+
+def clear_executable_cache() -> None:
+    """Forgets every executable resolved by `resolve_executable`."""
+    _EXECUTABLE_CACHE.clear()
+
+
+def which_nix() -> Path:
+    """Returns the path to the nix executable."""
+    try:
+        return resolve_executable("nix")
+    except AssertionError:
+        raise AssertionError("Nix not found. Please install it.") from None
+
+
+def which_executable(executable: str) -> Path:
+    """Returns the path to an executable on `PATH`."""
+    return resolve_executable(executable)
@@ -0,0 +1,186 @@
+# Standard Library
+from importlib.util import module_from_spec, spec_from_file_location
+from subprocess import CompletedProcess
+from datetime import datetime, timezone
+from types import ModuleType
+from pathlib import Path
+import subprocess
+import ast
+import io
+import sys
+
+# Third Party
+
+# My Imports
+
+
+test_dir: Path = Path(__file__).parent
+pythonScripts_dir: Path = test_dir.parent / "pythonScripts"
+
+
+def load_human_timestamp() -> ModuleType:
+    spec = spec_from_file_location(
+        "human_timestamp", pythonScripts_dir / "human_timestamp.py"
+    )
+    assert spec is not None and spec.loader is not None
+    module: ModuleType = module_from_spec(spec)
+    sys.modules["human_timestamp"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+human_timestamp: ModuleType = load_human_timestamp()
+
+
+def mirrored_block(path: Path) -> str:
+    """Returns the AST of the code between the `mirror` markers of `path`."""
+    text: str = path.read_text()
+    start: int = text.index("# mirror: begin timestamps")
+    end: int = text.index("# mirror: end timestamps")
+    return ast.dump(ast.parse(text[start:end]))
+
+
+def test_timestamp_code_matches_utilities() -> None:
+    utilities: Path = test_dir.parent / "src" / "moscripts" / "utilities.py"
+    assert mirrored_block(pythonScripts_dir / "human_timestamp.py") == (
+        mirrored_block(utilities)
+    )
+
+
+def test_human_timestamp_convert_stdin() -> None:
+    result: CompletedProcess[str] = subprocess.run(
+        [
+            sys.executable,
+            str(pythonScripts_dir / "human_timestamp.py"),
+            "convert",
+            "-t",
+            "America/Chicago",
+            "-f",
+            "%Y-%m-%d %H:%M %Z",
+        ],
+        input="1710057600\n2024-03-10T07:59:00Z\nnot a timestamp\n",
+        capture_output=True,
+        text=True,
+    )
+    assert result.stderr == ""
+    assert result.stdout.splitlines() == [
+        "2024-03-10 03:00 CDT",
+        "2024-03-10 01:59 CST",
+        "not a timestamp",
+    ]
+
+
+def test_convert_lines_passes_out_of_range_through() -> None:
+    formatter = human_timestamp.CompiledFormatter("%Y", "UTC")
+    lines: list[str] = ["12345678901234567890\n", "1e300\n", "-1e20\n", "1700000000\n"]
+    assert list(human_timestamp.convert_lines(lines, formatter)) == [
+        *lines[:3],
+        "2023\n",
+    ]
+
+
+def test_human_timestamp_convert_file(tmp_path: Path) -> None:
+    source: Path = tmp_path / "timestamps.txt"
+    source.write_text("".join(f"{1_700_000_000 + i}\n" for i in range(20000)))
+    result: CompletedProcess[str] = subprocess.run(
+        [
+            sys.executable,
+            str(pythonScripts_dir / "human_timestamp.py"),
+            "convert",
+            str(source),
+            "-t",
+            "UTC",
+            "-f",
+            "%H:%M:%S",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    assert result.stderr == ""
+    lines: list[str] = result.stdout.splitlines()
+    assert len(lines) == 20000
+    assert lines[0] == "22:13:20"
+    assert lines[-1] == "03:46:39"
+
+
+def test_human_timestamp_convert_bad_zone() -> None:
+    result: CompletedProcess[str] = subprocess.run(
+        [
+            sys.executable,
+            str(pythonScripts_dir / "human_timestamp.py"),
+            "convert",
+            "-t",
+            "FAIL",
+        ],
+        input="1700000000\n",
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 1
+    assert "FAIL" in result.stderr
+
+
+LOG: str = """1700000000 INFO started
+[2024-03-10T07:59:00Z] WARN retry at 1710057600.5 id=123456789012
+2024-03-10 08:00:00+02:00 DEBUG plain 2024-13-99T99:99:99Z
+no timestamps here
+"""
+
+
+def test_rewrite_matches_single_shot(tmp_path: Path) -> None:
+    fmt: str = "%Y-%m-%d %I:%M:%S %p %Z"
+    source: Path = tmp_path / "app.log"
+    source.write_text(LOG)
+
+    def single_shot(epoch: float) -> str:
+        return human_timestamp.create_human_readable_timestamp(
+            datetime.fromtimestamp(epoch, timezone.utc), "America/Chicago", fmt
+        )
+
+    sink = io.BytesIO()
+    assert human_timestamp.rewrite_log(source, sink, fmt=fmt) == 1
+    assert sink.getvalue().decode().splitlines() == [
+        f"{single_shot(1_700_000_000)} INFO started",
+        f"[{single_shot(1_710_057_540)}] WARN retry at {single_shot(1_710_057_600.5)} id=123456789012",
+        f"{single_shot(1_710_050_400)} DEBUG plain 2024-13-99T99:99:99Z",
+        "no timestamps here",
+    ]
+
+
+def test_rewrite_log_in_parallel(tmp_path: Path) -> None:
+    source: Path = tmp_path / "app.log"
+    source.write_text(LOG * 500)
+
+    serial = io.BytesIO()
+    chunks: int = human_timestamp.rewrite_log(source, serial, "UTC", chunk_size=1000)
+    parallel = io.BytesIO()
+    assert (
+        human_timestamp.rewrite_log(source, parallel, "UTC", workers=2, chunk_size=1000)
+        == chunks
+        > 1
+    )
+    assert parallel.getvalue() == serial.getvalue()
+    assert serial.getvalue().count(b"\n") == LOG.count("\n") * 500
+
+    result: CompletedProcess[str] = subprocess.run(
+        [
+            sys.executable,
+            str(pythonScripts_dir / "human_timestamp.py"),
+            "rewrite",
+            str(source),
+            "-t",
+            "UTC",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    assert result.stderr == ""
+    assert result.stdout.encode() == serial.getvalue()
+
+
+def test_rewrite_empty_log(tmp_path: Path) -> None:
+    source: Path = tmp_path / "empty.log"
+    source.touch()
+    sink = io.BytesIO()
+    assert human_timestamp.rewrite_log(source, sink) == 0
+    assert sink.getvalue() == b""
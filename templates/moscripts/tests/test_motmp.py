@@ -0,0 +1,308 @@
+# Standard Library
+from importlib.util import module_from_spec, spec_from_file_location
+from pathlib import Path
+from types import ModuleType
+import subprocess
+import json
+import time
+import sys
+import os
+
+# Third Party
+import pytest
+from typer import Exit
+from typer.testing import CliRunner
+
+# My Imports
+
+
+test_dir: Path = Path(__file__).parent
+app_dir: Path = test_dir.parent / "apps"
+
+
+def load_motmp() -> ModuleType:
+    spec = spec_from_file_location("motmp", app_dir / "motmp.py")
+    assert spec is not None and spec.loader is not None
+    module: ModuleType = module_from_spec(spec)
+    sys.modules["motmp"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+motmp: ModuleType = load_motmp()
+
+
+def make_notebooks(directory: Path, count: int) -> list[Path]:
+    """Creates `count` MOTMP files, oldest first."""
+    notebooks: list[Path] = []
+    for i in range(count):
+        notebook: Path = directory / f"motmp_{i}.py"
+        notebook.touch()
+        notebooks.append(notebook)
+        time.sleep(0.01)
+    return notebooks
+
+
+def test_scan_motmp(tmp_path: Path) -> None:
+    notebooks: list[Path] = make_notebooks(tmp_path, 3)
+    (tmp_path / "notes.py").touch()
+    session: Path = tmp_path / "__marimo__" / "session"
+    session.mkdir(parents=True)
+    (session / "motmp_1.py.json").touch()
+
+    records = motmp.scan_motmp(tmp_path, tmp_path / "index.sqlite3")
+    assert [record.path for record in records] == notebooks[::-1]
+    assert records[1].session == session / "motmp_1.py.json"
+    assert records[0].session is None
+    assert list(motmp.sort_motmp_files(records)) == ["motmp_2", "motmp_1", "motmp_0"]
+
+
+def test_get_previous_file(tmp_path: Path) -> None:
+    notebooks: list[Path] = make_notebooks(tmp_path, 4)
+
+    index_file: Path = tmp_path / "index.sqlite3"
+
+    assert motmp.get_previous_file(tmp_path, 0, index_file) == notebooks[-1]
+    assert motmp.get_previous_file(tmp_path, 2, index_file) == notebooks[1]
+    assert motmp.get_previous_file(tmp_path, -1, index_file) == notebooks[0]
+    assert motmp.get_previous_file(tmp_path, -2, index_file) == notebooks[1]
+    with pytest.raises(Exit):
+        motmp.get_previous_file(tmp_path, 4, index_file)
+
+
+def test_wipe_motmp(tmp_path: Path) -> None:
+    make_notebooks(tmp_path, 2)
+    session: Path = tmp_path / "__marimo__" / "session"
+    session.mkdir(parents=True)
+    (session / "motmp_0.py.json").touch()
+
+    index_file: Path = tmp_path / "index.sqlite3"
+
+    motmp.wipe_motmp(motmp.scan_motmp(tmp_path, index_file))
+    assert motmp.scan_motmp(tmp_path, index_file) == []
+    assert list(session.iterdir()) == []
+
+
+def test_index_refreshes_incrementally(tmp_path: Path) -> None:
+    notebooks: Path = tmp_path / "notebooks"
+    notebooks.mkdir()
+    index_file: Path = tmp_path / "index.sqlite3"
+    first: Path = notebooks / "motmp_first.py"
+    first.write_text(
+        '@app.cell\ndef _(mo):\n    mo.md(r"""\n    # Sales forecast\n    """)\n'
+    )
+
+    (record,) = motmp.scan_motmp(notebooks, index_file)
+    assert record.title == "Sales forecast"
+    assert record.size == first.stat().st_size
+
+    second: Path = notebooks / "motmp_second.py"
+    second.write_text('mo.md("## Scratch")\n')
+    assert [r.path for r in motmp.scan_motmp(notebooks, index_file)][0] == second
+
+    (match,) = motmp.search_motmp(notebooks, "forecast", index_file)
+    assert match.path == first
+    assert motmp.search_motmp(notebooks, "100%", index_file) == []
+
+    first.unlink()
+    assert [r.path for r in motmp.scan_motmp(notebooks, index_file)] == [second]
+
+
+def test_index_skips_unchanged_directory(tmp_path: Path, monkeypatch) -> None:
+    notebooks: Path = tmp_path / "notebooks"
+    notebooks.mkdir()
+    index_file: Path = tmp_path / "index.sqlite3"
+    make_notebooks(notebooks, 2)
+    # Backdate the directory so its mtime is trusted.
+    os.utime(notebooks, ns=(0, 1_000_000_000))
+    assert len(motmp.scan_motmp(notebooks, index_file)) == 2
+
+    def fail(*args, **kwargs):
+        raise AssertionError("directory was listed")
+
+    monkeypatch.setattr(motmp.os, "scandir", fail)
+    assert len(motmp.scan_motmp(notebooks, index_file)) == 2
+
+
+def test_index_sees_in_place_edits(tmp_path: Path) -> None:
+    notebooks: Path = tmp_path / "notebooks"
+    notebooks.mkdir()
+    index_file: Path = tmp_path / "index.sqlite3"
+    notebook: Path = notebooks / "motmp_edited.py"
+    notebook.write_text('mo.md("# Draft")\n')
+    os.utime(notebooks, ns=(0, 1_000_000_000))
+    assert motmp.scan_motmp(notebooks, index_file)[0].title == "Draft"
+
+    # Rewriting a file leaves the directory mtime alone.
+    notebook.write_text('mo.md("# Quarterly report")\n')
+    os.utime(notebooks, ns=(0, 1_000_000_000))
+    (record,) = motmp.scan_motmp(notebooks, index_file)
+    assert record.title == "Quarterly report"
+    assert record.size == notebook.stat().st_size
+
+
+def test_select_expired() -> None:
+    now: float = 1_000_000.0
+    records = [
+        motmp.MotmpRecord(Path(f"motmp_{i}.py"), now - i * 86400, None, 100, "", 50)
+        for i in range(5)
+    ]
+
+    assert motmp.select_expired(records, now=now) == []
+    assert motmp.select_expired(records, older_than=2.5 * 86400, now=now) == records[3:]
+    assert motmp.select_expired(records, keep_last=1, now=now) == records[1:]
+    assert motmp.select_expired(records, max_total_size=300, now=now) == records[2:]
+    assert (
+        motmp.select_expired(records[::-1], keep_last=4, older_than=86400 * 10, now=now)
+        == records[4:]
+    )
+
+
+def test_wipe_motmp_reports_reclaimed_bytes(tmp_path: Path) -> None:
+    index_file: Path = tmp_path / "index.sqlite3"
+    notebooks: Path = tmp_path / "notebooks"
+    notebooks.mkdir()
+    session: Path = notebooks / "__marimo__" / "session"
+    session.mkdir(parents=True)
+    for i in range(600):
+        (notebooks / f"motmp_{i}.py").write_bytes(b"x" * 10)
+        (session / f"motmp_{i}.py.json").write_bytes(b"y" * 5)
+
+    records = motmp.scan_motmp(notebooks, index_file)
+    assert sum(r.session_size for r in records) == 3000
+    assert motmp.wipe_motmp(records, batch_size=64) == 9000
+    assert motmp.scan_motmp(notebooks, index_file) == []
+    assert list(session.iterdir()) == []
+
+
+def test_retention_options_imply_scan(tmp_path: Path, monkeypatch) -> None:
+    index_file: Path = tmp_path / "index.sqlite3"
+    notebooks: Path = tmp_path / "notebooks"
+    notebooks.mkdir()
+    make_notebooks(notebooks, 3)
+    scan_motmp = motmp.scan_motmp
+    monkeypatch.setattr(motmp, "MOTMP", notebooks)
+    monkeypatch.setattr(
+        motmp, "scan_motmp", lambda directory: scan_motmp(directory, index_file)
+    )
+
+    result = CliRunner().invoke(
+        motmp.app, [str(notebooks), "--keep-last", "1", "--dry-run"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "2 MOTMP files to wipe" in result.output
+    assert len(list(notebooks.glob("motmp_*.py"))) == 3
+
+
+def make_venv(venv: Path) -> None:
+    (venv / "bin").mkdir(parents=True)
+    (venv / "bin" / "python").symlink_to(sys.executable)
+    (venv / "bin" / "marimo").write_text("#!/bin/sh\n")
+    (venv / "pyvenv.cfg").write_text("relocatable = true\n")
+
+
+def test_dependency_hash_is_order_independent() -> None:
+    assert motmp.dependency_hash(["a", "b"]) == motmp.dependency_hash(["b", "a"])
+    assert motmp.dependency_hash(["a"]) != motmp.dependency_hash(["a", "b"])
+
+
+def test_clone_venv_template(tmp_path: Path) -> None:
+    template: Path = tmp_path / "template"
+    make_venv(template / ".venv")
+    (template / "pyproject.toml").write_text("[project]\nname = 'motmp'\n")
+    (template / "uv.lock").write_text("version = 1\n")
+    motmp.write_venv_manifest(template / ".venv", motmp.MOTMP_DEPENDENCIES)
+    assert motmp.venv_manifest_valid(template / ".venv")
+
+    destination: Path = tmp_path / "motmp"
+    destination.mkdir()
+    venv: Path = motmp.clone_venv_template(template, destination)
+
+    assert (venv / "bin" / "python").is_symlink()
+    assert (venv / "bin" / "marimo").samefile(template / ".venv" / "bin" / "marimo")
+    assert (destination / "pyproject.toml").exists()
+    assert motmp.venv_manifest_valid(venv)
+    assert motmp.validate_venv(venv) == venv
+
+    # Installing or removing entry points invalidates the manifest.
+    (venv / "bin" / "marimo").unlink()
+    assert not motmp.venv_manifest_valid(venv)
+    assert not motmp.venv_manifest_valid(venv, ["marimo"])
+
+
+def test_validate_venv_rebuilds_with_bytecode(tmp_path: Path, monkeypatch) -> None:
+    calls: list[bool] = []
+    monkeypatch.setattr(motmp, "confirm", lambda *args, **kwargs: True)
+    monkeypatch.setattr(
+        motmp,
+        "init_motmp",
+        lambda compile_bytecode=False: calls.append(compile_bytecode),
+    )
+    # Still broken after the rebuild, so the retry gives up.
+    with pytest.raises(Exit):
+        motmp.validate_venv(tmp_path, compile_bytecode=True)
+    assert calls == [True]
+
+
+FAKE_MARIMO: str = """#!{python}
+import sys
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+port = int(sys.argv[sys.argv.index("--port") + 1])
+print(f"URL: http://127.0.0.1:{{port}}?access_token=fake-token", flush=True)
+HTTPServer(("127.0.0.1", port), SimpleHTTPRequestHandler).serve_forever()
+"""
+
+
+def test_daemon_lifecycle(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(motmp, "MOTMP", tmp_path)
+    venv: Path = tmp_path / ".venv"
+    (venv / "bin").mkdir(parents=True)
+    marimo: Path = venv / "bin" / "marimo"
+    marimo.write_text(FAKE_MARIMO.format(python=sys.executable))
+    marimo.chmod(0o755)
+
+    assert motmp.read_daemon(venv) is None
+    state = motmp.start_daemon(venv, tmp_path)
+    try:
+        assert motmp.read_daemon(venv) == state
+        notebook: Path = tmp_path / "motmp_a.py"
+        assert motmp.daemon_url(state, notebook) == (
+            f"http://127.0.0.1:{state['port']}/?file=motmp_a.py&access_token=fake-token"
+        )
+        assert motmp.daemon_state_file(venv).stat().st_mode & 0o777 == 0o600
+        assert (
+            motmp.daemon_state_file(venv).with_suffix(".log").stat().st_mode & 0o777
+            == 0o600
+        )
+        assert motmp.daemon_url(state, Path("/elsewhere/motmp_b.py")) is None
+    finally:
+        assert motmp.stop_daemon(venv)
+    assert not motmp.daemon_state_file(venv).exists()
+
+
+def test_read_daemon_removes_stale_pidfile(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(motmp, "MOTMP", tmp_path)
+    venv: Path = tmp_path / ".venv"
+    state_file: Path = motmp.daemon_state_file(venv)
+    state_file.write_text('{"pid": 999999999, "port": 1}')
+
+    assert motmp.read_daemon(venv) is None
+    assert not state_file.exists()
+
+
+def test_stop_daemon_that_is_not_answering(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(motmp, "MOTMP", tmp_path)
+    venv: Path = tmp_path / ".venv"
+    hung = subprocess.Popen(
+        [sys.executable, "-c", "import time; time.sleep(60)"], start_new_session=True
+    )
+    state: dict[str, int] = {"pid": hung.pid, "port": 1}
+    motmp.daemon_state_file(venv).write_text(json.dumps(state))
+
+    # A live server that never opens its port is still found and stopped.
+    assert motmp.read_daemon(venv) == state
+    assert not motmp.wait_for_port(1, hung.pid, timeout=0.1)
+    assert motmp.stop_daemon(venv)
+    assert hung.wait(timeout=5) != 0
+    assert motmp.read_daemon(venv) is None
@@ -0,0 +1,166 @@
+# Standard Library
+from importlib.util import module_from_spec, spec_from_file_location
+from pathlib import Path
+from types import ModuleType
+import os
+import sys
+
+# Third Party
+
+# My Imports
+
+
+test_dir: Path = Path(__file__).parent
+app_dir: Path = test_dir.parent / "apps"
+
+
+def load_mpv_playlists() -> ModuleType:
+    spec = spec_from_file_location("mpv_playlists", app_dir / "mpv_playlists.py")
+    assert spec is not None and spec.loader is not None
+    module: ModuleType = module_from_spec(spec)
+    sys.modules["mpv_playlists"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+mpv_playlists: ModuleType = load_mpv_playlists()
+
+
+def make_playlists(directory: Path, names: list[str]) -> None:
+    directory.mkdir()
+    for name in names:
+        (directory / name).touch()
+    # Backdate the directory so its mtime is trusted by the cache.
+    os.utime(directory, ns=(0, 1_000_000_000))
+
+
+def test_catalog_is_lazy(tmp_path: Path) -> None:
+    catalog = mpv_playlists.PlaylistCatalog(tmp_path / "missing", tmp_path / "c.json")
+    assert not (tmp_path / "c.json").exists()
+    assert catalog.directory == tmp_path / "missing"
+
+
+def test_catalog_filter(tmp_path: Path) -> None:
+    playlists: Path = tmp_path / "Playlists"
+    make_playlists(
+        playlists, ["Road Trip.m3u", "Chill.m3u", "Rock Classics.m3u", "Art.m3u"]
+    )
+    catalog = mpv_playlists.PlaylistCatalog(playlists, tmp_path / "c.json")
+
+    assert len(catalog) == 4
+    assert catalog[1] == playlists / "Chill.m3u"
+    names: list[str] = catalog.load()
+    assert [names[i] for i in catalog.filter("ROCK")] == ["Rock Classics.m3u"]
+    # Substring matches rank ahead of fuzzy ones.
+    assert [names[i] for i in catalog.filter("rt")] == ["Art.m3u", "Road Trip.m3u"]
+    assert catalog.filter("zzz") == []
+    assert catalog.resolve(Path("Chill.m3u")) in catalog
+    assert catalog.resolve(None) == playlists / "Art.m3u"
+    assert Path("/elsewhere/Chill.m3u") not in catalog
+
+
+def test_catalog_cache(tmp_path: Path, monkeypatch) -> None:
+    playlists: Path = tmp_path / "Playlists"
+    make_playlists(playlists, ["a.m3u", "b.m3u"])
+    cache_file: Path = tmp_path / "c.json"
+    assert len(mpv_playlists.PlaylistCatalog(playlists, cache_file)) == 2
+
+    def fail(*args, **kwargs):
+        raise AssertionError("directory was listed")
+
+    with monkeypatch.context() as m:
+        m.setattr(mpv_playlists.os, "scandir", fail)
+        assert len(mpv_playlists.PlaylistCatalog(playlists, cache_file)) == 2
+
+    (playlists / "c.m3u").touch()
+    assert len(mpv_playlists.PlaylistCatalog(playlists, cache_file)) == 3
+
+
+def test_index_playlist_formats(tmp_path: Path) -> None:
+    music: Path = tmp_path / "Music"
+    (music / "album" / "disc1").mkdir(parents=True)
+    for track in ("a.mp3", "album/b.flac", "album/disc1/c.ogg", "album/cover.jpg"):
+        (music / track).touch()
+
+    m3u: Path = tmp_path / "mix.m3u"
+    m3u.write_text(
+        "#EXTM3U\n#EXTINF:1,A\nMusic/a.mp3\nMusic/missing.mp3\n"
+        f"{music / 'album' / 'b.flac'}\nhttps://radio.example/stream\n"
+    )
+    pls: Path = tmp_path / "mix.pls"
+    pls.write_text(
+        "[playlist]\nFile2=Music/album/b.flac\nFile1=Music/a.mp3\n"
+        "File3=Music/gone.mp3\nNumberOfEntries=3\n"
+    )
+    cache_dir: Path = tmp_path / "cache"
+
+    assert mpv_playlists.index_playlist(m3u, cache_dir) == [
+        str(music / "a.mp3"),
+        str(music / "album" / "b.flac"),
+        "https://radio.example/stream",
+    ]
+    assert mpv_playlists.index_playlist(pls, cache_dir) == [
+        str(music / "a.mp3"),
+        str(music / "album" / "b.flac"),
+    ]
+    assert mpv_playlists.index_playlist(music, cache_dir) == [
+        str(music / "a.mp3"),
+        str(music / "album" / "b.flac"),
+        str(music / "album" / "disc1" / "c.ogg"),
+    ]
+
+
+def test_index_playlist_cache(tmp_path: Path, monkeypatch) -> None:
+    (tmp_path / "a.mp3").touch()
+    m3u: Path = tmp_path / "mix.m3u"
+    m3u.write_text("a.mp3\n")
+    cache_dir: Path = tmp_path / "cache"
+    # Just written, so the mtime is not trusted yet.
+    assert mpv_playlists.index_playlist(m3u, cache_dir) == [str(tmp_path / "a.mp3")]
+    os.utime(m3u, ns=(0, 1_000_000_000))
+    assert len(mpv_playlists.index_playlist(m3u, cache_dir)) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("playlist was parsed")
+
+    with monkeypatch.context() as m:
+        m.setattr(mpv_playlists, "parse_playlist", fail)
+        assert len(mpv_playlists.index_playlist(m3u, cache_dir)) == 1
+        # Cached entries are still checked for existence.
+        (tmp_path / "a.mp3").unlink()
+        assert mpv_playlists.index_playlist(m3u, cache_dir) == []
+        (tmp_path / "a.mp3").touch()
+        assert len(mpv_playlists.index_playlist(m3u, cache_dir)) == 1
+
+    m3u.write_text("a.mp3\na.mp3\n")
+    os.utime(m3u, ns=(0, 2_000_000_000))
+    assert len(mpv_playlists.index_playlist(m3u, cache_dir)) == 2
+
+
+def test_index_playlist_sees_nested_changes(tmp_path: Path) -> None:
+    music: Path = tmp_path / "Music"
+    disc: Path = music / "album" / "disc1"
+    disc.mkdir(parents=True)
+    (disc / "a.mp3").touch()
+    for directory in (disc, disc.parent, music):
+        os.utime(directory, ns=(0, 1_000_000_000))
+    cache_dir: Path = tmp_path / "cache"
+    assert len(mpv_playlists.index_playlist(music, cache_dir)) == 1
+
+    # Only the innermost directory's mtime changes.
+    (disc / "b.mp3").touch()
+    assert len(mpv_playlists.index_playlist(music, cache_dir)) == 2
+
+
+def test_write_queue(tmp_path: Path) -> None:
+    playlist: Path = tmp_path / "mix.m3u"
+    tracks: list[str] = [f"/music/{i}.mp3" for i in range(50)]
+    queue: Path = mpv_playlists.write_queue(playlist, tracks, True, tmp_path)
+    lines: list[str] = queue.read_text().splitlines()
+    assert lines[0] == "#EXTM3U"
+    assert sorted(lines[1:]) == sorted(tracks)
+
+    # Launching the playlist again reuses its queue file.
+    assert mpv_playlists.write_queue(playlist, tracks[:1], False, tmp_path) == queue
+    assert queue.read_text() == "#EXTM3U\n/music/0.mp3\n"
+    assert list(tmp_path.glob("*.m3u")) == [queue]
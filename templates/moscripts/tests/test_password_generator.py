@@ -215,3 +215,151 @@ def test_password_generator_length() -> None:
     assert result.stdout != ""
     assert result.stderr == ""
     assert len(result.stdout.strip()) == 64
+
+
+def test_password_generator_bulk(tmp_path: Path) -> None:
+    import string
+
+    output: Path = tmp_path / "passwords.txt"
+    result: CompletedProcess[str] = subprocess.run(
+        [
+            sys.executable,
+            str(pythonScripts_dir / "password_generator.py"),
+            "--count",
+            "200000",
+            "--length",
+            "64",
+            "--output",
+            str(output),
+        ],
+        capture_output=True,
+        text=True,
+    )
+    assert result.stderr == ""
+    assert "Wrote 200000 passwords" in result.stdout
+    passwords: list[str] = output.read_text().splitlines()
+    assert len(passwords) == 200000
+    assert all(len(password) == 64 for password in passwords)
+    allowed: set[str] = set(string.ascii_letters + string.digits + "!#$%&?@")
+    assert set("".join(passwords)) == allowed
+    assert len(set(passwords)) == len(passwords)
+
+
+def test_password_generator_bulk_stdout() -> None:
+    import string
+
+    result: CompletedProcess[str] = subprocess.run(
+        [
+            sys.executable,
+            str(pythonScripts_dir / "password_generator.py"),
+            "-n",
+            "1000",
+            "--length",
+            "16",
+            "--no-symbols",
+            "--no-uppercase",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    assert result.stderr == ""
+    passwords: list[str] = result.stdout.split()
+    assert len(passwords) == 1000
+    allowed: set[str] = set(string.ascii_lowercase + string.digits)
+    assert all(set(password) <= allowed for password in passwords)
+    # Every allowed character shows up across 16k unbiased draws.
+    assert set("".join(passwords)) == allowed
+
+
+def test_password_generator_policy() -> None:
+    import string
+
+    result: CompletedProcess[str] = subprocess.run(
+        [
+            sys.executable,
+            str(pythonScripts_dir / "password_generator.py"),
+            "-n",
+            "500",
+            "--length",
+            "12",
+            "--min-digits",
+            "3",
+            "--min-symbols",
+            "2",
+            "--no-repeat",
+            "--exclude-ambiguous",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    assert result.stderr == ""
+    passwords: list[str] = result.stdout.split()
+    assert len(passwords) == 500
+    for password in passwords:
+        assert len(password) == 12
+        assert sum(char in string.digits for char in password) >= 3
+        assert sum(char in "!#$%&?@" for char in password) >= 2
+        assert all(a != b for a, b in zip(password, password[1:]))
+        assert not set(password) & set("0Oo1lI|`'\"")
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            str(pythonScripts_dir / "password_generator.py"),
+            "--length",
+            "8",
+            "--min-uppercase",
+            "2",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    assert result.stderr == ""
+    assert "entropy_bits=" in result.stdout
+
+
+def test_password_generator_policy_long() -> None:
+    import string
+
+    result: CompletedProcess[str] = subprocess.run(
+        [
+            sys.executable,
+            str(pythonScripts_dir / "password_generator.py"),
+            "--cli",
+            "--length",
+            "20000",
+            "--min-digits",
+            "500",
+            "--min-symbols",
+            "500",
+            "--no-repeat",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    assert result.stderr == ""
+    password: str = result.stdout.strip()
+    assert len(password) == 20000
+    assert sum(char in string.digits for char in password) >= 500
+    assert sum(char in "!#$%&?@" for char in password) >= 500
+    assert all(a != b for a, b in zip(password, password[1:]))
+    assert set(password) <= set(string.ascii_letters + string.digits + "!#$%&?@")
+
+
+def test_password_generator_policy_impossible() -> None:
+    result: CompletedProcess[str] = subprocess.run(
+        [
+            sys.executable,
+            str(pythonScripts_dir / "password_generator.py"),
+            "--length",
+            "4",
+            "--min-digits",
+            "3",
+            "--min-symbols",
+            "2",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode != 0
+    assert "more than the password length" in result.stderr
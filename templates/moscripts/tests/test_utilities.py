@@ -1,7 +1,10 @@
 # Standard Library
 from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+from pathlib import Path
 import subprocess
 from subprocess import CompletedProcess
+import os
 
 # Third Party
 import pytest
@@ -12,6 +15,23 @@ from moscripts.utilities import (
     which_nix,
     nix_run_prefix,
     which_executable,
+    resolve_executable,
+    clear_executable_cache,
+    nixpkgs_flake_ref,
+    nix_exec_prefix,
+    cached_store_path,
+    load_store_paths,
+    save_store_paths,
+    prune_store_paths,
+    parse_duration,
+    parse_size,
+    format_size,
+    get_zone,
+    offset_transitions,
+    convert_timestamps,
+    parse_timestamp,
+    parse_format,
+    CompiledFormatter,
 )
 
 
@@ -24,11 +44,100 @@ def test_create_human_readable_timestamp() -> None:
     )
 
 
+def test_create_human_readable_timestamp_at_max_year() -> None:
+    assert create_human_readable_timestamp(datetime(9999, 12, 31, 23, 0)) == (
+        "9999-12-31 05:00:00 PM"
+    )
+
+
+@pytest.mark.parametrize(
+    "target_tz", ["America/Chicago", "Australia/Lord_Howe", "Asia/Kolkata", "UTC"]
+)
+def test_convert_timestamps_matches_zoneinfo(target_tz: str) -> None:
+    fmt: str = "%Y-%m-%d %H:%M:%S %z %Z"
+    zone: ZoneInfo = ZoneInfo(target_tz)
+    # Hourly across two years, plus every second around each transition.
+    epochs: list[float] = list(range(1_700_000_000, 1_763_000_000, 3600))
+    starts, _ = offset_transitions(target_tz, 1_710_000_000 // (366 * 86400))
+    for start in starts[1:]:
+        epochs.extend(range(start - 2, start + 3))
+    epochs.append(1_710_054_000.25)
+
+    expected: list[str] = [
+        datetime.fromtimestamp(e, zone).strftime(fmt) for e in epochs
+    ]
+    assert list(convert_timestamps(epochs, target_tz, fmt)) == expected
+    assert get_zone(target_tz) is get_zone(target_tz)
+
+
+def test_parse_format() -> None:
+    assert parse_format("%Y-%m-%d %T %%") == (
+        ("date", "Y"),
+        ("literal", "-"),
+        ("date", "m"),
+        ("literal", "-"),
+        ("date", "d"),
+        ("literal", " "),
+        ("time", "H"),
+        ("literal", ":"),
+        ("time", "M"),
+        ("literal", ":"),
+        ("time", "S"),
+        ("literal", " %"),
+    )
+    assert parse_format("%c") is None
+    assert parse_format("trailing %") is None
+
+
+@pytest.mark.parametrize(
+    "fmt",
+    [
+        "%Y-%m-%d %I:%M:%S %p",
+        "%m-%d @ %I:%M %p",
+        "%F %T.%f %z %Z",
+        "%a %b %e %R %j %U %V %G %% 100%%",
+        "%c",
+        "no directives",
+    ],
+)
+def test_compiled_formatter_matches_strftime(fmt: str) -> None:
+    zone: ZoneInfo = ZoneInfo("America/Chicago")
+    formatter: CompiledFormatter = CompiledFormatter(fmt, "America/Chicago")
+    epochs: list[float] = [
+        *range(1_710_050_000, 1_710_070_000, 7),
+        1_710_057_599.9999996,
+        -1.5,
+        1_700_000_000.123456,
+    ]
+    expected: list[str] = [
+        datetime.fromtimestamp(e, zone).strftime(fmt) for e in epochs
+    ]
+    assert formatter.format_many(epochs) == expected
+    assert formatter.format_many(reversed(epochs)) == expected[::-1]
+
+
+def test_parse_timestamp() -> None:
+    assert parse_timestamp("1700000000") == 1_700_000_000
+    assert parse_timestamp(" 1700000000.5\n") == 1_700_000_000.5
+    assert parse_timestamp("2024-03-10T08:00:00") == 1_710_057_600
+    assert parse_timestamp("2024-03-10T08:00:00+02:00") == 1_710_050_400
+    with pytest.raises(ValueError):
+        parse_timestamp("nan")
+    with pytest.raises(ValueError):
+        parse_timestamp("not a timestamp")
+    for out_of_range in ("12345678901234567890", "1e300", "-1e20"):
+        with pytest.raises(ValueError, match="out of range"):
+            parse_timestamp(out_of_range)
+    naive: datetime = datetime(2024, 3, 10, 8)
+    assert list(convert_timestamps([naive], "UTC", "%H")) == ["08"]
+
+
 def test_which_nix() -> None:
     assert which_nix().exists()
 
 
-def test_nix_run_prefix() -> None:
+def test_nix_run_prefix(monkeypatch) -> None:
+    monkeypatch.delenv("MOSCRIPTS_NIXPKGS_REV", raising=False)
     nix: str = str(which_nix())
     assert nix_run_prefix("uv") == (
         nix,
@@ -66,3 +175,133 @@ def test_nix_run_prefix_subprocess_nixpkgs_download() -> None:
 def test_which_executable() -> None:
     assert which_executable("which").exists()
     assert which_executable("nix").exists()
+
+
+def test_resolve_executable_is_memoized(tmp_path: Path, monkeypatch) -> None:
+    tool: Path = tmp_path / "motool"
+    tool.write_text("#!/bin/sh\n")
+    tool.chmod(0o755)
+    monkeypatch.setenv("PATH", str(tmp_path))
+    clear_executable_cache()
+
+    assert resolve_executable("motool") == tool
+    tool.unlink()
+    # The cached entry is dropped once its file no longer stats.
+    with pytest.raises(AssertionError):
+        resolve_executable("motool")
+
+
+def test_resolve_executable_invalidates_on_path_change(
+    tmp_path: Path, monkeypatch
+) -> None:
+    first: Path = tmp_path / "first"
+    second: Path = tmp_path / "second"
+    for directory in (first, second):
+        directory.mkdir()
+        tool: Path = directory / "motool"
+        tool.write_text("#!/bin/sh\n")
+        tool.chmod(0o755)
+    clear_executable_cache()
+
+    monkeypatch.setenv("PATH", str(first))
+    assert resolve_executable("motool") == first / "motool"
+    monkeypatch.setenv("PATH", os.pathsep.join((str(second), str(first))))
+    assert resolve_executable("motool") == second / "motool"
+
+
+def test_import_runs_no_subprocess() -> None:
+    import sys
+
+    code: str = (
+        "import subprocess\n"
+        "def fail(*args, **kwargs): raise SystemExit('subprocess spawned')\n"
+        "subprocess.Popen = fail\n"
+        "import moscripts, moscripts.utilities\n"
+    )
+    result: CompletedProcess[str] = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_nixpkgs_flake_ref(monkeypatch) -> None:
+    monkeypatch.delenv("MOSCRIPTS_NIXPKGS_REV", raising=False)
+    assert nixpkgs_flake_ref("uv") == "nixpkgs#uv"
+    monkeypatch.setenv("MOSCRIPTS_NIXPKGS_REV", "abc123")
+    assert nixpkgs_flake_ref("uv") == "nixpkgs/abc123#uv"
+
+
+def test_nix_exec_prefix_uses_cached_store_path(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("MOSCRIPTS_NIXPKGS_REV", "abc123")
+    cache_file: Path = tmp_path / "store-paths.json"
+    program: Path = tmp_path / "uv"
+    program.write_text("#!/bin/sh\n")
+    program.chmod(0o755)
+
+    assert nix_exec_prefix("uv", cache_file) == nix_run_prefix("uv")
+    save_store_paths({"abc123": {"uv": str(program)}}, cache_file)
+    assert nix_exec_prefix("uv", cache_file) == (str(program),)
+
+    # Other revisions miss and fall back to `nix run`.
+    monkeypatch.setenv("MOSCRIPTS_NIXPKGS_REV", "def456")
+    assert nix_exec_prefix("uv", cache_file) == nix_run_prefix("uv")
+
+
+def test_nix_exec_prefix_records_store_path_on_miss(
+    tmp_path: Path, monkeypatch
+) -> None:
+    monkeypatch.setenv("MOSCRIPTS_NIXPKGS_REV", "abc123")
+    cache_file: Path = tmp_path / "store-paths.json"
+    out_path: Path = tmp_path / "store" / "uv-0.1"
+    (out_path / "bin").mkdir(parents=True)
+    program: Path = out_path / "bin" / "uv"
+    program.write_text("#!/bin/sh\n")
+    program.chmod(0o755)
+    bin_dir: Path = tmp_path / "bin"
+    bin_dir.mkdir()
+    nix: Path = bin_dir / "nix"
+    nix.write_text(f'#!/bin/sh\n[ "$1" = build ] && echo {out_path} || printf uv\n')
+    nix.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    assert nix_exec_prefix("uv", cache_file) == (str(program),)
+    assert load_store_paths(cache_file) == {"abc123": {"uv": str(program)}}
+
+
+def test_prune_store_paths(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("MOSCRIPTS_NIXPKGS_REV", "abc123")
+    cache_file: Path = tmp_path / "store-paths.json"
+    program: Path = tmp_path / "uv"
+    program.write_text("#!/bin/sh\n")
+    program.chmod(0o755)
+    save_store_paths(
+        {
+            "abc123": {"uv": str(program), "mpv": str(tmp_path / "collected")},
+            "old": {"uv": str(program)},
+        },
+        cache_file,
+    )
+
+    removed: list[tuple[str, str]] = prune_store_paths(cache_file)
+    assert sorted(removed) == [("abc123", "mpv"), ("old", "uv")]
+    assert load_store_paths(cache_file) == {"abc123": {"uv": str(program)}}
+    assert cached_store_path("uv", cache_file) == program
+
+
+def test_parse_duration() -> None:
+    assert parse_duration("30d") == 30 * 86400
+    assert parse_duration("1.5h") == 5400
+    assert parse_duration("2w") == 14 * 86400
+    with pytest.raises(ValueError):
+        parse_duration("30 days")
+
+
+def test_parse_size() -> None:
+    assert parse_size("500M") == 500 * 1024**2
+    assert parse_size("1.5g") == int(1.5 * 1024**3)
+    assert parse_size("4096") == 4096
+    assert parse_size("10KiB") == 10240
+    with pytest.raises(ValueError):
+        parse_size("lots")
+    assert format_size(512) == "512 B"
+    assert format_size(1536) == "1.5 KiB"
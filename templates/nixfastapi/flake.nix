@@ -22,6 +22,12 @@
       inputs.uv2nix.follows = "uv2nix";
       inputs.nixpkgs.follows = "nixpkgs";
     };
+
+    # Pinned datastar bundle, served same-origin from static/vendor/
+    datastar = {
+      url = "file+https://cdn.jsdelivr.net/gh/starfederation/datastar@v1.0.0-RC.6/bundles/datastar.js";
+      flake = false;
+    };
   };
 
   outputs = {
@@ -30,6 +36,7 @@
     pyproject-nix,
     pyproject-build-systems,
     systems,
+    datastar,
     ...
   }: let
     inherit (nixpkgs) lib;
@@ -96,7 +103,7 @@
       pkgs = nixpkgs.legacyPackages.${system};
       pythonSet = pythonSets.${system};
       venv = pythonSet.mkVirtualEnv "nixfastapi-venv" workspace.deps.default;
-    in {
+    in rec {
       default = pkgs.stdenv.mkDerivation {
         name = "nixfastapi-package";
         src = ./.;
@@ -104,14 +111,45 @@
         installPhase = ''
           mkdir -p $out/static
           cp -r ${./static}/* $out/static/
-          ${pkgs.tailwindcss_4}/bin/tailwindcss -i ${./static/input.css} -o ./static/output.css
+          ${pkgs.tailwindcss_4}/bin/tailwindcss --minify -i ${./static/input.css} -o ./static/output.css
           cp ./static/output.css $out/static/output.css
+          mkdir -p $out/static/vendor
+          ${pkgs.esbuild}/bin/esbuild ${datastar} --minify --log-level=warning --outfile=$out/static/vendor/datastar.js
+          # Hash and precompress the assets; see src/nixfastapi/assets.py
+          chmod -R u+w $out/static
+          ${venv}/bin/python -m nixfastapi.assets $out/static
+          # Compile templates to modules; see src/nixfastapi/templates.py
+          ${venv}/bin/python -m nixfastapi.templates $out/static/templates $out/compiled_templates
           cp ${./main.py} $out/main.py
           chmod +x $out/main.py
           patchShebangs $out/main.py
           ln -s ${pkgs.curl}/bin/curl $out/curl
         '';
       };
+      # Scratch-based image holding only the runtime closure of `default`. Store
+      # paths are spread over layers by popularity, so the heavy, shared ones
+      # (Python, dependencies) stay cached and an app-only change ships one
+      # small top layer. Load it with `nix run .#docker-image`.
+      image = pkgs.dockerTools.streamLayeredImage {
+        name = "nixfastapi";
+        tag = "latest";
+        maxLayers = 100;
+        extraCommands = ''
+          mkdir -m 1777 tmp
+          ln -s ${default} app
+        '';
+        config = {
+          Cmd = ["/app/main.py"];
+          WorkingDir = "/app";
+          ExposedPorts."7999/tcp" = {};
+          Env = [
+            "NIXFASTAPI_HOST=0.0.0.0"
+            "NIXFASTAPI_PORT=7999"
+            "NIXFASTAPI_GRACEFUL_TIMEOUT=30"
+          ];
+          StopSignal = "SIGTERM";
+        };
+      };
     });
     # Dynamic script discovery for .sh and .py files
     apps = forAllSystems (
@@ -223,6 +261,7 @@
           {
             UV_PYTHON_DOWNLOADS = "never";
             UV_PYTHON = python.interpreter;
+            DATASTAR_JS = "${datastar}";
           }
           // lib.optionalAttrs pkgs.stdenv.isLinux {
             LD_LIBRARY_PATH = lib.makeLibraryPath pkgs.pythonManylinuxPackages.manylinux1;
@@ -245,6 +284,7 @@
           UV_NO_SYNC = "1";
           UV_PYTHON = python.interpreter;
           UV_PYTHON_DOWNLOADS = "never";
+          DATASTAR_JS = "${datastar}";
         };
         shellHook = ''
           unset PYTHONPATH
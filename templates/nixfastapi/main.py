@@ -1,39 +1,126 @@
 #!/usr/bin/env python
 
 
+from contextlib import asynccontextmanager
+
+from datastar_py.fastapi import DatastarResponse
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from fastapi.middleware.gzip import GZipMiddleware
 
 from pathlib import Path
-import uvicorn
+import os
+import sys
 from nixfastapi import hello
+from nixfastapi.assets import (
+    AssetManifest,
+    DynamicGZipMiddleware,
+    PrecompressedStaticFiles,
+)
+from nixfastapi.broadcast import BroadcastHub
+from nixfastapi.metrics import METRICS, MetricsMiddleware
+from nixfastapi.pages import PageCache, warm_up
+from nixfastapi.profiling import PROFILER, ProfilingMiddleware
+from nixfastapi.static import IndexedStaticFiles
+from nixfastapi.templates import load_compiled
 
 # Discover the base directory relative to this file
 BASE_DIR = Path(__file__).parent
 
-app = FastAPI()
-app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=9)
+if __name__ == "__main__":
+    # Workers are spawned, and spawning re-imports the entry script in each of
+    # them. The launcher module is the entry point instead, so a worker builds
+    # the app only when uvicorn imports `main:app`.
+    os.execve(
+        sys.executable,
+        [sys.executable, "-m", "nixfastapi.server"],
+        {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(
+                filter(None, (str(BASE_DIR), os.environ.get("PYTHONPATH")))
+            ),
+        },
+    )
+
+# Set by scripts/fastapi-dev.sh so edited templates show up without a restart
+DEV_MODE = os.environ.get("NIXFASTAPI_DEV", "").lower() in ("1", "true", "yes", "on")
+
+STATIC_DIR = BASE_DIR / "static"
+# Written by `python -m nixfastapi.templates` at build time
+COMPILED_TEMPLATES_DIR = BASE_DIR / "compiled_templates"
+# Routes requested once at startup, before the worker accepts connections
+WARMUP_PATHS = ("/", "/favicon.ico")
+
+# Content-hashed asset names, written by `python -m nixfastapi.assets` at build time
+assets = AssetManifest(STATIC_DIR, prefix="/static")
+# A built tree never changes, so it is indexed once and served from memory
+static_files = (
+    IndexedStaticFiles(directory=STATIC_DIR, manifest=assets)
+    if assets.paths and not DEV_MODE
+    else PrecompressedStaticFiles(
+        directory=STATIC_DIR, follow_symlink=True, manifest=assets
+    )
+)
+
+# Shared datastar stream; publish with `updates.patch_signals(...)` from any route
+updates = BroadcastHub()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if COMPILED_TEMPLATES_DIR.is_dir() and not DEV_MODE:
+        load_compiled(templates, COMPILED_TEMPLATES_DIR)
+    updates.start()
+    METRICS.start()
+    # The server only accepts connections once this returns, so no request
+    # can arrive before warmup is done
+    await warm_up(app, WARMUP_PATHS)
+    yield
+    METRICS.close()
+    updates.close()
+
+
+app = FastAPI(lifespan=lifespan)
+# Static files are precompressed, so only dynamic responses are gzipped per request
+app.add_middleware(DynamicGZipMiddleware, exclude_prefixes=("/static/", "/favicon.ico"))
+# Outermost, so request durations include compression
+app.add_middleware(MetricsMiddleware)
+# Server-Timing and sampled profiles; inert unless NIXFASTAPI_PROFILE* is set
+app.add_middleware(ProfilingMiddleware)
 
-app.mount("/static", StaticFiles(directory=BASE_DIR / "static", follow_symlink=True), name="static")
+app.mount("/static", static_files, name="static")
+
+templates = Jinja2Templates(directory=STATIC_DIR / "templates")
+templates.env.globals["static_url"] = assets.url
+templates.env.globals["inline_asset"] = assets.inline
+pages = PageCache(templates, watch=DEV_MODE)
 
-templates = Jinja2Templates(directory=BASE_DIR / "static" / "templates") 
 
 @app.get("/", response_class=HTMLResponse)
 async def read_index(request: Request):
-    return templates.TemplateResponse(
-        request=request, name="index.html", context={}
-    )
+    return pages.response(request, "index.html")
+
 
 @app.get("/favicon.ico")
 async def favicon(request: Request):
-    return FileResponse(BASE_DIR / "static" / "assets" / "favicon.ico")
+    return await static_files.get_response("assets/favicon.ico", request.scope)
+
+
+@app.get("/updates")
+async def stream_updates(request: Request):
+    return DatastarResponse(updates.subscribe())
+
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    return METRICS.response()
+
+
+@app.get("/debug/profiles")
+async def profiles(request: Request):
+    return PROFILER.response(request)
+
 
 @app.get("/health")
 async def health(request: Request):
     return {"status": "ok"}
-
-if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=7999)
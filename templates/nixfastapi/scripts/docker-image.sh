@@ -0,0 +1,13 @@
+#!/usr/bin/env bash
+set -e  # Exit on any error
+# Immediately exit if REPO_ROOT is not set
+if [ -z "$REPO_ROOT" ]; then
+    echo "Error: REPO_ROOT is not set. Run this script from the Nix devShell."
+    exit 1
+fi
+cd $REPO_ROOT
+
+# Build the layered image from flake.nix and stream it into docker. Layers that
+# are already loaded are skipped, so an app-only change loads one small layer.
+nix build .#image --out-link result-image
+./result-image | docker load
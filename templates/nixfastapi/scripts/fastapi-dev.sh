@@ -9,6 +9,10 @@ cd $REPO_ROOT
 
 SESSION_NAME="nixfastapi-dev"
 
+# Serve the datastar bundle pinned in flake.nix, as the built package does
+mkdir -p static/vendor
+ln -sf "$DATASTAR_JS" static/vendor/datastar.js
+
 # Function to handle user choice when session exists
 handle_existing_session() {
     echo "Tmux session 🚩'$SESSION_NAME'🚩 already exists!"
@@ -58,7 +62,7 @@ tmux new-session -d -s $SESSION_NAME -n "🌬️Tailwind" -c "$REPO_ROOT"
 tmux send-keys -t $SESSION_NAME:0 "tailwindcss -i ./static/input.css -o ./static/output.css --watch" C-m
 
 tmux new-window -t $SESSION_NAME -n "🐍FastAPI" -c "$REPO_ROOT"
-tmux send-keys -t $SESSION_NAME:1 "uvicorn main:app --port 8000 --host 0.0.0.0 --reload" C-m
+tmux send-keys -t $SESSION_NAME:1 "NIXFASTAPI_DEV=1 uvicorn main:app --port 8000 --host 0.0.0.0 --reload" C-m
 
 tmux new-window -t $SESSION_NAME -n "🦁Brave" -c "$REPO_ROOT"
 tmux send-keys -t $SESSION_NAME:2 "brave --user-data-dir=/tmp/brave-dev-data --new-window --incognito http://0.0.0.0:8000" C-m
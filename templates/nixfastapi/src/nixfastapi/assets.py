@@ -0,0 +1,328 @@
+"""Static asset pipeline for nixfastapi.
+
+At build time, `python -m nixfastapi.assets <static dir>` gives every file a
+content-hashed copy and writes precompressed `.gz` and `.br` siblings for both
+names. It records the hashed names in `manifest.json`. At runtime
+`AssetManifest` turns logical paths into hashed URLs for the templates, and
+`PrecompressedStaticFiles` serves the smallest variant the client accepts.
+Dynamic responses are still compressed on the fly, by `DynamicGZipMiddleware`
+at a cheap level.
+"""
+
+from collections.abc import Iterator
+from mimetypes import guess_type
+from pathlib import Path
+import hashlib
+import json
+import gzip
+import time
+import sys
+import os
+
+from markupsafe import Markup
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+from nixfastapi.metrics import METRICS
+from nixfastapi.profiling import record_phase, timed
+
+MANIFEST_NAME: str = "manifest.json"
+# Directories under static/ that hold sources rather than served assets
+SKIP_DIRECTORIES: frozenset[str] = frozenset({"templates"})
+HASH_LENGTH: int = 12
+# Precompressed variants in order of preference, as (encoding, suffix)
+ENCODINGS: tuple[tuple[str, str], ...] = (("br", ".br"), ("gzip", ".gz"))
+# A variant is only kept when it is at most this fraction of the original
+MAX_COMPRESSED_RATIO: float = 0.95
+IMMUTABLE_CACHE_CONTROL: str = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL: str = "no-cache"
+# zlib level for responses compressed per request; 9 costs several times more CPU
+DYNAMIC_GZIP_LEVEL: int = 4
+# Built assets up to this size can be inlined; it fits the first TCP round trip
+INLINE_ASSET_BYTES: int = 14 * 1024
+
+
+def hashed_name(path: str, data: bytes) -> str:
+    """Returns `path` with a digest of `data` before its suffix, e.g. `output.<hash>.css`."""
+    digest: str = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    stem, suffix = os.path.splitext(path)
+    return f"{stem}.{digest}{suffix}"
+
+
+def available_encodings() -> tuple[tuple[str, str], ...]:
+    """Returns the `ENCODINGS` this interpreter can produce."""
+    return tuple(
+        (encoding, suffix)
+        for encoding, suffix in ENCODINGS
+        if encoding != "br" or brotli is not None
+    )
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compresses `data` at the highest level, for bodies that are compressed once."""
+    start: int = time.perf_counter_ns()
+    if encoding == "br":
+        body: bytes = brotli.compress(data, quality=11)
+    else:
+        assert encoding == "gzip", f"Unsupported encoding {encoding!r}."
+        body = gzip.compress(data, compresslevel=9, mtime=0)
+    elapsed: int = time.perf_counter_ns() - start
+    METRICS.observe_compression(encoding, elapsed)
+    record_phase("compress", elapsed)
+    return body
+
+
+def compress_variants(data: bytes) -> Iterator[tuple[str, bytes]]:
+    """Yields `(suffix, body)` for each encoding that shrinks `data` enough."""
+    for encoding, suffix in available_encodings():
+        body: bytes = compress(data, encoding)
+        if len(body) <= len(data) * MAX_COMPRESSED_RATIO:
+            yield suffix, body
+
+
+def source_files(static_dir: Path, built: set[str]) -> Iterator[str]:
+    """Yields the paths of assets under `static_dir`, relative to it, skipping build outputs."""
+    for root, directories, names in os.walk(static_dir):
+        if root == str(static_dir):
+            directories[:] = [d for d in directories if d not in SKIP_DIRECTORIES]
+        for name in names:
+            path: str = os.path.relpath(os.path.join(root, name), static_dir)
+            if path == MANIFEST_NAME or path.endswith((".gz", ".br")) or path in built:
+                continue
+            yield path
+
+
+def build_assets(static_dir: Path) -> dict[str, str]:
+    """Fingerprints and precompresses every asset, returning the manifest it writes.
+
+    Running it again on the same directory rebuilds from the original files.
+    """
+    manifest_file: Path = static_dir / MANIFEST_NAME
+    try:
+        built: set[str] = set(json.loads(manifest_file.read_text()).values())
+    except (OSError, ValueError):
+        built = set()
+
+    manifest: dict[str, str] = {}
+    for path in sorted(source_files(static_dir, built)):
+        data: bytes = (static_dir / path).read_bytes()
+        manifest[path] = hashed_name(path, data)
+        (static_dir / manifest[path]).write_bytes(data)
+        for suffix, body in compress_variants(data):
+            for name in (path, manifest[path]):
+                (static_dir / f"{name}{suffix}").write_bytes(body)
+
+    manifest_file.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest
+
+
+class AssetManifest:
+    """Maps logical static paths to their content-hashed URLs.
+
+    Without a built manifest, as in the dev server, paths map to themselves.
+    """
+
+    def __init__(self, static_dir: Path, prefix: str = "/static") -> None:
+        self.static_dir: Path = static_dir
+        self.prefix: str = prefix.rstrip("/")
+        self.inlined: dict[str, Markup | None] = {}
+        try:
+            self.paths: dict[str, str] = json.loads(
+                (static_dir / MANIFEST_NAME).read_text()
+            )
+        except (OSError, ValueError):
+            self.paths = {}
+        self.immutable: frozenset[str] = frozenset(
+            os.path.abspath(static_dir / path) for path in self.paths.values()
+        )
+
+    def url(self, path: str) -> str:
+        """Returns the URL of a static asset, e.g. `url("output.css")`."""
+        path = path.lstrip("/")
+        return f"{self.prefix}/{self.paths.get(path, path)}"
+
+    def inline(self, path: str, limit: int = INLINE_ASSET_BYTES) -> Markup | None:
+        """Returns a small built asset's text for inlining, or None to link it instead.
+
+        Only built assets are inlined, so the dev server keeps picking up
+        edits to linked files.
+        """
+        path = path.lstrip("/")
+        if path not in self.inlined:
+            content: Markup | None = None
+            if path in self.paths:
+                data: bytes = (self.static_dir / self.paths[path]).read_bytes()
+                if len(data) <= limit:
+                    content = Markup(data.decode())
+            self.inlined[path] = content
+        return self.inlined[path]
+
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    """Returns the content codings an `Accept-Encoding` header allows."""
+    encodings: set[str] = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        quality: str = params.strip().removeprefix("q=").strip()
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        if coding:
+            encodings.add(coding)
+    return encodings
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """Serves static files, preferring `.br` and `.gz` siblings the client accepts.
+
+    Hashed files from the manifest are cached forever; everything else is
+    revalidated with its `ETag` and `Last-Modified`.
+    """
+
+    def __init__(self, *, manifest: AssetManifest, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.manifest: AssetManifest = manifest
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        with timed("static"):
+            return await super().get_response(path, scope)
+
+    def file_response(
+        self,
+        full_path: str | os.PathLike[str],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers: Headers = Headers(scope=scope)
+        full_path = os.fspath(full_path)
+        headers: dict[str, str] = {
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL
+            if full_path in self.manifest.immutable
+            else REVALIDATE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        media_type: str = guess_type(full_path)[0] or "text/plain"
+        accepted: set[str] = accepted_encodings(
+            request_headers.get("accept-encoding", "")
+        )
+
+        response: FileResponse | None = None
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                variant_stat: os.stat_result = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            response = FileResponse(
+                full_path + suffix,
+                status_code=status_code,
+                headers={**headers, "Content-Encoding": encoding},
+                media_type=media_type,
+                stat_result=variant_stat,
+            )
+            break
+        if response is None:
+            response = FileResponse(
+                full_path,
+                status_code=status_code,
+                headers=headers,
+                media_type=media_type,
+                stat_result=stat_result,
+            )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class DynamicGZipMiddleware:
+    """Gzips dynamic responses, leaving paths starting with `exclude_prefixes` untouched.
+
+    Compression is done by starlette's `GZipMiddleware` through its public
+    interface. The time it spends compressing is recorded in the worker's
+    metrics, measured as the time the app's sends take, minus the time spent
+    writing to the client.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        exclude_prefixes: tuple[str, ...] = ("/static/",),
+        minimum_size: int = 1000,
+        compresslevel: int = DYNAMIC_GZIP_LEVEL,
+    ) -> None:
+        self.app: ASGIApp = app
+        self.exclude_prefixes: tuple[str, ...] = exclude_prefixes
+        self.minimum_size: int = minimum_size
+        self.compresslevel: int = compresslevel
+        self.gzip: GZipMiddleware = GZipMiddleware(
+            app, minimum_size=minimum_size, compresslevel=compresslevel
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+        if "gzip" not in Headers(scope=scope).get("accept-encoding", ""):
+            await self.gzip(scope, receive, send)
+            return
+
+        compressed: bool = False
+        writing_ns: int = 0
+        compressing_ns: int = 0
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal compressed, writing_ns
+            if message["type"] == "http.response.start":
+                encoding: str | None = Headers(raw=message["headers"]).get(
+                    "content-encoding"
+                )
+                compressed = encoding == "gzip"
+            start: int = time.perf_counter_ns()
+            await send(message)
+            writing_ns += time.perf_counter_ns() - start
+
+        async def app(scope: Scope, receive: Receive, gzip_send: Send) -> None:
+            async def send_uncompressed(message: Message) -> None:
+                nonlocal compressing_ns
+                writing_before: int = writing_ns
+                start: int = time.perf_counter_ns()
+                await gzip_send(message)
+                compressing_ns += (
+                    time.perf_counter_ns() - start - (writing_ns - writing_before)
+                )
+
+            await self.app(scope, receive, send_uncompressed)
+
+        gzip_middleware = GZipMiddleware(
+            app, minimum_size=self.minimum_size, compresslevel=self.compresslevel
+        )
+        try:
+            await gzip_middleware(scope, receive, send_compressed)
+        finally:
+            if compressed:
+                METRICS.observe_compression("gzip", compressing_ns)
+                record_phase("compress", compressing_ns)
+
+
+def main(argv: list[str] = sys.argv[1:]) -> None:
+    """Builds the assets of the static directory given on the command line."""
+    assert len(argv) == 1, "Usage: python -m nixfastapi.assets <static dir>"
+    manifest: dict[str, str] = build_assets(Path(argv[0]))
+    print(f"Built {len(manifest)} assets in {argv[0]}.")
+
+
+if __name__ == "__main__":
+    main()
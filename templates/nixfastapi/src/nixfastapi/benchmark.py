@@ -0,0 +1,351 @@
+"""Latency and throughput benchmark for the nixfastapi app.
+
+Drives a set of paths at fixed concurrency levels with an asyncio load
+generator built on httpx. The app runs either in-process through
+`httpx.ASGITransport` or under uvicorn in a subprocess. The report has
+p50/p95/p99 latency and requests/s for every path and concurrency level,
+and is printed as JSON, along with the time `MetricsMiddleware` adds to
+each request. With `--baseline`, the run fails when a result regresses past
+the tolerance against a stored report.
+
+    python -m nixfastapi.benchmark --server uvicorn --concurrency 1 16 64
+    python -m nixfastapi.benchmark --output baseline.json
+    python -m nixfastapi.benchmark --baseline baseline.json --tolerance 0.2
+"""
+
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from importlib import import_module
+from pathlib import Path
+from typing import Any
+import statistics
+import subprocess
+import argparse
+import asyncio
+import socket
+import json
+import time
+import sys
+import os
+
+import httpx
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from nixfastapi.metrics import Metrics, MetricsMiddleware
+
+DEFAULT_PATHS: tuple[str, ...] = (
+    "/",
+    "/health",
+    "/favicon.ico",
+    "/static/assets/favicon.ico",
+)
+DEFAULT_CONCURRENCY: tuple[int, ...] = (1, 16, 64)
+DEFAULT_REQUESTS: int = 2000
+WARMUP_REQUESTS: int = 20
+DEFAULT_TOLERANCE: float = 0.2
+# Browsers ask for compressed bodies, so the benchmark does too
+REQUEST_HEADERS: dict[str, str] = {"Accept-Encoding": "br, gzip"}
+SERVER_START_SECONDS: float = 60.0
+OVERHEAD_ITERATIONS: int = 20000
+OVERHEAD_ROUNDS: int = 5
+
+
+@dataclass(frozen=True)
+class Result:
+    path: str
+    concurrency: int
+    requests: int
+    errors: int
+    requests_per_second: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+def summarize(
+    path: str, concurrency: int, latencies_ns: list[int], errors: int, elapsed: float
+) -> Result:
+    """Turns raw latencies into percentiles, in milliseconds."""
+    if len(latencies_ns) >= 2:
+        cuts: list[float] = statistics.quantiles(
+            latencies_ns, n=100, method="inclusive"
+        )
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = float(latencies_ns[0]) if latencies_ns else 0.0
+    return Result(
+        path=path,
+        concurrency=concurrency,
+        requests=len(latencies_ns),
+        errors=errors,
+        requests_per_second=round(len(latencies_ns) / elapsed, 1) if elapsed else 0.0,
+        p50_ms=round(p50 / 1e6, 3),
+        p95_ms=round(p95 / 1e6, 3),
+        p99_ms=round(p99 / 1e6, 3),
+    )
+
+
+async def drive(
+    client: httpx.AsyncClient, path: str, concurrency: int, requests: int
+) -> Result:
+    """Sends `requests` GETs to `path` from `concurrency` concurrent workers."""
+    latencies_ns: list[int] = []
+    errors: int = 0
+    remaining: int = requests
+
+    async def worker() -> None:
+        nonlocal errors, remaining
+        while remaining > 0:
+            remaining -= 1
+            start: int = time.perf_counter_ns()
+            try:
+                response: httpx.Response = await client.get(path)
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+                    continue
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies_ns.append(time.perf_counter_ns() - start)
+
+    started: float = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(
+        path, concurrency, latencies_ns, errors, time.perf_counter() - started
+    )
+
+
+async def run_benchmark(
+    client: httpx.AsyncClient,
+    paths: Sequence[str],
+    concurrency: Sequence[int],
+    requests: int,
+) -> list[Result]:
+    results: list[Result] = []
+    for path in paths:
+        await drive(client, path, 1, WARMUP_REQUESTS)
+        for level in concurrency:
+            results.append(await drive(client, path, level, requests))
+    return results
+
+
+async def empty_app(scope: Scope, receive: Receive, send: Send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def discard(message: dict[str, Any]) -> None:
+    pass
+
+
+async def time_calls(app: ASGIApp, iterations: int) -> int:
+    scope: dict[str, Any] = {"type": "http", "method": "GET", "path": "/"}
+    start: int = time.perf_counter_ns()
+    for _ in range(iterations):
+        await app(scope, discard, discard)
+    return time.perf_counter_ns() - start
+
+
+def metrics_overhead_us(iterations: int = OVERHEAD_ITERATIONS) -> float:
+    """Returns the time `MetricsMiddleware` adds to a request, in microseconds.
+
+    Calls an app that sends an empty response with and without the
+    middleware, keeping the fastest of a few rounds of each.
+    """
+
+    async def measure() -> float:
+        bare: ASGIApp = empty_app
+        wrapped: ASGIApp = MetricsMiddleware(empty_app, Metrics(directory=""))
+        bare_ns: int = min(
+            [await time_calls(bare, iterations) for _ in range(OVERHEAD_ROUNDS)]
+        )
+        wrapped_ns: int = min(
+            [await time_calls(wrapped, iterations) for _ in range(OVERHEAD_ROUNDS)]
+        )
+        return max(wrapped_ns - bare_ns, 0) / iterations / 1e3
+
+    return round(asyncio.run(measure()), 3)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def uvicorn_server(app: str, workers: int, app_dir: Path) -> Iterator[str]:
+    """Runs the app under the production launcher and yields its base URL."""
+    port: int = free_port()
+    env: dict[str, str] = {
+        **os.environ,
+        "NIXFASTAPI_APP": app,
+        "NIXFASTAPI_HOST": "127.0.0.1",
+        "NIXFASTAPI_PORT": str(port),
+        "NIXFASTAPI_WORKERS": str(workers),
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "nixfastapi.server"],
+        cwd=app_dir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url: str = f"http://127.0.0.1:{port}"
+    try:
+        deadline: float = time.monotonic() + SERVER_START_SECONDS
+        while True:
+            assert process.poll() is None, "The server exited during startup."
+            try:
+                if httpx.get(f"{url}/health").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            assert time.monotonic() < deadline, "The server did not start in time."
+            time.sleep(0.1)
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def load_app(app: str, app_dir: Path) -> Any:
+    """Imports an ASGI app from a `module:attribute` string."""
+    sys.path.insert(0, str(app_dir))
+    module_name, _, attribute = app.partition(":")
+    return getattr(import_module(module_name), attribute)
+
+
+async def benchmark_in_process(
+    app: Any, paths: Sequence[str], concurrency: Sequence[int], requests: int
+) -> list[Result]:
+    transport = httpx.ASGITransport(app=app)
+    # The transport does not run the lifespan, so startup happens here as under uvicorn
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark", headers=REQUEST_HEADERS
+        ) as client:
+            return await run_benchmark(client, paths, concurrency, requests)
+
+
+async def benchmark_url(
+    url: str, paths: Sequence[str], concurrency: Sequence[int], requests: int
+) -> list[Result]:
+    limits = httpx.Limits(
+        max_connections=max(concurrency), max_keepalive_connections=max(concurrency)
+    )
+    async with httpx.AsyncClient(
+        base_url=url, headers=REQUEST_HEADERS, limits=limits
+    ) as client:
+        return await run_benchmark(client, paths, concurrency, requests)
+
+
+def compare(
+    results: Sequence[Result], baseline: Sequence[dict[str, Any]], tolerance: float
+) -> list[str]:
+    """Returns a description of every result that regressed against the baseline."""
+    expected: dict[tuple[str, int], dict[str, Any]] = {
+        (entry["path"], entry["concurrency"]): entry for entry in baseline
+    }
+    regressions: list[str] = []
+    for result in results:
+        reference: dict[str, Any] | None = expected.get(
+            (result.path, result.concurrency)
+        )
+        if reference is None:
+            continue
+        label: str = f"{result.path} @ {result.concurrency}"
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            limit: float = reference[metric] * (1 + tolerance)
+            if getattr(result, metric) > limit:
+                regressions.append(
+                    f"{label}: {metric} {getattr(result, metric)} > {limit:.3f}"
+                )
+        floor: float = reference["requests_per_second"] * (1 - tolerance)
+        if result.requests_per_second < floor:
+            regressions.append(
+                f"{label}: requests_per_second {result.requests_per_second} < {floor:.1f}"
+            )
+        if result.errors > reference["errors"]:
+            regressions.append(f"{label}: {result.errors} errors")
+    return regressions
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m nixfastapi.benchmark", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("--app", default="main:app", help="ASGI app to benchmark.")
+    parser.add_argument(
+        "--app-dir", type=Path, default=Path.cwd(), help="Directory holding the app."
+    )
+    parser.add_argument(
+        "--server",
+        choices=("in-process", "uvicorn"),
+        default="in-process",
+        help="Call the app directly, or over HTTP under the production launcher.",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="Uvicorn workers.")
+    parser.add_argument("--path", dest="paths", action="append", help="Repeatable.")
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY)
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=DEFAULT_REQUESTS,
+        help="Requests per path and concurrency level.",
+    )
+    parser.add_argument("--output", type=Path, help="Also write the report here.")
+    parser.add_argument("--baseline", type=Path, help="Report to compare against.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Allowed regression as a fraction of the baseline.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] = sys.argv[1:]) -> int:
+    """Runs the benchmark and returns 1 when it regressed against the baseline."""
+    args: argparse.Namespace = parse_args(argv)
+    paths: list[str] = args.paths or list(DEFAULT_PATHS)
+    if args.server == "uvicorn":
+        with uvicorn_server(args.app, args.workers, args.app_dir) as url:
+            results: list[Result] = asyncio.run(
+                benchmark_url(url, paths, args.concurrency, args.requests)
+            )
+    else:
+        results = asyncio.run(
+            benchmark_in_process(
+                load_app(args.app, args.app_dir),
+                paths,
+                args.concurrency,
+                args.requests,
+            )
+        )
+
+    report: dict[str, Any] = {
+        "server": args.server,
+        "workers": args.workers if args.server == "uvicorn" else 0,
+        "python": sys.version.split()[0],
+        "metrics_overhead_us": metrics_overhead_us(),
+        "results": [asdict(result) for result in results],
+    }
+    regressions: list[str] = []
+    if args.baseline is not None:
+        baseline: dict[str, Any] = json.loads(args.baseline.read_text())
+        regressions = compare(results, baseline["results"], args.tolerance)
+        report["regressions"] = regressions
+    text: str = json.dumps(report, indent=2)
+    print(text)
+    if args.output is not None:
+        args.output.write_text(text + "\n")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
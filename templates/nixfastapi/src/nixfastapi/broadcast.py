@@ -0,0 +1,163 @@
+"""Datastar server-sent-event broadcasting for nixfastapi.
+
+A `BroadcastHub` collects element and signal patches, coalesces them, and
+flushes them once per tick as a single pre-encoded frame. Subscribers do
+not get their own queues. Each one is an async generator holding a cursor
+into the hub's shared ring of recent frames, so an idle connection costs
+the same however busy the stream is. A subscriber that falls further
+behind than the ring reaches skips the backlog and receives one snapshot
+of the latest state instead.
+"""
+
+from collections import deque
+from collections.abc import AsyncIterator, Mapping
+from itertools import islice
+from typing import Any
+import weakref
+import asyncio
+import time
+
+from datastar_py import ServerSentEventGenerator as SSE
+
+# Frames kept for subscribers that are behind; each subscriber may lag this many
+HISTORY_FRAMES: int = 64
+TICK_SECONDS: float = 0.05
+# Idle streams get an SSE comment this often so proxies keep them open
+KEEPALIVE_SECONDS: float = 15.0
+KEEPALIVE_FRAME: bytes = b": keepalive\n\n"
+
+HUBS: "weakref.WeakSet[BroadcastHub]" = weakref.WeakSet()
+
+
+def merge_patch(target: dict[str, Any], patch: Mapping[str, Any]) -> None:
+    """Applies a JSON merge patch, as datastar does to signals, in place."""
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        elif isinstance(value, Mapping):
+            existing: Any = target.get(key)
+            if not isinstance(existing, dict):
+                existing = target[key] = {}
+            merge_patch(existing, value)
+        else:
+            target[key] = value
+
+
+def close_hubs() -> None:
+    """Ends every open stream, so graceful shutdown does not wait on them."""
+    for hub in list(HUBS):
+        hub.close()
+
+
+class BroadcastHub:
+    """Fans out datastar patches to any number of subscribed streams."""
+
+    def __init__(
+        self,
+        history: int = HISTORY_FRAMES,
+        tick: float = TICK_SECONDS,
+        keepalive: float = KEEPALIVE_SECONDS,
+    ) -> None:
+        assert history >= 1, "history must be at least 1."
+        self.tick: float = tick
+        self.keepalive: float = keepalive
+        self.frames: deque[bytes] = deque(maxlen=history)
+        # Number of frames ever published; a subscriber's cursor is one of these
+        self.sequence: int = 0
+        self.signals: dict[str, Any] = {}
+        self.elements: dict[str, str] = {}
+        self.pending_signals: dict[str, Any] = {}
+        self.pending_elements: dict[str, str] = {}
+        self.snapshot_frame: bytes | None = b""
+        self.subscribers: int = 0
+        self.closed: bool = False
+        self.last_frame: float = time.monotonic()
+        self.changed: asyncio.Event = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        HUBS.add(self)
+
+    def patch_elements(self, elements: str, selector: str) -> None:
+        """Queues an element patch; later patches to the same selector in a tick win."""
+        self.pending_elements[selector] = elements
+
+    def patch_signals(self, signals: Mapping[str, Any]) -> None:
+        """Queues a signal patch, merged with the others of this tick."""
+        merge_patch(self.pending_signals, signals)
+
+    def encode(self, signals: Mapping[str, Any], elements: Mapping[str, str]) -> bytes:
+        events: list[str] = [
+            SSE.patch_elements(html, selector=selector)
+            for selector, html in elements.items()
+        ]
+        if signals:
+            events.append(SSE.patch_signals(signals))
+        return "".join(events).encode()
+
+    def snapshot(self) -> bytes:
+        """Returns one frame that brings a new or lagging subscriber up to date."""
+        if self.snapshot_frame is None:
+            self.snapshot_frame = self.encode(self.signals, self.elements)
+        return self.snapshot_frame
+
+    def publish(self, frame: bytes) -> None:
+        self.frames.append(frame)
+        self.sequence += 1
+        self.last_frame = time.monotonic()
+        # Wakes every waiting subscriber at once
+        self.changed.set()
+        self.changed.clear()
+
+    def flush(self) -> None:
+        """Publishes everything queued since the last tick as one frame."""
+        if not self.pending_signals and not self.pending_elements:
+            if time.monotonic() - self.last_frame >= self.keepalive:
+                self.publish(KEEPALIVE_FRAME)
+            return
+        signals, self.pending_signals = self.pending_signals, {}
+        elements, self.pending_elements = self.pending_elements, {}
+        merge_patch(self.signals, signals)
+        self.elements.update(elements)
+        self.snapshot_frame = None
+        self.publish(self.encode(signals, elements))
+
+    async def run(self) -> None:
+        while not self.closed:
+            await asyncio.sleep(self.tick)
+            self.flush()
+
+    def start(self) -> None:
+        """Starts flushing on the running event loop."""
+        if self.task is None or self.task.done():
+            self.closed = False
+            # Events bind to the loop they are first awaited on
+            self.changed = asyncio.Event()
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def close(self) -> None:
+        """Stops flushing and ends every subscriber's stream."""
+        self.closed = True
+        if self.task is not None:
+            self.task.cancel()
+        self.changed.set()
+        self.changed.clear()
+
+    async def subscribe(self) -> AsyncIterator[bytes]:
+        """Streams frames from now on, starting with the current state."""
+        cursor: int = self.sequence
+        self.subscribers += 1
+        try:
+            if snapshot := self.snapshot():
+                yield snapshot
+            while not self.closed:
+                if cursor == self.sequence:
+                    await self.changed.wait()
+                    continue
+                behind: int = self.sequence - cursor
+                cursor = self.sequence
+                if behind > len(self.frames):
+                    if snapshot := self.snapshot():
+                        yield snapshot
+                else:
+                    yield b"".join(islice(self.frames, len(self.frames) - behind, None))
+        finally:
+            self.subscribers -= 1
@@ -0,0 +1,400 @@
+"""Prometheus-style metrics for nixfastapi.
+
+Each worker counts into plain integers owned by its event loop, so the hot
+path takes no locks and does no I/O. `MetricsMiddleware` records requests
+by method, route and status, and a fixed-bucket latency histogram for each
+route. A sampler task measures event-loop lag. Workers write snapshots to
+the directory in `NIXFASTAPI_METRICS_DIR`, which the launcher creates, and
+`/metrics` merges them into one exposition for the whole server. Without a
+directory, as under the dev server, `/metrics` reports the current worker.
+"""
+
+from bisect import bisect_left
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Any
+import asyncio
+import json
+import time
+import os
+
+from starlette.responses import Response
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+METRICS_DIR_ENV: str = "NIXFASTAPI_METRICS_DIR"
+# Upper bounds of the histogram buckets, in seconds
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+LAG_BUCKETS: tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+LAG_INTERVAL_SECONDS: float = 0.25
+# Other workers' numbers in /metrics are at most this old
+SNAPSHOT_SECONDS: float = 1.0
+# Requests that matched no route share one label, keeping cardinality bounded
+UNMATCHED_ROUTE: str = "<unmatched>"
+CONTENT_TYPE: str = "text/plain; version=0.0.4; charset=utf-8"
+# Set on the scope of the app's own warmup requests, which are not traffic
+WARMUP_SCOPE_KEY: str = "nixfastapi.warmup"
+
+RequestKey = tuple[str, str, int]
+RouteKey = tuple[str, str]
+
+
+class Histogram:
+    """Counts observations, in nanoseconds, into fixed buckets."""
+
+    __slots__ = ("bounds", "counts", "total")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.bounds: list[int] = [int(bound * 1e9) for bound in buckets]
+        # One count per bucket plus +Inf; cumulated only when rendered
+        self.counts: list[int] = [0] * (len(buckets) + 1)
+        self.total: int = 0
+
+    def observe(self, value_ns: int) -> None:
+        self.counts[bisect_left(self.bounds, value_ns)] += 1
+        self.total += value_ns
+
+
+class Metrics:
+    """The counters of one worker process."""
+
+    def __init__(self, directory: str | os.PathLike | None = None) -> None:
+        if directory is None:
+            directory = os.environ.get(METRICS_DIR_ENV) or None
+        self.directory: Path | None = Path(directory) if directory else None
+        self.requests: dict[RequestKey, int] = {}
+        self.latency: dict[RouteKey, Histogram] = {}
+        self.in_flight: int = 0
+        self.loop_lag: Histogram = Histogram(LAG_BUCKETS)
+        self.loop_lag_last_ns: int = 0
+        # encoding -> [calls, nanoseconds]
+        self.compression: dict[str, list[int]] = {}
+        self.task: asyncio.Task | None = None
+
+    def observe_request(
+        self, method: str, route: str, status: int, elapsed_ns: int
+    ) -> None:
+        key: RequestKey = (method, route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        histogram: Histogram | None = self.latency.get((method, route))
+        if histogram is None:
+            histogram = self.latency[(method, route)] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(elapsed_ns)
+
+    def observe_compression(self, encoding: str, elapsed_ns: int) -> None:
+        totals: list[int] | None = self.compression.get(encoding)
+        if totals is None:
+            totals = self.compression[encoding] = [0, 0]
+        totals[0] += 1
+        totals[1] += elapsed_ns
+
+    def snapshot(self) -> dict[str, Any]:
+        """Returns this worker's numbers in a JSON-serialisable form."""
+        return {
+            "pid": os.getpid(),
+            "cpu_seconds": time.process_time(),
+            "in_flight": self.in_flight,
+            "requests": [[*key, count] for key, count in self.requests.items()],
+            "latency": [
+                [*key, histogram.counts, histogram.total]
+                for key, histogram in self.latency.items()
+            ],
+            "loop_lag": [self.loop_lag.counts, self.loop_lag.total],
+            "loop_lag_last_ns": self.loop_lag_last_ns,
+            "compression": [
+                [encoding, *totals] for encoding, totals in self.compression.items()
+            ],
+        }
+
+    def write_snapshot(self) -> None:
+        """Replaces this worker's snapshot file, atomically for readers."""
+        if self.directory is None:
+            return
+        path: Path = self.directory / f"{os.getpid()}.json"
+        partial: Path = path.with_suffix(".tmp")
+        partial.write_text(json.dumps(self.snapshot()))
+        os.replace(partial, path)
+
+    def read_snapshots(self) -> list[dict[str, Any]]:
+        """Returns the snapshots of every worker, with this one's up to date."""
+        own: dict[str, Any] = self.snapshot()
+        snapshots: list[dict[str, Any]] = [own]
+        if self.directory is None:
+            return snapshots
+        for path in self.directory.glob("*.json"):
+            try:
+                snapshot: dict[str, Any] = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            if snapshot["pid"] != own["pid"]:
+                snapshots.append(snapshot)
+        return snapshots
+
+    def render(self) -> str:
+        return render(merge(self.read_snapshots()))
+
+    def response(self) -> Response:
+        """Returns the Prometheus exposition of every worker."""
+        return Response(
+            self.render(),
+            media_type=CONTENT_TYPE,
+            headers={"Cache-Control": "no-store"},
+        )
+
+    async def run(self, interval: float) -> None:
+        """Samples event-loop lag and writes a snapshot about once a second."""
+        samples_per_snapshot: int = max(round(SNAPSHOT_SECONDS / interval), 1)
+        interval_ns: int = int(interval * 1e9)
+        sample: int = 0
+        while True:
+            expected: int = time.perf_counter_ns() + interval_ns
+            await asyncio.sleep(interval)
+            lag: int = max(time.perf_counter_ns() - expected, 0)
+            self.loop_lag.observe(lag)
+            self.loop_lag_last_ns = lag
+            sample += 1
+            if sample % samples_per_snapshot == 0:
+                try:
+                    self.write_snapshot()
+                except OSError:
+                    pass
+
+    def start(self, interval: float = LAG_INTERVAL_SECONDS) -> None:
+        """Starts sampling on the running event loop."""
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run(interval))
+
+    def close(self) -> None:
+        """Stops sampling and leaves a final snapshot behind for /metrics."""
+        if self.task is not None:
+            self.task.cancel()
+        try:
+            self.write_snapshot()
+        except OSError:
+            pass
+
+
+# The counters of this process; module-level so any layer can record into it
+METRICS: Metrics = Metrics()
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge(snapshots: Iterable[Mapping[str, Any]]) -> dict[str, Any]:
+    """Adds up worker snapshots.
+
+    Counters of workers that have exited are kept, so totals never go
+    backwards across a rolling restart. Gauges only count live workers.
+    """
+    requests: dict[RequestKey, int] = {}
+    latency: dict[RouteKey, list[Any]] = {}
+    lag_counts: list[int] = [0] * (len(LAG_BUCKETS) + 1)
+    lag_total: int = 0
+    compression: dict[str, list[int]] = {}
+    cpu_seconds: float = 0.0
+    in_flight: int = 0
+    lag_max_ns: int = 0
+    workers: int = 0
+    for index, snapshot in enumerate(snapshots):
+        cpu_seconds += snapshot["cpu_seconds"]
+        for method, route, status, count in snapshot["requests"]:
+            key: RequestKey = (method, route, status)
+            requests[key] = requests.get(key, 0) + count
+        for method, route, counts, total in snapshot["latency"]:
+            merged: list[Any] = latency.setdefault(
+                (method, route), [[0] * len(counts), 0]
+            )
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+        counts, total = snapshot["loop_lag"]
+        lag_counts = [a + b for a, b in zip(lag_counts, counts)]
+        lag_total += total
+        for encoding, calls, elapsed in snapshot["compression"]:
+            totals: list[int] = compression.setdefault(encoding, [0, 0])
+            totals[0] += calls
+            totals[1] += elapsed
+        # The first snapshot is the caller's own
+        if index == 0 or pid_alive(snapshot["pid"]):
+            workers += 1
+            in_flight += snapshot["in_flight"]
+            lag_max_ns = max(lag_max_ns, snapshot["loop_lag_last_ns"])
+    return {
+        "workers": workers,
+        "cpu_seconds": cpu_seconds,
+        "in_flight": in_flight,
+        "requests": requests,
+        "latency": latency,
+        "loop_lag": [lag_counts, lag_total],
+        "loop_lag_max_ns": lag_max_ns,
+        "compression": compression,
+    }
+
+
+def labels(**values: object) -> str:
+    """Formats a label set, escaping values as the exposition format requires."""
+    pairs: list[str] = []
+    for name, value in values.items():
+        escaped: str = (
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def render_histogram(
+    name: str,
+    buckets: tuple[float, ...],
+    counts: list[int],
+    total_ns: int,
+    **label_values: object,
+) -> list[str]:
+    lines: list[str] = []
+    cumulative: int = 0
+    for bound, count in zip([*map(str, buckets), "+Inf"], counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{labels(**label_values, le=bound)} {cumulative}")
+    suffix: str = labels(**label_values) if label_values else ""
+    lines.append(f"{name}_sum{suffix} {total_ns / 1e9}")
+    lines.append(f"{name}_count{suffix} {cumulative}")
+    return lines
+
+
+def render(merged: Mapping[str, Any]) -> str:
+    """Formats merged snapshots in the Prometheus text exposition format."""
+    lines: list[str] = [
+        "# HELP nixfastapi_workers Live worker processes.",
+        "# TYPE nixfastapi_workers gauge",
+        f"nixfastapi_workers {merged['workers']}",
+        "# HELP nixfastapi_process_cpu_seconds_total CPU time used by workers.",
+        "# TYPE nixfastapi_process_cpu_seconds_total counter",
+        f"nixfastapi_process_cpu_seconds_total {merged['cpu_seconds']}",
+        "# HELP nixfastapi_requests_in_flight Requests being served.",
+        "# TYPE nixfastapi_requests_in_flight gauge",
+        f"nixfastapi_requests_in_flight {merged['in_flight']}",
+        "# HELP nixfastapi_requests_total Requests served, by route and status.",
+        "# TYPE nixfastapi_requests_total counter",
+    ]
+    for (method, route, status), count in sorted(merged["requests"].items()):
+        lines.append(
+            f"nixfastapi_requests_total{labels(method=method, route=route, status=status)} {count}"
+        )
+    lines += [
+        "# HELP nixfastapi_request_duration_seconds Time to serve a request, by route.",
+        "# TYPE nixfastapi_request_duration_seconds histogram",
+    ]
+    for (method, route), (counts, total) in sorted(merged["latency"].items()):
+        lines += render_histogram(
+            "nixfastapi_request_duration_seconds",
+            LATENCY_BUCKETS,
+            counts,
+            total,
+            method=method,
+            route=route,
+        )
+    lines += [
+        "# HELP nixfastapi_event_loop_lag_seconds How late the event loop runs timers.",
+        "# TYPE nixfastapi_event_loop_lag_seconds histogram",
+        *render_histogram(
+            "nixfastapi_event_loop_lag_seconds", LAG_BUCKETS, *merged["loop_lag"]
+        ),
+        "# HELP nixfastapi_event_loop_lag_max_seconds Latest lag of the slowest worker.",
+        "# TYPE nixfastapi_event_loop_lag_max_seconds gauge",
+        f"nixfastapi_event_loop_lag_max_seconds {merged['loop_lag_max_ns'] / 1e9}",
+        "# HELP nixfastapi_compression_seconds_total Time spent compressing responses.",
+        "# TYPE nixfastapi_compression_seconds_total counter",
+    ]
+    for encoding, (_, elapsed) in sorted(merged["compression"].items()):
+        lines.append(
+            f"nixfastapi_compression_seconds_total{labels(encoding=encoding)} {elapsed / 1e9}"
+        )
+    lines += [
+        "# HELP nixfastapi_compressions_total Response bodies compressed.",
+        "# TYPE nixfastapi_compressions_total counter",
+    ]
+    for encoding, (calls, _) in sorted(merged["compression"].items()):
+        lines.append(
+            f"nixfastapi_compressions_total{labels(encoding=encoding)} {calls}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def route_label(scope: Scope, root_path: str = "") -> str:
+    """Returns the template of the route that served a request, e.g. "/items/{id}".
+
+    FastAPI records its matched route on the scope. Other routes and mounts
+    are matched against the app's router again, as Starlette's router matches
+    them, with the `root_path` the request arrived with, since mounts rewrite
+    it while routing.
+    """
+    route: Any = scope.get("route")
+    if route is not None:
+        return route.path
+    router: Any = getattr(scope.get("app"), "router", None)
+    if router is None:
+        return UNMATCHED_ROUTE
+    original: Scope = {**scope, "root_path": root_path}
+    partial: str | None = None
+    for route in router.routes:
+        match, _ = route.matches(original)
+        if match is Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+        if match is Match.PARTIAL and partial is None:
+            # The path matched but the method did not, as for a 405
+            partial = getattr(route, "path", UNMATCHED_ROUTE)
+    return partial or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Counts every HTTP request by method, route template and status."""
+
+    def __init__(self, app: ASGIApp, metrics: Metrics = METRICS) -> None:
+        self.app: ASGIApp = app
+        self.metrics: Metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope.get(WARMUP_SCOPE_KEY):
+            await self.app(scope, receive, send)
+            return
+        metrics: Metrics = self.metrics
+        root_path: str = scope.get("root_path", "")
+        status: int = 500
+
+        async def send_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.in_flight += 1
+        start: int = time.perf_counter_ns()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed: int = time.perf_counter_ns() - start
+            metrics.in_flight -= 1
+            metrics.observe_request(
+                scope["method"], route_label(scope, root_path), status, elapsed
+            )
@@ -0,0 +1,221 @@
+"""Rendered-template response cache for nixfastapi.
+
+Template routes whose output depends only on the template and its context
+are rendered once per context and encoding, then kept as ready-to-send
+responses holding precompressed bytes. A repeat request costs a dictionary
+lookup, or a bodyless 304 when the client already holds the page's `ETag`.
+`warm_up` fills the cache before a worker takes traffic.
+"""
+
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Any
+import hashlib
+import json
+import os
+
+from fastapi.templating import Jinja2Templates
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from nixfastapi.assets import (
+    MAX_COMPRESSED_RATIO,
+    accepted_encodings,
+    available_encodings,
+    compress,
+)
+from nixfastapi.metrics import WARMUP_SCOPE_KEY
+from nixfastapi.profiling import timed
+
+PAGE_CACHE_BYTES: int = 16 * 1024 * 1024
+# Bookkeeping charged to each cached page on top of its body
+PAGE_OVERHEAD_BYTES: int = 512
+# One request per variant a browser or a plain client may ask for
+WARMUP_ENCODINGS: tuple[str, ...] = ("br, gzip", "gzip", "")
+
+PageKey = tuple[str, str, str]
+
+
+def context_hash(context: Mapping[str, Any]) -> str:
+    """Returns a stable digest of a JSON-serialisable template context."""
+    encoded: bytes = json.dumps(context, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    """Returns the preferred encoding the client accepts, or `identity`."""
+    accepted: set[str] = accepted_encodings(accept_encoding)
+    for encoding, _ in available_encodings():
+        if encoding in accepted:
+            return encoding
+    return "identity"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Returns True if an `If-None-Match` header covers `etag`."""
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+class CachedPage(Response):
+    """A rendered page that is sent as-is by every request that hits it."""
+
+    media_type = "text/html"
+
+    def __init__(self, html: bytes, encoding: str) -> None:
+        body: bytes = html
+        headers: dict[str, str] = {
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if encoding != "identity":
+            compressed: bytes = compress(html, encoding)
+            if len(compressed) <= len(html) * MAX_COMPRESSED_RATIO:
+                body = compressed
+                headers["Content-Encoding"] = encoding
+        self.etag: str = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        headers["ETag"] = self.etag
+        super().__init__(body, headers=headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Middleware may edit the header list in place, so each send gets a copy
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": list(self.raw_headers),
+            }
+        )
+        await send({"type": "http.response.body", "body": self.body})
+
+
+class PageCache:
+    """An LRU cache of rendered pages, capped at `max_bytes` of bodies.
+
+    Pages are keyed by template name, context hash and content encoding, so
+    cached routes must not render anything request-specific. With `watch`
+    set, as in the dev server, any change under the template directories
+    clears the cache.
+    """
+
+    def __init__(
+        self,
+        templates: Jinja2Templates,
+        max_bytes: int = PAGE_CACHE_BYTES,
+        watch: bool = False,
+    ) -> None:
+        self.templates: Jinja2Templates = templates
+        self.max_bytes: int = max_bytes
+        self.watch: bool = watch
+        self.pages: OrderedDict[PageKey, CachedPage] = OrderedDict()
+        self.size: int = 0
+        self.templates_mtime: int = self.latest_mtime() if watch else 0
+
+    def latest_mtime(self) -> int:
+        """Returns the newest mtime under the template directories, in nanoseconds."""
+        latest: int = 0
+        for directory in getattr(self.templates.env.loader, "searchpath", []):
+            for root, _, names in os.walk(directory):
+                for path in [root, *(os.path.join(root, name) for name in names)]:
+                    try:
+                        latest = max(latest, os.stat(path).st_mtime_ns)
+                    except OSError:
+                        continue
+        return latest
+
+    def clear(self) -> None:
+        self.pages.clear()
+        self.size = 0
+
+    def invalidate_if_changed(self) -> None:
+        mtime: int = self.latest_mtime()
+        if mtime != self.templates_mtime:
+            self.templates_mtime = mtime
+            self.clear()
+
+    def render(
+        self, name: str, context: Mapping[str, Any], encoding: str
+    ) -> CachedPage:
+        with timed("render"):
+            html: str = self.templates.get_template(name).render(context)
+        return CachedPage(html.encode(), encoding)
+
+    def store(self, key: PageKey, page: CachedPage) -> None:
+        """Caches a page, evicting the least recently used ones to stay under the cap."""
+        cost: int = len(page.body) + PAGE_OVERHEAD_BYTES
+        if cost > self.max_bytes:
+            return
+        self.pages[key] = page
+        self.size += cost
+        while self.size > self.max_bytes:
+            _, evicted = self.pages.popitem(last=False)
+            self.size -= len(evicted.body) + PAGE_OVERHEAD_BYTES
+
+    def response(
+        self,
+        request: Request,
+        name: str,
+        context: Mapping[str, Any] | None = None,
+    ) -> Response:
+        """Returns the cached page for `name`, rendering it on a miss."""
+        context = context or {}
+        if self.watch:
+            self.invalidate_if_changed()
+        encoding: str = negotiate_encoding(request.headers.get("accept-encoding", ""))
+        key: PageKey = (name, context_hash(context), encoding)
+        page: CachedPage | None = self.pages.get(key)
+        if page is None:
+            page = self.render(name, context, encoding)
+            self.store(key, page)
+        else:
+            self.pages.move_to_end(key)
+        if_none_match: str | None = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, page.etag):
+            return NotModifiedResponse(page.headers)
+        return page
+
+
+async def warm_up(
+    app: ASGIApp,
+    paths: Sequence[str],
+    encodings: Sequence[str] = WARMUP_ENCODINGS,
+) -> None:
+    """Requests each path once per `Accept-Encoding`, failing on any error status.
+
+    Run from the lifespan, it loads templates and fills the page cache and
+    other lazy state before the worker starts accepting connections. The
+    requests are marked with `WARMUP_SCOPE_KEY`, so metrics and profiling
+    leave them out.
+    """
+    for path in paths:
+        for accept_encoding in encodings:
+            status: int = 0
+
+            async def receive() -> Message:
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message: Message) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+
+            scope: Scope = {
+                "type": "http",
+                "asgi": {"version": "3.0", "spec_version": "2.4"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": path,
+                "raw_path": path.encode(),
+                "query_string": b"",
+                "root_path": "",
+                "headers": [(b"accept-encoding", accept_encoding.encode())],
+                "client": None,
+                "server": ("localhost", 80),
+                WARMUP_SCOPE_KEY: True,
+            }
+            await app(scope, receive, send)
+            assert status == 200, f"Warming up {path} returned {status}."
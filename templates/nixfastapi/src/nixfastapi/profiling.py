@@ -0,0 +1,252 @@
+"""Opt-in request profiling for nixfastapi.
+
+`ProfilingMiddleware` instruments a request when `NIXFASTAPI_PROFILE` is
+set, or when the request carries `NIXFASTAPI_PROFILE_SECRET` in its
+`X-Nixfastapi-Profile` header. An instrumented response gets a
+`Server-Timing` header that splits its time into template rendering,
+compression and static file lookup, with the rest reported as `app`.
+
+Separately, a `NIXFASTAPI_PROFILE_SAMPLE_RATE` fraction of requests, and
+every request that sends the secret, is run under a sampling profiler. The
+profiler reads the event-loop thread's stack from a background thread. The
+latest profiles are kept in a ring and served as folded stacks, which
+flamegraph.pl and speedscope read directly. Other requests on the same
+loop show up in a profile too, since they share the thread.
+"""
+
+from collections import Counter, deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from types import FrameType
+import threading
+import random
+import hmac
+import time
+import sys
+import os
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from nixfastapi.metrics import WARMUP_SCOPE_KEY
+
+PROFILE_ENV: str = "NIXFASTAPI_PROFILE"
+SECRET_ENV: str = "NIXFASTAPI_PROFILE_SECRET"
+SAMPLE_RATE_ENV: str = "NIXFASTAPI_PROFILE_SAMPLE_RATE"
+PROFILE_HEADER: str = "x-nixfastapi-profile"
+PROFILE_HISTORY: int = 32
+# The loop thread only gives up the GIL every switch interval (5 ms by
+# default), so sampling faster than that mostly repeats stacks
+SAMPLE_INTERVAL_SECONDS: float = 0.001
+# Phases, in the order they appear in Server-Timing
+PHASES: tuple[str, ...] = ("render", "compress", "static")
+
+# Phase durations of the current request in nanoseconds, when it is instrumented
+TIMINGS: ContextVar[dict[str, int] | None] = ContextVar(
+    "nixfastapi_timings", default=None
+)
+
+
+def record_phase(phase: str, elapsed_ns: int) -> None:
+    """Adds to a phase of the current request, if it is instrumented."""
+    timings: dict[str, int] | None = TIMINGS.get()
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0) + elapsed_ns
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    start: int = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter_ns() - start)
+
+
+def server_timing(total_ns: int, timings: dict[str, int]) -> str:
+    """Formats phase durations as a `Server-Timing` header value, in milliseconds."""
+    phases: list[tuple[str, int]] = [
+        (phase, timings[phase]) for phase in PHASES if phase in timings
+    ]
+    other: int = max(total_ns - sum(elapsed for _, elapsed in phases), 0)
+    entries: list[tuple[str, int]] = [("total", total_ns), *phases, ("app", other)]
+    return ", ".join(f"{name};dur={elapsed / 1e6:.3f}" for name, elapsed in entries)
+
+
+def frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+class StackSampler:
+    """Counts the stacks of one thread, sampled from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL_SECONDS):
+        self.thread_id: int = thread_id
+        self.interval: float = interval
+        self.stacks: Counter[str] = Counter()
+        self.stopped: threading.Event = threading.Event()
+        self.thread: threading.Thread = threading.Thread(
+            target=self.run, name="nixfastapi-profiler", daemon=True
+        )
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            frame: FrameType | None = sys._current_frames().get(self.thread_id)
+            labels: list[str] = []
+            while frame is not None:
+                labels.append(frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> Counter[str]:
+        self.stopped.set()
+        self.thread.join()
+        return self.stacks
+
+
+@dataclass(frozen=True)
+class Profile:
+    method: str
+    path: str
+    status: int
+    duration_ms: float
+    stacks: Counter[str]
+
+
+class Profiler:
+    """Profiling settings and the ring of recent profiles, read from the environment."""
+
+    def __init__(
+        self,
+        enabled: bool | None = None,
+        secret: str | None = None,
+        sample_rate: float | None = None,
+        history: int = PROFILE_HISTORY,
+    ) -> None:
+        if enabled is None:
+            enabled = os.environ.get(PROFILE_ENV, "").lower() in (
+                "1",
+                "true",
+                "yes",
+                "on",
+            )
+        if secret is None:
+            secret = os.environ.get(SECRET_ENV, "")
+        if sample_rate is None:
+            sample_rate = float(os.environ.get(SAMPLE_RATE_ENV) or 0)
+        assert 0 <= sample_rate <= 1, f"{SAMPLE_RATE_ENV} must be between 0 and 1."
+        self.enabled: bool = enabled
+        self.secret: bytes = secret.encode()
+        self.sample_rate: float = sample_rate
+        self.profiles: deque[Profile] = deque(maxlen=history)
+
+    @property
+    def active(self) -> bool:
+        """Whether any request can be instrumented at all."""
+        return self.enabled or bool(self.secret) or self.sample_rate > 0
+
+    def authorized(self, scope: Scope) -> bool:
+        """Returns True if the request carries the profiling secret."""
+        if not self.secret:
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER.encode():
+                return hmac.compare_digest(value, self.secret)
+        return False
+
+    def folded(self) -> str:
+        """Returns the kept profiles as folded stacks, one root frame per request."""
+        lines: list[str] = []
+        for profile in self.profiles:
+            # Semicolons separate frames in the folded format
+            path: str = profile.path.replace(";", "%3B")
+            root: str = (
+                f"{profile.method} {path} {profile.status}"
+                f" ({profile.duration_ms:.1f} ms)"
+            )
+            for stack, count in profile.stacks.items():
+                lines.append(f"{root};{stack} {count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def response(self, request: Request) -> Response:
+        """Serves the kept profiles to callers allowed to see them."""
+        if not (self.enabled or self.authorized(request.scope)):
+            return PlainTextResponse("Not Found", status_code=404)
+        return PlainTextResponse(self.folded(), headers={"Cache-Control": "no-store"})
+
+
+# Profiling settings of this process, taken from its environment
+PROFILER: Profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """Adds `Server-Timing` to instrumented responses and samples requests."""
+
+    def __init__(self, app: ASGIApp, profiler: Profiler = PROFILER) -> None:
+        self.app: ASGIApp = app
+        self.profiler: Profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiler: Profiler = self.profiler
+        if (
+            scope["type"] != "http"
+            or not profiler.active
+            or scope.get(WARMUP_SCOPE_KEY)
+        ):
+            await self.app(scope, receive, send)
+            return
+        authorized: bool = profiler.authorized(scope)
+        instrumented: bool = profiler.enabled or authorized
+        sampled: bool = authorized or random.random() < profiler.sample_rate
+        if not (instrumented or sampled):
+            await self.app(scope, receive, send)
+            return
+
+        timings: dict[str, int] = {}
+        token = TIMINGS.set(timings)
+        status: int = 500
+        start: int = time.perf_counter_ns()
+
+        async def send_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if instrumented:
+                    value: str = server_timing(time.perf_counter_ns() - start, timings)
+                    message = {
+                        **message,
+                        "headers": [
+                            *message.get("headers", []),
+                            (b"server-timing", value.encode()),
+                        ],
+                    }
+            await send(message)
+
+        sampler: StackSampler | None = None
+        if sampled:
+            sampler = StackSampler(threading.get_ident())
+            sampler.start()
+        try:
+            await self.app(scope, receive, send_timing)
+        finally:
+            TIMINGS.reset(token)
+            if sampler is not None:
+                profiler.profiles.append(
+                    Profile(
+                        method=scope["method"],
+                        path=scope["path"],
+                        status=status,
+                        duration_ms=(time.perf_counter_ns() - start) / 1e6,
+                        stacks=sampler.stop(),
+                    )
+                )
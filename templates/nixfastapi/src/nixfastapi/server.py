@@ -0,0 +1,372 @@
+"""Production launcher for nixfastapi.
+
+A supervisor process starts one uvicorn worker per available core. Each worker
+serves its own `SO_REUSEPORT` socket on the same port, so the kernel spreads
+connections across workers. `SIGHUP` replaces workers one at a time, starting
+each replacement before the worker it replaces is drained. `SIGTERM` and
+`SIGINT` shut everything down gracefully. Settings come from `NIXFASTAPI_*`
+environment variables.
+"""
+
+from dataclasses import dataclass, field, fields
+from importlib.util import find_spec
+from multiprocessing.connection import Connection, wait
+from multiprocessing.context import SpawnContext, SpawnProcess
+from collections.abc import Mapping
+from pathlib import Path
+from types import FrameType
+import multiprocessing
+import asyncio
+import logging.config
+import logging
+import tempfile
+import shutil
+import signal
+import socket
+import math
+import time
+import os
+
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+
+from nixfastapi.broadcast import close_hubs
+from nixfastapi.metrics import METRICS_DIR_ENV
+
+logger: logging.Logger = logging.getLogger("uvicorn.error")
+
+CGROUP_V2_CPU_MAX: Path = Path("/sys/fs/cgroup/cpu.max")
+CGROUP_V1_CPU: Path = Path("/sys/fs/cgroup/cpu")
+ENV_PREFIX: str = "NIXFASTAPI_"
+# Time between a worker closing its listener and being asked to shut down
+DRAIN_SECONDS: float = 0.5
+# Pause before retrying after a replacement worker fails to start
+CRASH_BACKOFF_SECONDS: float = 1.0
+# Memory-backed parent for the metrics directory, when the system has one
+SHARED_MEMORY_DIR: Path = Path("/dev/shm")
+
+
+def cgroup_cpu_limit(
+    cpu_max: Path = CGROUP_V2_CPU_MAX, cgroup_v1: Path = CGROUP_V1_CPU
+) -> float | None:
+    """Returns the cgroup CPU quota in cores, or None when it is unlimited."""
+    try:
+        quota, period = cpu_max.read_text().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota_us: int = int((cgroup_v1 / "cpu.cfs_quota_us").read_text())
+        period_us: int = int((cgroup_v1 / "cpu.cfs_period_us").read_text())
+        return quota_us / period_us if quota_us > 0 and period_us > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> int:
+    """Returns the cores this process may use, honouring affinity and the cgroup quota."""
+    cpus: int = (
+        len(os.sched_getaffinity(0))
+        if hasattr(os, "sched_getaffinity")
+        else os.cpu_count() or 1
+    )
+    limit: float | None = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(cpus, 1)
+
+
+def default_loop() -> str:
+    return "uvloop" if find_spec("uvloop") is not None else "asyncio"
+
+
+def default_http() -> str:
+    return "httptools" if find_spec("httptools") is not None else "h11"
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Launcher settings. Each field is read from `NIXFASTAPI_<FIELD>`."""
+
+    app: str = "main:app"
+    host: str = "0.0.0.0"
+    port: int = 7999
+    workers: int = field(default_factory=available_cpus)
+    loop: str = field(default_factory=default_loop)
+    http: str = field(default_factory=default_http)
+    backlog: int = 2048
+    keepalive: int = 5
+    graceful_timeout: int = 30
+    startup_timeout: int = 60
+    access_log: bool = False
+    forwarded_allow_ips: str = "127.0.0.1"
+    # Where workers leave metrics snapshots; a temporary directory when empty
+    metrics_dir: str = ""
+
+    def __post_init__(self) -> None:
+        assert self.workers >= 1, f"{ENV_PREFIX}WORKERS must be at least 1."
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "Settings":
+        """Builds settings from `NIXFASTAPI_*` variables, defaulting the rest."""
+        values: dict[str, object] = {}
+        for setting in fields(cls):
+            name: str = f"{ENV_PREFIX}{setting.name.upper()}"
+            raw: str | None = environ.get(name)
+            # Empty values, as compose passes for unset variables, mean the default
+            if not raw:
+                continue
+            if setting.type is int:
+                try:
+                    values[setting.name] = int(raw)
+                except ValueError:
+                    raise ValueError(
+                        f"{name} must be an integer, got {raw!r}."
+                    ) from None
+            elif setting.type is bool:
+                values[setting.name] = raw.strip().lower() in ("1", "true", "yes", "on")
+            else:
+                values[setting.name] = raw
+        return cls(**values)
+
+    def uvicorn_config(self) -> uvicorn.Config:
+        return uvicorn.Config(
+            self.app,
+            loop=self.loop,
+            http=self.http,
+            backlog=self.backlog,
+            timeout_keep_alive=self.keepalive,
+            timeout_graceful_shutdown=self.graceful_timeout,
+            access_log=self.access_log,
+            forwarded_allow_ips=self.forwarded_allow_ips,
+            server_header=False,
+        )
+
+
+def bind_socket(settings: Settings) -> socket.socket:
+    """Binds a listening socket that other workers can share via `SO_REUSEPORT`."""
+    family: socket.AddressFamily = (
+        socket.AF_INET6 if ":" in settings.host else socket.AF_INET
+    )
+    sock: socket.socket = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((settings.host, settings.port))
+        sock.listen(settings.backlog)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class WorkerServer(uvicorn.Server):
+    """A uvicorn server that tells the supervisor once it accepts connections."""
+
+    def __init__(self, config: uvicorn.Config, ready: Connection) -> None:
+        super().__init__(config)
+        self.ready: Connection = ready
+
+    async def startup(self, sockets: list[socket.socket] | None = None) -> None:
+        await super().startup(sockets=sockets)
+        if self.started:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGUSR1, self.stop_accepting
+            )
+            self.ready.send_bytes(b"ready")
+            self.ready.close()
+
+    async def shutdown(self, sockets: list[socket.socket] | None = None) -> None:
+        # Event streams never finish on their own and would hold the drain open
+        close_hubs()
+        await super().shutdown(sockets=sockets)
+
+    def stop_accepting(self) -> None:
+        """Stops accepting while finishing connections that were already accepted."""
+        for server in self.servers:
+            server.close()
+
+
+def run_worker(settings: Settings, sock: socket.socket, ready: Connection) -> None:
+    """Serves the app on the socket of this worker's slot."""
+    WorkerServer(settings.uvicorn_config(), ready).run(sockets=[sock])
+
+
+class Supervisor:
+    """Keeps one uvicorn worker per slot running and restarts them on request.
+
+    The supervisor owns one `SO_REUSEPORT` socket per slot for its whole life.
+    A replacement worker shares its slot's socket with the worker it replaces,
+    so connections already queued on that socket are served by the replacement
+    instead of being reset when the old worker closes it.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings: Settings = settings
+        self.context: SpawnContext = multiprocessing.get_context("spawn")
+        self.sockets: list[socket.socket] = []
+        self.workers: dict[int, SpawnProcess] = {}
+        self.should_exit: bool = False
+        self.restart_requested: bool = False
+        self.metrics_tmp: str | None = None
+
+    def prepare_metrics_dir(self) -> None:
+        """Gives the workers a directory to share metrics through, see nixfastapi.metrics."""
+        directory: str = self.settings.metrics_dir
+        if directory:
+            # Snapshots of a previous run would count its workers again
+            for stale in Path(directory).glob("*.json"):
+                stale.unlink(missing_ok=True)
+        else:
+            parent: Path | None = (
+                SHARED_MEMORY_DIR if SHARED_MEMORY_DIR.is_dir() else None
+            )
+            try:
+                directory = self.metrics_tmp = tempfile.mkdtemp(
+                    prefix="nixfastapi-metrics-", dir=parent
+                )
+            except OSError:
+                logger.warning("No metrics directory; /metrics covers one worker.")
+                return
+        # Spawned workers inherit the environment
+        os.environ[METRICS_DIR_ENV] = directory
+
+    def start_worker(self, slot: int) -> tuple[int, SpawnProcess, Connection]:
+        ready, notify = self.context.Pipe(duplex=False)
+        process: SpawnProcess = self.context.Process(
+            target=run_worker,
+            args=(self.settings, self.sockets[slot], notify),
+            name=f"nixfastapi-worker-{slot}",
+        )
+        process.start()
+        # Only the worker holds the write end, so its exit reads as EOF here
+        notify.close()
+        return slot, process, ready
+
+    def await_ready(self, slot: int, process: SpawnProcess, ready: Connection) -> bool:
+        """Waits for a worker to accept connections, stopping it if it never does."""
+        with ready:
+            if ready.poll(self.settings.startup_timeout):
+                try:
+                    ready.recv_bytes()
+                    old: SpawnProcess | None = self.workers.get(slot)
+                    self.workers[slot] = process
+                    if old is not None:
+                        self.stop_workers([old])
+                    return True
+                except EOFError:
+                    pass
+        logger.error("Worker [%s] failed to start.", process.pid)
+        self.stop_workers([process])
+        return False
+
+    def stop_workers(self, processes: list[SpawnProcess]) -> None:
+        """Asks workers to drain and exit, killing them after the graceful timeout.
+
+        Workers first stop accepting, so connections they accepted just before
+        can still send their requests, then shut down gracefully.
+        """
+        alive: list[SpawnProcess] = [p for p in processes if p.is_alive()]
+        for process in alive:
+            assert process.pid is not None
+            os.kill(process.pid, signal.SIGUSR1)
+        if alive:
+            time.sleep(DRAIN_SECONDS)
+        for process in alive:
+            process.terminate()
+        deadline: float = time.monotonic() + self.settings.graceful_timeout + 5
+        for process in processes:
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.warning(
+                    "Worker [%s] did not drain in time, killing it.", process.pid
+                )
+                process.kill()
+                process.join()
+
+    def rolling_restart(self) -> None:
+        """Replaces every worker, starting each replacement before draining the old one."""
+        logger.info("Rolling restart of %d workers.", len(self.workers))
+        for slot in list(self.workers):
+            if self.should_exit:
+                return
+            if not self.await_ready(*self.start_worker(slot)):
+                logger.error("Aborting rolling restart; old workers keep serving.")
+                return
+        logger.info("Rolling restart complete.")
+
+    def replace_dead_workers(self) -> None:
+        """Restarts workers that exited, leaving their queued connections waiting."""
+        for slot in range(len(self.sockets)):
+            process: SpawnProcess | None = self.workers.get(slot)
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                logger.warning(
+                    "Worker [%s] exited with code %s, replacing it.",
+                    process.pid,
+                    process.exitcode,
+                )
+                del self.workers[slot]
+                process.join()
+            if not self.await_ready(*self.start_worker(slot)):
+                time.sleep(CRASH_BACKOFF_SECONDS)
+                return
+
+    def handle_exit(self, sig: int, frame: FrameType | None) -> None:
+        self.should_exit = True
+
+    def handle_restart(self, sig: int, frame: FrameType | None) -> None:
+        self.restart_requested = True
+
+    def run(self) -> int:
+        """Runs the workers until `SIGTERM` or `SIGINT`, returning an exit code."""
+        self.sockets = [
+            bind_socket(self.settings) for _ in range(self.settings.workers)
+        ]
+        self.prepare_metrics_dir()
+        signal.signal(signal.SIGTERM, self.handle_exit)
+        signal.signal(signal.SIGINT, self.handle_exit)
+        signal.signal(signal.SIGHUP, self.handle_restart)
+        logger.info(
+            "Starting %d workers on %s:%d (loop=%s, http=%s).",
+            self.settings.workers,
+            self.settings.host,
+            self.settings.port,
+            self.settings.loop,
+            self.settings.http,
+        )
+        pending: list[tuple[int, SpawnProcess, Connection]] = [
+            self.start_worker(slot) for slot in range(self.settings.workers)
+        ]
+        exit_code: int = 0
+        if not all([self.await_ready(*worker) for worker in pending]):
+            self.should_exit = True
+            exit_code = 1
+
+        while not self.should_exit:
+            wait([process.sentinel for process in self.workers.values()], timeout=0.5)
+            if self.should_exit:
+                break
+            if self.restart_requested:
+                self.restart_requested = False
+                self.rolling_restart()
+            self.replace_dead_workers()
+
+        logger.info("Shutting down %d workers.", len(self.workers))
+        self.stop_workers(list(self.workers.values()))
+        for sock in self.sockets:
+            sock.close()
+        if self.metrics_tmp is not None:
+            shutil.rmtree(self.metrics_tmp, ignore_errors=True)
+        return exit_code
+
+
+def serve(settings: Settings | None = None) -> None:
+    """Runs the production server with settings from the environment."""
+    logging.config.dictConfig(LOGGING_CONFIG)
+    raise SystemExit(Supervisor(settings or Settings.from_env()).run())
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,227 @@
+"""In-memory static file server for the immutable, Nix-built asset tree.
+
+`IndexedStaticFiles` walks the static directory once at startup and keeps,
+for every file and each of its precompressed variants, the size, a content
+`ETag`, the content type and the ready-made response headers. Requests are
+answered from that index without touching the filesystem. Small files are
+held in memory. Large ones are memory-mapped and handed to the server's
+`sendfile` through the ASGI zero-copy extension when it offers one.
+"""
+
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from mimetypes import guess_type
+from pathlib import Path
+from typing import BinaryIO
+import hashlib
+import mmap
+import os
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from nixfastapi.assets import (
+    ENCODINGS,
+    IMMUTABLE_CACHE_CONTROL,
+    MANIFEST_NAME,
+    REVALIDATE_CACHE_CONTROL,
+    SKIP_DIRECTORIES,
+    AssetManifest,
+    accepted_encodings,
+)
+from nixfastapi.pages import etag_matches
+from nixfastapi.profiling import timed
+
+# Files up to this size are read into memory, larger ones are memory-mapped
+SMALL_FILE_BYTES: int = 256 * 1024
+# Body chunk size for mapped files when the server has no zero-copy send
+CHUNK_BYTES: int = 256 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class StaticVariant:
+    """One encoding of a static file, with everything needed to send it."""
+
+    path: str
+    size: int
+    etag: str
+    last_modified: str
+    raw_headers: list[tuple[bytes, bytes]]
+    body: bytes | mmap.mmap
+    file: BinaryIO | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class StaticEntry:
+    """A static file and its precompressed variants, keyed by content coding."""
+
+    content_type: str
+    variants: dict[str, StaticVariant] = field(default_factory=dict)
+
+    def negotiate(self, accept_encoding: str) -> StaticVariant:
+        """Returns the preferred variant the client accepts, else identity."""
+        accepted: set[str] = accepted_encodings(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in self.variants:
+                return self.variants[encoding]
+        return self.variants["identity"]
+
+
+def load_variant(
+    path: str, encoding: str, content_type: str, cache_control: str
+) -> StaticVariant:
+    """Reads or maps one file, hashing its content for the `ETag`."""
+    file: BinaryIO = open(path, "rb")
+    stat_result: os.stat_result = os.fstat(file.fileno())
+    body: bytes | mmap.mmap
+    if stat_result.st_size <= SMALL_FILE_BYTES:
+        body = file.read()
+        file.close()
+    else:
+        body = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        body.madvise(mmap.MADV_WILLNEED)
+    etag: str = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    last_modified: str = formatdate(stat_result.st_mtime, usegmt=True)
+    headers: dict[str, str] = {
+        "content-type": content_type,
+        "content-length": str(stat_result.st_size),
+        "etag": etag,
+        "last-modified": last_modified,
+        "cache-control": cache_control,
+        "vary": "Accept-Encoding",
+    }
+    if encoding != "identity":
+        headers["content-encoding"] = encoding
+    return StaticVariant(
+        path=path,
+        size=stat_result.st_size,
+        etag=etag,
+        last_modified=last_modified,
+        raw_headers=[(k.encode(), v.encode("latin-1")) for k, v in headers.items()],
+        body=body,
+        file=None if isinstance(body, bytes) else file,
+    )
+
+
+def build_index(static_dir: Path, manifest: AssetManifest) -> dict[str, StaticEntry]:
+    """Indexes every file under `static_dir` by its path relative to it."""
+    index: dict[str, StaticEntry] = {}
+    suffixes: dict[str, str] = {suffix: encoding for encoding, suffix in ENCODINGS}
+    for root, directories, names in os.walk(static_dir, followlinks=True):
+        if root == str(static_dir):
+            directories[:] = [d for d in directories if d not in SKIP_DIRECTORIES]
+        for name in names:
+            full_path: str = os.path.join(root, name)
+            path: str = os.path.relpath(full_path, static_dir)
+            if path == MANIFEST_NAME or os.path.splitext(name)[1] in suffixes:
+                continue
+            content_type: str = guess_type(name)[0] or "text/plain"
+            if content_type.startswith("text/") or content_type.endswith("javascript"):
+                content_type += "; charset=utf-8"
+            cache_control: str = (
+                IMMUTABLE_CACHE_CONTROL
+                if os.path.abspath(full_path) in manifest.immutable
+                else REVALIDATE_CACHE_CONTROL
+            )
+            entry: StaticEntry = StaticEntry(content_type)
+            entry.variants["identity"] = load_variant(
+                full_path, "identity", content_type, cache_control
+            )
+            for suffix, encoding in suffixes.items():
+                if os.path.isfile(full_path + suffix):
+                    entry.variants[encoding] = load_variant(
+                        full_path + suffix, encoding, content_type, cache_control
+                    )
+            index[path] = entry
+    return index
+
+
+class IndexedResponse(Response):
+    """Sends a static variant from memory, or through `sendfile` when mapped."""
+
+    def __init__(self, variant: StaticVariant) -> None:
+        # The headers were encoded once when the index was built
+        self.variant: StaticVariant = variant
+        self.status_code = 200
+        self.background = None
+        self.raw_headers = variant.raw_headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": list(self.raw_headers),
+            }
+        )
+        variant: StaticVariant = self.variant
+        if scope["method"] == "HEAD" or isinstance(variant.body, bytes):
+            body: bytes = b"" if scope["method"] == "HEAD" else variant.body
+            await send({"type": "http.response.body", "body": body})
+            return
+        extensions: dict = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            await send(
+                {
+                    "type": "http.response.zerocopysend",
+                    "file": variant.file,
+                    "offset": 0,
+                    "count": variant.size,
+                }
+            )
+            return
+        if "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": variant.path})
+            return
+        # Without a zero-copy send, slices of the mapping go out without a read
+        view: memoryview = memoryview(variant.body)
+        for offset in range(0, variant.size, CHUNK_BYTES):
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": view[offset : offset + CHUNK_BYTES],
+                    "more_body": offset + CHUNK_BYTES < variant.size,
+                }
+            )
+
+
+class IndexedStaticFiles(StaticFiles):
+    """Serves a static directory that never changes from an index built at startup.
+
+    Only for immutable trees such as the Nix store output: files added or
+    changed after startup are not seen.
+    """
+
+    def __init__(self, *, manifest: AssetManifest, **kwargs) -> None:
+        super().__init__(**kwargs)
+        assert self.directory is not None, "IndexedStaticFiles needs a directory."
+        self.index: dict[str, StaticEntry] = build_index(Path(self.directory), manifest)
+
+    async def check_config(self) -> None:
+        """The index was built from the directory, so there is nothing to check."""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        with timed("static"):
+            return self.lookup(path, scope)
+
+    def lookup(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405, headers={"Allow": "GET, HEAD"})
+        entry: StaticEntry | None = self.index.get(path)
+        if entry is None:
+            raise HTTPException(status_code=404)
+        request_headers: Headers = Headers(scope=scope)
+        variant: StaticVariant = entry.negotiate(
+            request_headers.get("accept-encoding", "")
+        )
+        if_none_match: str | None = request_headers.get("if-none-match")
+        if (
+            etag_matches(if_none_match, variant.etag)
+            if if_none_match is not None
+            else request_headers.get("if-modified-since") == variant.last_modified
+        ):
+            return NotModifiedResponse(Headers(raw=variant.raw_headers))
+        return IndexedResponse(variant)
@@ -0,0 +1,62 @@
+"""Build-time template compilation for nixfastapi.
+
+`python -m nixfastapi.templates <template dir> <target dir>` compiles every
+Jinja template to a Python module in the target, together with unchecked
+hash-based bytecode. Python never compares that bytecode with its source, so
+it stays valid in the Nix store, where mtimes are reset and files never
+change. At startup `load_compiled` points the app's environment at those
+modules and imports each one, so no worker parses or compiles a template on
+a request.
+"""
+
+from compileall import compile_dir
+from pathlib import Path
+from py_compile import PycInvalidationMode
+import sys
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import ChoiceLoader, ModuleLoader
+
+
+def compile_templates(template_dir: Path, target: Path) -> list[str]:
+    """Compiles the templates under `template_dir` into modules in `target`.
+
+    The environment is created as `Jinja2Templates` creates it in main.py, as
+    options such as autoescaping are baked into the compiled code.
+    """
+    env = Jinja2Templates(directory=template_dir).env
+    names: list[str] = env.list_templates()
+    target.mkdir(parents=True, exist_ok=True)
+    env.compile_templates(target, zip=None, ignore_errors=False)
+    compile_dir(target, quiet=1, invalidation_mode=PycInvalidationMode.UNCHECKED_HASH)
+    return names
+
+
+def load_compiled(templates: Jinja2Templates, compiled_dir: Path) -> list[str]:
+    """Serves templates from `compiled_dir`, importing each one now.
+
+    Templates missing from it fall back to the original loader. The tree is
+    immutable, so Jinja stops checking templates for changes. Returns the
+    names of the loaded templates.
+    """
+    env = templates.env
+    names: list[str] = env.list_templates()
+    assert env.loader is not None, "The template environment has no loader."
+    env.loader = ChoiceLoader([ModuleLoader(compiled_dir), env.loader])
+    env.auto_reload = False
+    for name in names:
+        env.get_template(name)
+    return names
+
+
+def main(argv: list[str] = sys.argv[1:]) -> None:
+    """Compiles the template directory given on the command line."""
+    assert len(argv) == 2, (
+        "Usage: python -m nixfastapi.templates <template dir> <target dir>"
+    )
+    names: list[str] = compile_templates(Path(argv[0]), Path(argv[1]))
+    print(f"Compiled {len(names)} templates into {argv[1]}.")
+
+
+if __name__ == "__main__":
+    main()
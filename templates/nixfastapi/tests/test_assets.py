@@ -0,0 +1,106 @@
+from pathlib import Path
+import gzip
+import json
+
+import brotli
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from fastapi.testclient import TestClient
+
+from nixfastapi.assets import (
+    AssetManifest,
+    PrecompressedStaticFiles,
+    accepted_encodings,
+    build_assets,
+)
+
+CSS: bytes = b"body { color: red; }\n" * 200
+
+
+def make_static(static_dir: Path) -> None:
+    (static_dir / "assets").mkdir(parents=True)
+    (static_dir / "templates").mkdir()
+    (static_dir / "output.css").write_bytes(CSS)
+    (static_dir / "assets" / "noise.bin").write_bytes(bytes(range(256)))
+    (static_dir / "templates" / "base.html").write_text("<html></html>")
+
+
+def test_build_assets(tmp_path: Path):
+    make_static(tmp_path)
+    manifest = build_assets(tmp_path)
+
+    assert set(manifest) == {"output.css", "assets/noise.bin"}
+    hashed: str = manifest["output.css"]
+    assert hashed.startswith("output.") and hashed.endswith(".css")
+    assert (tmp_path / hashed).read_bytes() == CSS
+    for name in ("output.css", hashed):
+        assert gzip.decompress((tmp_path / f"{name}.gz").read_bytes()) == CSS
+        assert brotli.decompress((tmp_path / f"{name}.br").read_bytes()) == CSS
+    # Incompressible files are served as they are
+    assert not (tmp_path / "assets" / "noise.bin.gz").exists()
+    assert json.loads((tmp_path / "manifest.json").read_text()) == manifest
+
+    # Rebuilding skips its own outputs
+    assert build_assets(tmp_path) == manifest
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("") == set()
+    assert accepted_encodings("gzip, deflate, br") == {"gzip", "deflate", "br"}
+    assert accepted_encodings("br;q=0, GZIP;q=0.5") == {"gzip"}
+
+
+def test_precompressed_static_files(tmp_path: Path):
+    make_static(tmp_path)
+    build_assets(tmp_path)
+    assets = AssetManifest(tmp_path)
+    app = Starlette(
+        routes=[
+            Mount(
+                "/static",
+                PrecompressedStaticFiles(directory=tmp_path, manifest=assets),
+            )
+        ]
+    )
+    client = TestClient(app)
+
+    url: str = assets.url("output.css")
+    assert url == f"/static/{assets.paths['output.css']}"
+    response = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["content-type"].startswith("text/css")
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert "last-modified" in response.headers
+    assert response.content == CSS
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    gzip_etag: str = response.headers["etag"]
+    response = client.get(
+        url, headers={"Accept-Encoding": "gzip", "If-None-Match": gzip_etag}
+    )
+    assert response.status_code == 304
+
+    response = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] != gzip_etag
+    assert response.content == CSS
+
+    # Unhashed paths are revalidated rather than cached forever
+    response = client.get("/static/output.css")
+    assert response.headers["cache-control"] == "no-cache"
+    assert assets.url("missing.js") == "/static/missing.js"
+
+
+def test_inline_asset(tmp_path: Path):
+    make_static(tmp_path)
+    (tmp_path / "small.css").write_text("p{margin:0}")
+    assert AssetManifest(tmp_path).inline("small.css") is None
+
+    build_assets(tmp_path)
+    assets = AssetManifest(tmp_path)
+    assert assets.inline("small.css") == "p{margin:0}"
+    assert assets.inline("output.css", limit=100) is None
+    assert assets.inline("missing.css") is None
@@ -0,0 +1,68 @@
+from pathlib import Path
+import json
+
+from nixfastapi.benchmark import DEFAULT_PATHS, Result, compare, main
+
+BASE_DIR = Path(__file__).parent.parent
+
+
+def result(**overrides) -> Result:
+    fields = {
+        "path": "/",
+        "concurrency": 1,
+        "requests": 100,
+        "errors": 0,
+        "requests_per_second": 1000.0,
+        "p50_ms": 1.0,
+        "p95_ms": 2.0,
+        "p99_ms": 3.0,
+    }
+    return Result(**{**fields, **overrides})
+
+
+def test_compare():
+    baseline = [vars(result())]
+    assert compare([result(p95_ms=2.3)], baseline, tolerance=0.2) == []
+    assert compare([result(path="/new", p95_ms=50.0)], baseline, tolerance=0.2) == []
+    regressions = compare(
+        [result(p99_ms=4.0, requests_per_second=700.0, errors=2)],
+        baseline,
+        tolerance=0.2,
+    )
+    assert len(regressions) == 3
+    assert regressions[0].startswith("/ @ 1: p99_ms")
+
+
+def test_benchmark_in_process(tmp_path: Path, capsys):
+    output: Path = tmp_path / "report.json"
+    argv = ["--app-dir", str(BASE_DIR), "--requests", "20", "--concurrency", "1", "4"]
+    assert main([*argv, "--output", str(output)]) == 0
+    report = json.loads(output.read_text())
+    assert json.loads(capsys.readouterr().out) == report
+    assert [(r["path"], r["concurrency"]) for r in report["results"]] == [
+        (path, level) for path in DEFAULT_PATHS for level in (1, 4)
+    ]
+    for entry in report["results"]:
+        assert entry["errors"] == 0
+        assert entry["requests"] == 20
+        assert 0 < entry["p50_ms"] <= entry["p95_ms"] <= entry["p99_ms"]
+
+    # A baseline that is far faster than this run fails it
+    fast = {
+        "results": [
+            {**entry, "p50_ms": entry["p50_ms"] / 100} for entry in report["results"]
+        ]
+    }
+    baseline: Path = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(fast))
+    assert main([*argv, "--baseline", str(baseline)]) == 1
+    assert json.loads(capsys.readouterr().out)["regressions"]
+
+
+def test_benchmark_under_uvicorn(tmp_path: Path):
+    output: Path = tmp_path / "report.json"
+    argv = ["--server", "uvicorn", "--app-dir", str(BASE_DIR), "--requests", "50"]
+    assert main([*argv, "--concurrency", "8", "--output", str(output)]) == 0
+    report = json.loads(output.read_text())
+    assert report["server"] == "uvicorn"
+    assert all(entry["errors"] == 0 for entry in report["results"])
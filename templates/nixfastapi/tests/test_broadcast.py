@@ -0,0 +1,131 @@
+import asyncio
+import tracemalloc
+
+from datastar_py.fastapi import DatastarResponse
+from starlette.applications import Starlette
+from starlette.routing import Route
+
+from nixfastapi.broadcast import BroadcastHub, merge_patch
+
+
+def test_merge_patch():
+    target = {"count": 1, "user": {"name": "a", "age": 2}}
+    merge_patch(target, {"count": 2, "user": {"age": None}, "new": True})
+    assert target == {"count": 2, "user": {"name": "a"}, "new": True}
+
+
+def test_hub_coalesces_each_tick():
+    async def main():
+        hub = BroadcastHub()
+        hub.patch_signals({"count": 0})
+        hub.flush()
+        stream = hub.subscribe()
+        assert b'"count":0' in await anext(stream)
+
+        hub.patch_elements('<div id="a">1</div>', "#a")
+        hub.patch_elements('<div id="a">2</div>', "#a")
+        hub.patch_signals({"count": 1})
+        hub.patch_signals({"count": 2})
+        hub.flush()
+        frame: bytes = await anext(stream)
+        assert frame.count(b"event: datastar-patch-elements") == 1
+        assert b'id="a">2' in frame and b'id="a">1' not in frame
+        assert b'"count":2' in frame
+
+        hub.close()
+        assert [frame async for frame in stream] == []
+        assert hub.subscribers == 0
+
+    asyncio.run(main())
+
+
+def test_lagging_subscriber_gets_snapshot():
+    async def main():
+        hub = BroadcastHub(history=2)
+        stream = hub.subscribe()
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        hub.patch_signals({"count": 0})
+        hub.flush()
+        assert b'"count":0' in await waiting
+
+        # Five frames go out while the subscriber is not reading
+        for count in range(1, 6):
+            hub.patch_signals({"count": count})
+            hub.patch_elements(f'<p id="p{count}"></p>', f"#p{count}")
+            hub.flush()
+        snapshot: bytes = await anext(stream)
+        assert b'"count":5' in snapshot and b'"count":4' not in snapshot
+        assert all(f'id="p{count}"'.encode() in snapshot for count in range(1, 6))
+        assert len(hub.frames) == 2
+        hub.close()
+
+    asyncio.run(main())
+
+
+def test_idle_subscribers_use_flat_memory():
+    hub = BroadcastHub()
+
+    async def updates(request):
+        return DatastarResponse(hub.subscribe())
+
+    app = Starlette(routes=[Route("/updates", updates)])
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/updates",
+        "raw_path": b"/updates",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "client": ("127.0.0.1", 1),
+        "server": ("127.0.0.1", 80),
+    }
+    received: list[int] = []
+
+    async def main():
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                received.append(len(message["body"]))
+
+        async def connect(count: int) -> list[asyncio.Task]:
+            tasks = [
+                asyncio.create_task(app(dict(scope), receive, send))
+                for _ in range(count)
+            ]
+            await asyncio.sleep(0.1)
+            return tasks
+
+        tracemalloc.start()
+        base: int = tracemalloc.get_traced_memory()[0]
+        tasks: list[asyncio.Task] = await connect(1000)
+        first: int = tracemalloc.get_traced_memory()[0] - base
+        tasks += await connect(9000)
+        total: int = tracemalloc.get_traced_memory()[0] - base
+        tracemalloc.stop()
+        assert hub.subscribers == 10000
+
+        hub.patch_signals({"count": 1})
+        hub.flush()
+        await asyncio.sleep(0.1)
+        assert len(received) == 10000
+
+        hub.close()
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=30)
+        disconnected.set()
+        return first / 1000, total / 10000
+
+    first_per_connection, per_connection = asyncio.run(main())
+    # Memory grows linearly with connections and stays small for each one
+    assert per_connection < first_per_connection * 1.25
+    assert per_connection < 16 * 1024
+    assert hub.subscribers == 0
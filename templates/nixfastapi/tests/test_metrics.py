@@ -0,0 +1,121 @@
+from pathlib import Path
+import asyncio
+import json
+import time
+import os
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from fastapi.testclient import TestClient
+
+from nixfastapi.benchmark import metrics_overhead_us
+from nixfastapi.metrics import (
+    LATENCY_BUCKETS,
+    Histogram,
+    Metrics,
+    MetricsMiddleware,
+    merge,
+    render,
+)
+
+
+def make_app(metrics: Metrics) -> Starlette:
+    async def item(request):
+        return PlainTextResponse(request.path_params["id"])
+
+    async def broken(request):
+        raise RuntimeError("broken")
+
+    app = Starlette(
+        routes=[Route("/items/{id}", item), Route("/broken", broken)],
+    )
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+    return app
+
+
+def test_histogram():
+    histogram = Histogram((0.001, 0.01))
+    for value_ns in (500_000, 1_000_000, 5_000_000, 50_000_000):
+        histogram.observe(value_ns)
+    # Bounds are inclusive, as Prometheus `le` buckets are
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.total == 56_500_000
+
+
+def test_middleware_counts_routes():
+    metrics = Metrics(directory="")
+    client = TestClient(make_app(metrics), raise_server_exceptions=False)
+    for id in ("1", "2", "3"):
+        assert client.get(f"/items/{id}").status_code == 200
+    assert client.get("/missing").status_code == 404
+    assert client.get("/broken").status_code == 500
+
+    assert metrics.requests == {
+        ("GET", "/items/{id}", 200): 3,
+        ("GET", "<unmatched>", 404): 1,
+        ("GET", "/broken", 500): 1,
+    }
+    assert sum(metrics.latency[("GET", "/items/{id}")].counts) == 3
+    assert metrics.in_flight == 0
+
+    text: str = metrics.render()
+    assert (
+        'nixfastapi_requests_total{method="GET",route="/items/{id}",status="200"} 3'
+        in text
+    )
+    assert (
+        'nixfastapi_request_duration_seconds_bucket{method="GET",route="/items/{id}",le="+Inf"} 3'
+        in text
+    )
+    assert "nixfastapi_workers 1" in text
+
+
+def test_merge_across_workers(tmp_path: Path):
+    first = Metrics(directory=tmp_path)
+    first.observe_request("GET", "/", 200, 2_000_000)
+    first.observe_compression("gzip", 1000)
+    first.in_flight = 4
+    first.write_snapshot()
+    path: Path = next(tmp_path.glob("*.json"))
+    snapshot = json.loads(path.read_text())
+    # Pose as another live worker, as every Metrics here shares one pid
+    path.write_text(json.dumps({**snapshot, "pid": os.getppid()}))
+
+    # A worker that has exited keeps its counters but not its gauges
+    dead = {**snapshot, "pid": 2**22 + 1, "in_flight": 7, "loop_lag_last_ns": 10**9}
+    (tmp_path / "dead.json").write_text(json.dumps(dead))
+    second = Metrics(directory=tmp_path)
+    second.observe_request("GET", "/", 200, 20_000_000)
+
+    merged = merge(second.read_snapshots())
+    assert merged["workers"] == 2
+    assert merged["requests"] == {("GET", "/", 200): 3}
+    assert merged["in_flight"] == 4
+    assert merged["loop_lag_max_ns"] == 0
+    assert merged["compression"] == {"gzip": [2, 2000]}
+    counts, total = merged["latency"][("GET", "/")]
+    assert sum(counts) == 3 and total == 24_000_000
+    assert len(counts) == len(LATENCY_BUCKETS) + 1
+    assert 'nixfastapi_compressions_total{encoding="gzip"} 2' in render(merged)
+
+
+def test_loop_lag_sampler():
+    async def main() -> Metrics:
+        metrics = Metrics(directory="")
+        metrics.start(interval=0.01)
+        await asyncio.sleep(0.02)
+        # Blocking the loop shows up as lag on the next sample
+        time.sleep(0.1)
+        await asyncio.sleep(0.03)
+        metrics.close()
+        return metrics
+
+    metrics: Metrics = asyncio.run(main())
+    assert sum(metrics.loop_lag.counts) >= 2
+    assert metrics.loop_lag.total >= 80_000_000
+
+
+def test_middleware_overhead():
+    # A few microseconds on a laptop; the bound leaves room for slow CI machines
+    assert metrics_overhead_us() < 20
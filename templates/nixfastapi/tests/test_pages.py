@@ -0,0 +1,133 @@
+from pathlib import Path
+import asyncio
+import os
+
+from fastapi import FastAPI, Request
+from fastapi.templating import Jinja2Templates
+from fastapi.testclient import TestClient
+
+from nixfastapi.metrics import Metrics, MetricsMiddleware
+from nixfastapi.pages import PageCache, negotiate_encoding, warm_up
+from nixfastapi.profiling import Profiler, ProfilingMiddleware
+
+
+def make_app(tmp_path: Path, **kwargs) -> tuple[TestClient, PageCache, list[str]]:
+    (tmp_path / "base.html").write_text(
+        "<html>{% block content %}{% endblock %}</html>"
+    )
+    (tmp_path / "page.html").write_text(
+        '{% extends "base.html" %}{% block content %}'
+        "{% for _ in range(200) %}<p>{{ name }}</p>{% endfor %}{% endblock %}"
+    )
+    pages = PageCache(Jinja2Templates(directory=tmp_path), **kwargs)
+    rendered: list[str] = []
+    render = pages.render
+
+    def counting_render(name, context, encoding):
+        rendered.append(encoding)
+        return render(name, context, encoding)
+
+    pages.render = counting_render
+    app = FastAPI()
+
+    @app.get("/{name}")
+    async def page(request: Request, name: str):
+        return pages.response(request, "page.html", {"name": name})
+
+    return TestClient(app), pages, rendered
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("") == "identity"
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip, br") == "br"
+    assert negotiate_encoding("br;q=0, gzip") == "gzip"
+
+
+def test_page_cache(tmp_path: Path):
+    client, pages, rendered = make_app(tmp_path)
+
+    first = client.get("/a", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["content-type"].startswith("text/html")
+    assert first.text.count("<p>a</p>") == 200
+    second = client.get("/a", headers={"Accept-Encoding": "gzip"})
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    assert rendered == ["gzip"]
+
+    identity = client.get("/a", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.content == first.content
+    assert identity.headers["etag"] != first.headers["etag"]
+    assert client.get("/b", headers={"Accept-Encoding": "gzip"}).text.count("b") >= 200
+    assert rendered == ["gzip", "identity", "gzip"]
+
+    response = client.get(
+        "/a",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]},
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == first.headers["etag"]
+    assert len(rendered) == 3
+
+
+def test_page_cache_evicts_least_recently_used(tmp_path: Path):
+    client, pages, rendered = make_app(tmp_path, max_bytes=5000)
+    for name in ("a", "b", "c"):
+        client.get(f"/{name}", headers={"Accept-Encoding": "identity"})
+    assert pages.size <= 5000
+    assert len(pages.pages) == 2
+    client.get("/b", headers={"Accept-Encoding": "identity"})
+    assert len(rendered) == 3
+    client.get("/a", headers={"Accept-Encoding": "identity"})
+    assert len(rendered) == 4
+
+
+def test_page_cache_watches_templates(tmp_path: Path):
+    client, pages, rendered = make_app(tmp_path, watch=True)
+    assert "<html>" in client.get("/a").text
+
+    base: Path = tmp_path / "base.html"
+    base.write_text("<main>{% block content %}{% endblock %}</main>")
+    mtime_ns: int = base.stat().st_mtime_ns + 1_000_000_000
+    os.utime(base, ns=(mtime_ns, mtime_ns))
+    assert "<main>" in client.get("/a").text
+    assert len(rendered) == 2
+
+
+def test_warm_up_is_not_counted(tmp_path: Path):
+    client, pages, rendered = make_app(tmp_path)
+    metrics = Metrics(directory="")
+    profiler = Profiler(enabled=True, secret="", sample_rate=1)
+    app = MetricsMiddleware(ProfilingMiddleware(client.app, profiler), metrics)
+
+    asyncio.run(warm_up(app, ["/a"]))
+    assert sorted(rendered) == ["br", "gzip", "identity"]
+    assert metrics.requests == {}
+    assert len(profiler.profiles) == 0
+
+    assert TestClient(app).get("/a").status_code == 200
+    assert metrics.requests == {("GET", "/{name}", 200): 1}
+    assert len(profiler.profiles) == 1
+
+
+def test_index_is_cached():
+    import main
+
+    with TestClient(main.app) as client:
+        assert client.get("/health").status_code == 200
+    # Warmup at startup rendered the page for every encoding
+    assert len(main.pages.pages) == 3
+
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "Welcome to nixfastapi" in response.text
+    assert response.headers["content-encoding"] == "gzip"
+    response = client.get(
+        "/",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]},
+    )
+    assert response.status_code == 304
@@ -0,0 +1,85 @@
+import time
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from fastapi.testclient import TestClient
+
+from nixfastapi.profiling import Profiler, ProfilingMiddleware, server_timing, timed
+
+SECRET: str = "s3cret"
+
+
+def make_app(profiler: Profiler) -> Starlette:
+    async def slow(request):
+        with timed("render"):
+            time.sleep(0.02)
+        return PlainTextResponse("done")
+
+    async def profiles(request: Request):
+        return profiler.response(request)
+
+    app = Starlette(
+        routes=[Route("/slow", slow), Route("/debug/profiles", profiles)],
+    )
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    return app
+
+
+def test_server_timing():
+    value: str = server_timing(5_000_000, {"render": 2_000_000, "compress": 500_000})
+    assert value == (
+        "total;dur=5.000, render;dur=2.000, compress;dur=0.500, app;dur=2.500"
+    )
+
+
+def test_secret_header_instruments_and_profiles():
+    profiler = Profiler(enabled=False, secret=SECRET, sample_rate=0)
+    client = TestClient(make_app(profiler))
+
+    response = client.get("/slow")
+    assert "server-timing" not in response.headers
+    response = client.get("/slow", headers={"X-Nixfastapi-Profile": "wrong"})
+    assert "server-timing" not in response.headers
+    assert client.get("/debug/profiles").status_code == 404
+    assert len(profiler.profiles) == 0
+
+    response = client.get("/slow", headers={"X-Nixfastapi-Profile": SECRET})
+    timings: dict[str, float] = {
+        name: float(duration.removeprefix("dur="))
+        for name, duration in (
+            entry.split(";") for entry in response.headers["server-timing"].split(", ")
+        )
+    }
+    assert timings["render"] >= 20
+    assert list(timings) == ["total", "render", "app"]
+
+    (profile,) = profiler.profiles
+    assert (profile.path, profile.status) == ("/slow", 200)
+    assert profile.duration_ms >= 20
+    folded: str = client.get(
+        "/debug/profiles", headers={"X-Nixfastapi-Profile": SECRET}
+    ).text
+    assert folded.startswith("GET /slow 200 (")
+    for line in folded.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+    # The blocking sleep in the endpoint is where the samples land
+    assert any("slow (test_profiling.py" in line for line in folded.splitlines())
+
+
+def test_sampling_keeps_latest_profiles():
+    profiler = Profiler(enabled=False, secret="", sample_rate=1, history=2)
+    client = TestClient(make_app(profiler))
+    for _ in range(3):
+        response = client.get("/slow")
+        assert "server-timing" not in response.headers
+    assert len(profiler.profiles) == 2
+
+    # Profiling mode instruments every response and opens the debug endpoint
+    profiler = Profiler(enabled=True, secret="", sample_rate=0)
+    client = TestClient(make_app(profiler))
+    assert "render;dur=" in client.get("/slow").headers["server-timing"]
+    assert client.get("/debug/profiles").status_code == 200
+    assert len(profiler.profiles) == 0
@@ -0,0 +1,151 @@
+from pathlib import Path
+import subprocess
+import signal
+import socket
+import time
+import sys
+import os
+import threading
+import urllib.request
+
+import pytest
+
+from nixfastapi.metrics import SNAPSHOT_SECONDS
+from nixfastapi.server import Settings, available_cpus, cgroup_cpu_limit
+
+BASE_DIR = Path(__file__).parent.parent
+
+
+def test_cgroup_cpu_limit(tmp_path: Path):
+    cpu_max = tmp_path / "cpu.max"
+    cgroup_v1 = tmp_path / "cpu"
+    assert cgroup_cpu_limit(cpu_max, cgroup_v1) is None
+
+    cpu_max.write_text("max 100000\n")
+    assert cgroup_cpu_limit(cpu_max, cgroup_v1) is None
+    cpu_max.write_text("150000 100000\n")
+    assert cgroup_cpu_limit(cpu_max, cgroup_v1) == 1.5
+
+    cpu_max.unlink()
+    cgroup_v1.mkdir()
+    (cgroup_v1 / "cpu.cfs_quota_us").write_text("-1\n")
+    (cgroup_v1 / "cpu.cfs_period_us").write_text("100000\n")
+    assert cgroup_cpu_limit(cpu_max, cgroup_v1) is None
+    (cgroup_v1 / "cpu.cfs_quota_us").write_text("200000\n")
+    assert cgroup_cpu_limit(cpu_max, cgroup_v1) == 2.0
+
+
+def test_settings_from_env():
+    settings = Settings.from_env({"NIXFASTAPI_WORKERS": ""})
+    assert settings.workers == available_cpus()
+    assert settings.port == 7999
+
+    settings = Settings.from_env(
+        {
+            "NIXFASTAPI_PORT": "8080",
+            "NIXFASTAPI_WORKERS": "3",
+            "NIXFASTAPI_ACCESS_LOG": "true",
+            "NIXFASTAPI_LOOP": "asyncio",
+        }
+    )
+    assert (settings.port, settings.workers, settings.access_log) == (8080, 3, True)
+    assert settings.uvicorn_config().loop == "asyncio"
+
+    with pytest.raises(ValueError, match="NIXFASTAPI_PORT"):
+        Settings.from_env({"NIXFASTAPI_PORT": "http"})
+    with pytest.raises(AssertionError):
+        Settings.from_env({"NIXFASTAPI_WORKERS": "0"})
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get_health(port: int) -> int:
+    with urllib.request.urlopen(
+        f"http://127.0.0.1:{port}/health", timeout=5
+    ) as response:
+        return response.status
+
+
+def wait_for_server(port: int, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        assert process.poll() is None, process.stderr.read()
+        try:
+            if get_health(port) == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError("server did not start")
+
+
+def test_rolling_restart_keeps_serving():
+    port = free_port()
+    env = {
+        **os.environ,
+        "NIXFASTAPI_HOST": "127.0.0.1",
+        "NIXFASTAPI_PORT": str(port),
+        "NIXFASTAPI_WORKERS": "2",
+        "NIXFASTAPI_GRACEFUL_TIMEOUT": "5",
+    }
+    process = subprocess.Popen(
+        [sys.executable, str(BASE_DIR / "main.py")],
+        cwd=BASE_DIR,
+        env=env,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        wait_for_server(port, process)
+
+        failures: list[Exception] = []
+        statuses: list[int] = []
+        done = threading.Event()
+
+        def poll():
+            while not done.is_set():
+                try:
+                    statuses.append(get_health(port))
+                except OSError as e:
+                    failures.append(e)
+
+        poller = threading.Thread(target=poll)
+        poller.start()
+        process.send_signal(signal.SIGHUP)
+        time.sleep(0.5)
+        deadline = time.monotonic() + 60
+        log: list[str] = []
+        while time.monotonic() < deadline:
+            line = process.stderr.readline()
+            log.append(line)
+            if "Rolling restart complete" in line:
+                break
+        done.set()
+        poller.join()
+        assert any("Rolling restart complete" in line for line in log), log
+        assert failures == []
+        assert statuses and set(statuses) == {200}
+
+        # Counts of the replaced workers survive in the merged /metrics
+        time.sleep(SNAPSHOT_SECONDS * 2)
+        with urllib.request.urlopen(
+            f"http://127.0.0.1:{port}/metrics", timeout=5
+        ) as response:
+            text: str = response.read().decode()
+        served: int = sum(
+            int(line.rsplit(" ", 1)[1])
+            for line in text.splitlines()
+            if line.startswith('nixfastapi_requests_total{method="GET",route="/health"')
+        )
+        assert served >= len(statuses)
+        assert "nixfastapi_workers 2" in text
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=30) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
@@ -0,0 +1,91 @@
+from pathlib import Path
+import os
+
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from fastapi.testclient import TestClient
+import pytest
+
+from nixfastapi.assets import AssetManifest, build_assets
+from nixfastapi.static import SMALL_FILE_BYTES, IndexedStaticFiles
+
+CSS: bytes = b"body { color: red; }\n" * 200
+LARGE: bytes = os.urandom(SMALL_FILE_BYTES) * 3
+
+
+@pytest.fixture
+def client(tmp_path: Path) -> TestClient:
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "output.css").write_bytes(CSS)
+    (tmp_path / "assets" / "large.bin").write_bytes(LARGE)
+    (tmp_path / "empty.txt").write_bytes(b"")
+    build_assets(tmp_path)
+    static_files = IndexedStaticFiles(
+        directory=tmp_path, manifest=AssetManifest(tmp_path)
+    )
+    return TestClient(Starlette(routes=[Mount("/static", static_files)]))
+
+
+def test_indexed_static_files(client: TestClient, monkeypatch):
+    # Requests never go back to the filesystem
+    accessed: list[tuple] = []
+    stat, open_ = os.stat, os.open
+
+    def record_stat(*args, **kwargs):
+        accessed.append(args)
+        return stat(*args, **kwargs)
+
+    def record_open(*args, **kwargs):
+        accessed.append(args)
+        return open_(*args, **kwargs)
+
+    monkeypatch.setattr(os, "stat", record_stat)
+    monkeypatch.setattr(os, "open", record_open)
+
+    response = client.get("/static/output.css", headers={"Accept-Encoding": "br, gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["content-type"] == "text/css; charset=utf-8"
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.content == CSS
+
+    identity = client.get("/static/output.css", headers={"Accept-Encoding": ""})
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["content-length"] == str(len(CSS))
+    assert identity.headers["etag"] != response.headers["etag"]
+
+    response = client.get(
+        "/static/output.css",
+        headers={"Accept-Encoding": "br", "If-None-Match": response.headers["etag"]},
+    )
+    assert response.status_code == 304
+    response = client.get(
+        "/static/output.css",
+        headers={
+            "Accept-Encoding": "",
+            "If-Modified-Since": identity.headers["last-modified"],
+        },
+    )
+    assert response.status_code == 304
+
+    large = client.get("/static/assets/large.bin", headers={"Accept-Encoding": ""})
+    assert large.content == LARGE
+    assert large.headers["content-length"] == str(len(LARGE))
+    head = client.head("/static/assets/large.bin", headers={"Accept-Encoding": ""})
+    assert head.content == b""
+    assert head.headers["content-length"] == str(len(LARGE))
+
+    assert client.get("/static/empty.txt").content == b""
+    assert client.get("/static/missing.css").status_code == 404
+    assert client.get("/static/manifest.json").status_code == 404
+    assert client.get("/static/output.css.gz").status_code == 404
+    assert client.post("/static/output.css").status_code == 405
+    monkeypatch.undo()
+    assert accessed == []
+
+
+def test_hashed_files_are_immutable(tmp_path: Path, client: TestClient):
+    manifest = AssetManifest(tmp_path)
+    response = client.get(manifest.url("output.css"))
+    assert "immutable" in response.headers["cache-control"]
+    assert response.content == CSS
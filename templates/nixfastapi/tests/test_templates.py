@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from fastapi.templating import Jinja2Templates
+
+from nixfastapi.templates import compile_templates, load_compiled
+
+
+def make_templates(template_dir: Path) -> None:
+    template_dir.mkdir()
+    (template_dir / "base.html").write_text(
+        "<main>{% block content %}{% endblock %}</main>"
+    )
+    (template_dir / "index.html").write_text(
+        '{% extends "base.html" %}{% block content %}{{ name }}{% endblock %}'
+    )
+
+
+def test_compiled_templates_render_without_sources(tmp_path: Path):
+    template_dir: Path = tmp_path / "templates"
+    compiled_dir: Path = tmp_path / "compiled"
+    make_templates(template_dir)
+    assert compile_templates(template_dir, compiled_dir) == ["base.html", "index.html"]
+    assert len(list(compiled_dir.glob("tmpl_*.py"))) == 2
+    assert len(list(compiled_dir.glob("__pycache__/tmpl_*.pyc"))) == 2
+
+    templates = Jinja2Templates(directory=template_dir)
+    expected: str = templates.get_template("index.html").render(name="<b>")
+    assert expected == "<main>&lt;b&gt;</main>"
+
+    templates = Jinja2Templates(directory=template_dir)
+    assert load_compiled(templates, compiled_dir) == ["base.html", "index.html"]
+    # Only the compiled modules are left to load from
+    for source in template_dir.iterdir():
+        source.unlink()
+    templates.env.cache.clear()
+    assert templates.get_template("index.html").render(name="<b>") == expected